@@ -4,6 +4,8 @@ import pygame
 from argparse import ArgumentParser
 
 from src.gen.gen import make_game, MakeTerrainOptions
+from src.gen.planet_cache import PlanetCache
+from src.gen.planet_file import save_world
 from src.utility.calendar import utc_tuple_to_utc_float
 from src.mgmt.constants import TARGET_FPS
 
@@ -56,6 +58,28 @@ arg_parser.add_argument(
 	'--terrain-ocean',
 	help='Whether the terrain should have an ocean.'
 )
+arg_parser.add_argument(
+	'--terrain-workers',
+	help='Generate the terrain in this many processes.'
+)
+arg_parser.add_argument(
+	'--seed',
+	help='Generate the same terrain every time, from this seed.'
+)
+
+# Arguments related to planet files.
+arg_parser.add_argument(
+	'--load-planet',
+	help='Load the planet from this planet file instead of generating one.'
+)
+arg_parser.add_argument(
+	'--save-planet',
+	help='Save the planet to this planet file when the game starts.'
+)
+arg_parser.add_argument(
+	'--planet-cache',
+	help='Keep seeded planets in this directory, and open them from it.'
+)
 
 # Arguments related to debugging.
 arg_parser.add_argument(
@@ -107,6 +131,16 @@ if args.terrain_landmass_size:
 	terrain_options.landmass_cell_radius = int(args.terrain_landmass_size)
 if args.terrain_ocean:
 	terrain_options.ocean = True
+if args.seed:
+	terrain_options.seed = int(args.seed)
+
+terrain_workers = None
+if args.terrain_workers:
+	terrain_workers = int(args.terrain_workers)
+
+planet_cache = None
+if args.planet_cache:
+	planet_cache = PlanetCache(args.planet_cache)
 
 window = pygame.display.set_mode((WINDOW_WIDTH, WINDOW_HEIGHT), flags)
 pygame.display.set_caption("Explorers")
@@ -123,8 +157,13 @@ def main():
 		on_quit=on_quit,
 		screen=window,
 		window_dimensions=(WINDOW_WIDTH, WINDOW_HEIGHT),
-		epoch=epoch
+		epoch=epoch,
+		planet_path=args.load_planet,
+		planet_cache=planet_cache,
+		terrain_workers=terrain_workers
 	)
+	if args.save_planet:
+		save_world(game.world, args.save_planet)
 	clock = pygame.time.Clock()
 
 	while running:
@@ -138,6 +177,7 @@ def main():
 		if print_atm:
 			print(game.world.atmosphere)
 
+	game.shutdown()
 	pygame.quit()
 
 if __name__ == '__main__':
@@ -0,0 +1,94 @@
+"""
+Times `astar` (the flat-index engine) against `reference_astar` (the
+original tuple-and-dict search) on a generated planet, and checks that they
+find the same paths. Also times `hpa_astar` (the hierarchical search), and
+how much longer its paths are:
+
+	python benchmark_astar.py --width 1024 --height 512 --paths 20
+"""
+
+import random
+import time
+
+from argparse import ArgumentParser
+
+from src.gen.world_generator import MakeTerrainOptions, make_terrain
+from src.path.astar import astar, reference_astar
+from src.path.astar_engine import engine_for
+from src.path.hpa import hpa_astar, pathfinder_for
+
+def _parser():
+	parser = ArgumentParser(description='Benchmark A* on a generated planet.')
+	parser.add_argument('--width', type=int, default=1024)
+	parser.add_argument('--height', type=int, default=512)
+	parser.add_argument('--paths', type=int, default=20)
+	parser.add_argument('--seed', type=int, default=0)
+	return parser
+
+def _path_cost(terrain, path):
+	return sum(
+		abs(terrain.height_at(a) - terrain.height_at(b)) + 1
+		for a, b in zip(path, path[1:])
+	)
+
+def _time(fn, pairs, terrain):
+	paths = []
+	start = time.perf_counter()
+	for src, dst in pairs:
+		paths.append(fn(src, dst, terrain))
+	return time.perf_counter() - start, paths
+
+def main():
+	args = _parser().parse_args()
+	terrain = make_terrain(MakeTerrainOptions(
+		width=args.width,
+		height=args.height,
+		seed=args.seed
+	))
+	rng = random.Random(args.seed)
+	pairs = []
+	for _ in range(args.paths):
+		x = rng.randrange(args.width)
+		y = rng.randrange(args.height)
+		# Far enough apart to expand tens of thousands of cells.
+		dx = rng.randint(args.width // 8, args.width // 4)
+		dy = rng.randint(-args.height // 8, args.height // 8)
+		goal = ((x + dx) % args.width, min(max(y + dy, 0), args.height - 1))
+		pairs.append(((x, y), goal))
+
+	start = time.perf_counter()
+	engine_for(terrain)
+	setup = time.perf_counter() - start
+
+	engine_time, engine_paths = _time(astar, pairs, terrain)
+	reference_time, reference_paths = _time(reference_astar, pairs, terrain)
+
+	start = time.perf_counter()
+	pathfinder_for(terrain)
+	hpa_setup = time.perf_counter() - start
+	# The first search through a cluster builds its graph.
+	hpa_cold_time, _ = _time(hpa_astar, pairs, terrain)
+	hpa_time, hpa_paths = _time(hpa_astar, pairs, terrain)
+	hpa_excess = (
+		sum(_path_cost(terrain, path) for path in hpa_paths)
+		/ sum(_path_cost(terrain, path) for path in engine_paths)
+	) - 1
+	same = all(
+		[tuple(p) for p in a] == [tuple(p) for p in b]
+		for a, b in zip(engine_paths, reference_paths)
+	)
+	steps = sum(len(path) for path in engine_paths)
+	print(f"{args.paths} paths, {steps} steps in all")
+	print(f"engine setup:  {setup * 1000:8.1f} ms (once per terrain)")
+	print(f"engine:        {engine_time * 1000:8.1f} ms")
+	print(f"reference:     {reference_time * 1000:8.1f} ms")
+	print(f"speedup:       {reference_time / engine_time:8.1f}x")
+	print(f"same paths:    {same}")
+	print(f"hpa setup:     {hpa_setup * 1000:8.1f} ms (once per terrain)")
+	print(f"hpa, cold:     {hpa_cold_time * 1000:8.1f} ms")
+	print(f"hpa:           {hpa_time * 1000:8.1f} ms")
+	print(f"hpa speedup:   {engine_time / hpa_time:8.1f}x over the engine")
+	print(f"hpa cost:      {hpa_excess:8.1%} over optimal")
+
+if __name__ == '__main__':
+	main()
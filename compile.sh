@@ -1,3 +1,5 @@
+mkdir -p bin
+
 gcc -DRUN_VORONOI \
 	src/math/compiled/distance.c \
 	src/math/compiled/vector2.c \
@@ -6,16 +8,18 @@ gcc -DRUN_VORONOI \
 	src/math/compiled/matrix.c \
 	src/math/compiled/voronoi_run.c \
 	-o bin/voronoi_run.so \
+	-lm \
 	-pg
 
-gcc -shared -fPIC -o bin/compiled.so \
+gcc -shared -fPIC -O2 -o bin/compiled.so \
 	src/math/compiled/distance.c \
 	src/math/compiled/vector2.c \
 	src/o10n/compiled/bitmatrix.c \
 	src/math/compiled/matrix.c \
 	src/math/compiled/voronoi.c \
 	src/world/compiled/biome.c \
-	src/world/compiled/water_distance.c
+	src/world/compiled/water_distance.c \
+	-lm
 
 gcc -DTEST_WATER_DISTANCE \
 	src/math/compiled/matrix.c \
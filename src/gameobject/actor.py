@@ -3,6 +3,7 @@ from src.gameobject.action import Action
 
 from src.math.vector2 import Vector2
 from src.path.path_runner import PathRunner
+from src.path.path_service import PathRequest
 from src.mgmt.listener import Listener
 from src.mgmt.event import Event
 
@@ -21,8 +22,12 @@ class Actor(GameObject, Listener):
 	_dead = False
 
 	_path_runner: PathRunner = None
+	_path_request: PathRequest = None
 	_action: Action = None
 
+	# The action to do once the path being found has been walked.
+	_pending_action: Action = None
+
 	name: str
 
 	motives: ActorMotiveVector = None
@@ -51,8 +56,7 @@ class Actor(GameObject, Listener):
 		if isinstance(event, MoveActorEvent) and event.actor == self:
 			self.set_destination(event.to_position)
 		elif isinstance(event, ActorDoActionEvent) and event.actor == self:
-			self.set_destination(event.action.position)
-			self._action = event.action
+			self.set_destination(event.action.position, event.action)
 		elif event.event_type == 'EnterRabbitHoleEvent' and event.actor == self:
 			self.hidden = True
 		elif event.event_type == 'ExitRabbitHoleEvent' and event.actor == self:
@@ -84,18 +88,63 @@ class Actor(GameObject, Listener):
 		"""Is the actor dead?"""
 		return self.motives.is_dead()
 
-	def set_destination(self, dest):
+	@property
+	def is_finding_path(self):
+		"""Is the actor waiting on a path?"""
+		return self._path_request is not None
+
+	def set_destination(self, dest, action: Action = None):
+		"""
+		Asks for a path to dest, dropping any path asked for or being walked
+		before; the actor waits where it is until the new one arrives. The
+		action, if given, is done at the end of the new path.
+		"""
 		self._action = None
-		from src.path.astar import astar
-		world = self.game_mgr.world
-		astar_path = astar(
-			self.pos, dest, world.terrain, self.game_mgr.is_cell_occupied
+		self._pending_action = action
+		self._path_runner.stop()
+		self._request_path(dest)
+
+	def _request_path(self, dest):
+		if self._path_request is not None:
+			self._path_request.cancel()
+		game_mgr = self.game_mgr
+		self._path_request = game_mgr.paths.request(
+			game_mgr.world.terrain,
+			self.pos,
+			dest,
+			game_mgr.occupancy_snapshot(),
+			game_mgr.occupancy_version,
+			self._found_path
 		)
-		if len(astar_path) == 0:
+
+	def _found_path(self, path):
+		request, self._path_request = self._path_request, None
+		action, self._pending_action = self._pending_action, None
+		if len(path) == 0:
+			return
+		if tuple(path[0]) != tuple(self.pos):
+			# Something moved us while it was being found; try again from
+			# here.
+			self._pending_action = action
+			self._request_path(request.goal)
 			return
-		self._path_runner.path = astar_path
+		self._action = action
+		if len(path) == 1:
+			# Already there.
+			self._finished_path()
+			return
+		self._path_runner.path = path
+
+	def on_remove(self):
+		if self._path_request is not None:
+			self._path_request.cancel()
+			self._path_request = None
+		self._pending_action = None
 
 	def _finished_path(self):
+		# A path being replaced doesn't get to do the new path's action.
+		if self._path_request is not None:
+			return
 		if self._action:
 			self.evt_mgr.pub(self._action.event)
 			self._action = None
@@ -109,7 +158,10 @@ class Actor(GameObject, Listener):
 			self.evt_mgr.pub(ActorDiedEvent(actor=self))
 
 	def tick(self, dt: float, utc: float):
+		before = self.pos
 		self._path_runner.tick(dt * self.speed)
+		if tuple(self.pos) != tuple(before):
+			self._moved()
 		self._tick_motives(dt)
 
 	def image_path(self):
@@ -8,7 +8,7 @@ from src.gameobject.prototype import GameObjectPrototype
 from src.mgmt.event import Event
 
 from src.world.atmosphere import (
-	AtmosphereChangeTransformEvent,
+	AtmosphereContribution,
 	AtmosphereElement
 )
 
@@ -111,6 +111,9 @@ class Flora(GameObject):
 	health: float = 100
 	prototype: FloraPrototype = None
 
+	# What the flora adds to the atmosphere, while it's in the world.
+	_contribution: AtmosphereContribution = None
+
 	def __init__(
 			self,
 			prototype=None,
@@ -127,17 +130,13 @@ class Flora(GameObject):
 		return "assets/img/sprite/palm-tree.png"
 
 
-	def _make_sequestration_event(self, direction = 1):
+	def _sequestration_transform(self):
 		"""
-		Make an event that represents the sequestration of carbon. Use
-		direction = -1 to undo the event.
+		The transform that represents the flora's sequestration of carbon.
 		"""
 		elems = (AtmosphereElement.CARBON, AtmosphereElement.OXYGEN)
 		factor = self.prototype.carbon_sequestration
-		amounts = (factor * direction, factor * direction)
-		return AtmosphereChangeTransformEvent({
-			elems: amounts
-		})
+		return {elems: (factor, factor)}
 
 
 	def is_selectable(self, owner):
@@ -153,11 +152,16 @@ class Flora(GameObject):
 
 
 	def on_init(self):
-		self.evt_mgr.pub(self._make_sequestration_event(1))
+		atmosphere = self.game_mgr.world.atmosphere
+		self._contribution = atmosphere.contribute(
+			transform=self._sequestration_transform()
+		)
 
 
 	def on_remove(self):
-		self.evt_mgr.pub(self._make_sequestration_event(-1))
+		if self._contribution is not None:
+			self._contribution.release()
+			self._contribution = None
 
 
 	def tick(self, dt, utc):
@@ -13,6 +13,7 @@ class GameObject(Tickable):
 	"""
 
 	_pos = (0, 0)
+	_size = (1, 1, 1)
 
 	evt_mgr = None
 	game_mgr = None
@@ -49,6 +50,23 @@ class GameObject(Tickable):
 	@pos.setter
 	def pos(self, new_pos):
 		self._pos = new_pos
+		self._moved()
+
+	@property
+	def size(self):
+		"""
+		Returns the (w, h, z) size of the object.
+		"""
+		return self._size
+
+	@size.setter
+	def size(self, new_size):
+		self._size = new_size
+		self._moved()
+
+	def _moved(self):
+		if self.game_mgr is not None:
+			self.game_mgr.game_object_moved(self)
 
 	@property
 	def pos3(self):
@@ -0,0 +1,3 @@
+from src.gen.batch import main
+
+main()
@@ -0,0 +1,251 @@
+"""
+Generating many planets at once, without a display, to pick scenarios from.
+
+Each planet gets its own seed, is written to a planet file, and is summed up
+(areas, sea level, biomes, and habitability) in an index, so that candidates
+can be filtered without opening a single planet:
+
+	python -m src.gen --count 100 --seed 1000 --out planets/
+
+See `python -m src.gen --help` for everything else.
+"""
+
+import json
+import os
+import random
+import time
+
+from argparse import ArgumentParser
+from concurrent.futures import ProcessPoolExecutor
+from dataclasses import asdict, dataclass, replace
+
+import numpy as np
+
+from src.gen.atmosphere_generator import AtmosphereType
+from src.gen.planet_file import save_world
+from src.gen.world_generator import MakeTerrainOptions, make_world
+from src.world.biome import BIOMES_BY_CODE
+from src.world.world import World
+
+INDEX_NAME = 'index.json'
+
+
+
+@dataclass
+class BatchJob:
+	"""
+	One planet to make.
+	"""
+
+	terrain_options: MakeTerrainOptions
+	atmosphere_type: AtmosphereType
+
+	# Where to write the planet file.
+	path: str
+
+
+
+def planet_summary(world: World) -> dict:
+	"""
+	Returns the statistics we filter planets by, as plain JSON-able values.
+	"""
+	terrain = world.terrain
+	codes, counts = np.unique(terrain.biomes, return_counts=True)
+	return {
+		'width': terrain.width,
+		'height': terrain.height,
+		'land_area': terrain.land_area,
+		'water_area': terrain.water_area,
+		'ice_area': terrain.ice_area,
+		'land_ratio': terrain.land_area / terrain.area,
+		'sea_level': terrain.sea_level(),
+		'biomes': {
+			BIOMES_BY_CODE[code].name: count
+			for code, count in zip(codes.tolist(), counts.tolist())
+		},
+		'habitability': {
+			factor.name: float(value)
+			for factor, value in world.habitability().items()
+		},
+	}
+
+
+def make_planet(job: BatchJob) -> dict:
+	"""
+	Makes, saves, and sums up one planet. Returns its entry in the index.
+	"""
+	start = time.perf_counter()
+	seed = job.terrain_options.seed
+	# The atmosphere is drawn from the global random module; seed it too, so
+	# a seed gives the whole planet and not just its terrain. Each job runs
+	# in a worker process, so this doesn't disturb anybody else.
+	random.seed(seed)
+	world = make_world(
+		terrain_options=job.terrain_options,
+		atmosphere_type=job.atmosphere_type
+	)
+	terrain = world.terrain
+	terrain.update_biomes(world.atmosphere.biome_tprs(terrain.lats))
+	save_world(world, job.path)
+	entry = {
+		'seed': seed,
+		'file': os.path.basename(job.path),
+	}
+	entry.update(planet_summary(world))
+	entry['seconds'] = round(time.perf_counter() - start, 3)
+	return entry
+
+
+def make_jobs(
+		out_dir: str,
+		count: int,
+		first_seed: int,
+		terrain_options: MakeTerrainOptions,
+		atmosphere_type: AtmosphereType
+) -> list[BatchJob]:
+	"""
+	Returns the jobs for `count` planets seeded first_seed, first_seed + 1,
+	and so on.
+	"""
+	return [
+		BatchJob(
+			terrain_options=replace(terrain_options, seed=seed),
+			atmosphere_type=atmosphere_type,
+			path=os.path.join(out_dir, f'planet-{seed}.planet')
+		)
+		for seed in range(first_seed, first_seed + count)
+	]
+
+
+def run_batch(
+		out_dir: str,
+		count: int,
+		first_seed: int = 0,
+		terrain_options: MakeTerrainOptions = None,
+		atmosphere_type: AtmosphereType = AtmosphereType.MARS_LIKE,
+		workers: int = None
+) -> dict:
+	"""
+	Makes the planets in a pool of `workers` processes (as many as there are
+	cores, by default), writes them and their index to out_dir, and returns
+	the index.
+	"""
+	if terrain_options is None:
+		terrain_options = MakeTerrainOptions()
+	os.makedirs(out_dir, exist_ok=True)
+	jobs = make_jobs(
+		out_dir,
+		count,
+		first_seed,
+		terrain_options,
+		atmosphere_type
+	)
+	if workers == 1:
+		planets = [make_planet(job) for job in jobs]
+	else:
+		with ProcessPoolExecutor(max_workers=workers) as pool:
+			planets = list(pool.map(make_planet, jobs))
+	options = asdict(terrain_options)
+	del options['seed']
+	index = {
+		'terrain_options': options,
+		'atmosphere_type': atmosphere_type.name,
+		'planets': planets,
+	}
+	with open(os.path.join(out_dir, INDEX_NAME), 'w', encoding='utf-8') as f:
+		json.dump(index, f, indent='\t')
+	return index
+
+
+def _parser() -> ArgumentParser:
+	parser = ArgumentParser(
+		prog='python -m src.gen',
+		description='Generate seeded planets and an index of their statistics.'
+	)
+	parser.add_argument(
+		'--out',
+		required=True,
+		help='The directory to write the planets and index.json to.'
+	)
+	parser.add_argument(
+		'--count',
+		type=int,
+		default=1,
+		help='How many planets to make.'
+	)
+	parser.add_argument(
+		'--seed',
+		type=int,
+		default=0,
+		help='The seed of the first planet; the rest count up from it.'
+	)
+	parser.add_argument(
+		'--workers',
+		type=int,
+		help='How many planets to make at once (default: one per core).'
+	)
+	parser.add_argument(
+		'--width',
+		type=int,
+		default=MakeTerrainOptions.width,
+		help='The width of the terrain.'
+	)
+	parser.add_argument(
+		'--height',
+		type=int,
+		default=MakeTerrainOptions.height,
+		help='The height of the terrain.'
+	)
+	parser.add_argument(
+		'--ice-cap-size',
+		type=int,
+		default=MakeTerrainOptions.ice_cap_size,
+		help='The size of the ice caps on the terrain.'
+	)
+	parser.add_argument(
+		'--landmass-size',
+		type=int,
+		default=MakeTerrainOptions.landmass_cell_radius,
+		help='The size of the landmasses on the terrain.'
+	)
+	parser.add_argument(
+		'--ocean',
+		action='store_true',
+		help='Give the terrain an ocean.'
+	)
+	parser.add_argument(
+		'--atmosphere',
+		choices=[kind.name for kind in AtmosphereType],
+		default=AtmosphereType.MARS_LIKE.name,
+		help='The kind of atmosphere to give the planets.'
+	)
+	return parser
+
+
+def main(argv=None):
+	"""
+	Runs the command line tool.
+	"""
+	args = _parser().parse_args(argv)
+	options = MakeTerrainOptions(
+		width=args.width,
+		height=args.height,
+		ice_cap_size=args.ice_cap_size,
+		landmass_cell_radius=args.landmass_size,
+		ocean=args.ocean
+	)
+	index = run_batch(
+		args.out,
+		args.count,
+		first_seed=args.seed,
+		terrain_options=options,
+		atmosphere_type=AtmosphereType[args.atmosphere],
+		workers=args.workers
+	)
+	for planet in index['planets']:
+		print(
+			f"{planet['file']}: "
+			f"land {planet['land_ratio']:.1%}, "
+			f"habitability {planet['habitability']['TOTAL']:.2f} "
+			f"({planet['seconds']:.1f}s)"
+		)
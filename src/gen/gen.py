@@ -1,56 +1,18 @@
-from dataclasses import dataclass
 import random
 
 from src.math.vector2 import Vector2
 from src.mgmt.singletons import init_game_manager
 from src.gameobject.lander import Lander
 from src.gameobject.plant_flag import PlantFlag
-from src.world.world import World
-from src.world.astronomy import Astronomy
-
 from src.render.viewport import Viewport
 
-from src.gen.atmosphere_generator import (
-	AtmosphereType,
-	generate_atmosphere_composition
+from src.gen.planet_cache import PlanetCache
+from src.gen.planet_file import load_world
+from src.gen.world_generator import (
+	MakeTerrainOptions,
+	make_terrain,
+	make_world,
 )
-from src.gen.terrain_generator import TerrainGenerator
-
-@dataclass
-class MakeTerrainOptions:
-	"""Options for making terrain."""
-	width: int = 512
-	height: int = 256
-	ice_cap_size: int = 0
-	landmass_cell_radius: int = 5
-	ocean: bool = False
-
-
-def make_terrain(options: MakeTerrainOptions = None):
-	"""Create a terrain."""
-	if options is None:
-		options = MakeTerrainOptions()
-	tgen = TerrainGenerator(width=options.width, height=options.height)
-	if options.ice_cap_size:
-		tgen.set_ice_caps(cells_tall=options.ice_cap_size)
-	tgen.set_landmasses(cell_radius=options.landmass_cell_radius)
-	if options.ocean:
-		tgen.set_ocean()
-	return tgen.make()
-
-
-def make_world(
-		terrain_options: MakeTerrainOptions = None,
-		atmosphere_type = AtmosphereType.MARS_LIKE,
-):
-	terrain = make_terrain(options=terrain_options)
-	world = World(
-		terrain,
-		astronomy=Astronomy(),
-		atmosphere_composition=generate_atmosphere_composition(atmosphere_type)
-	)
-	return world
-
 
 def make_plant_flag(game_mgr, lz_position=None, player_id=1):
 	"""Create the flag the player plants."""
@@ -89,11 +51,25 @@ def make_game(
 		on_quit = None,
 		screen = None,
 		epoch = None,
+		planet_path: str = None,
+		planet_cache: PlanetCache = None,
+		terrain_workers: int = None,
 ):
-	"""Create the game."""
+	"""
+	Create the game. If a planet file is given, the world is loaded from it
+	instead of generated. Otherwise, the terrain comes from the planet cache
+	if one is given and it has the terrain.
+	"""
 	if window_dimensions is None:
 		raise ValueError("window_dimensions must be provided.")
-	world = make_world(terrain_options=terrain_options)
+	if planet_path is not None:
+		world = load_world(planet_path)
+	else:
+		world = make_world(
+			terrain_options=terrain_options,
+			terrain_cache=planet_cache,
+			terrain_workers=terrain_workers
+		)
 	vp = Viewport(window_dimensions, world.terrain)
 	game_mgr = init_game_manager(
 		world,
@@ -0,0 +1,91 @@
+"""
+This module keeps generated terrain on disk, so that asking for the same
+planet again (the same seed and options) opens it instead of generating it.
+
+Each terrain is a planet file named after a hash of what made it, so there's
+no index to keep in sync: a planet is in the cache if and only if its file
+is.
+"""
+
+import hashlib
+import json
+import os
+import tempfile
+
+from dataclasses import asdict
+
+from src.gen.planet_file import PlanetFileError, load_terrain, save_terrain
+from src.world.terrain import Terrain
+
+# Bump this whenever a change to generation means a seed makes a different
+# planet than it used to, so that stale planets are never handed out.
+GENERATOR_VERSION = 2
+
+SUFFIX = '.planet'
+
+
+
+def options_key(options) -> str:
+	"""
+	Returns the hash that names the planet made with the given options (a
+	dataclass, such as `MakeTerrainOptions`).
+	"""
+	content = json.dumps(
+		{'generator': GENERATOR_VERSION, 'options': asdict(options)},
+		sort_keys=True
+	)
+	return hashlib.sha256(content.encode('utf-8')).hexdigest()
+
+
+
+class PlanetCache:
+	"""
+	A directory of generated terrain, keyed by the options that made it.
+
+	Only options with a seed are cached; without one, every planet is meant
+	to be different.
+	"""
+
+	directory: str
+
+	def __init__(self, directory: str):
+		self.directory = directory
+
+
+	def path(self, options) -> str:
+		"""
+		Returns where the planet made with the given options is kept.
+		"""
+		return os.path.join(self.directory, options_key(options) + SUFFIX)
+
+
+	def get(self, options) -> Terrain:
+		"""
+		Returns the cached terrain for the given options, or None if there
+		isn't one (or it can't be read).
+		"""
+		if options.seed is None:
+			return None
+		try:
+			return load_terrain(self.path(options))
+		except (OSError, PlanetFileError):
+			return None
+
+
+	def put(self, options, terrain: Terrain):
+		"""
+		Caches the terrain made with the given options.
+		"""
+		if options.seed is None:
+			return
+		os.makedirs(self.directory, exist_ok=True)
+		# Write to a temporary file first, so that nobody ever opens half a
+		# planet.
+		fd, tmp_path = tempfile.mkstemp(suffix=SUFFIX, dir=self.directory)
+		os.close(fd)
+		try:
+			save_terrain(terrain, tmp_path)
+			os.replace(tmp_path, self.path(options))
+		except BaseException:
+			os.remove(tmp_path)
+			raise
@@ -0,0 +1,199 @@
+"""
+This module saves worlds to, and loads them from, planet files, so a planet
+can be generated once and then opened instantly (and the same planet can be
+opened again to reproduce a bug).
+
+A planet file is a small header followed by the terrain's planes, stored raw
+so that loading can memory-map them instead of reading and parsing:
+
+	header      magic, version, width, height, metadata length (little endian)
+	metadata    JSON: the atmosphere and astronomy
+	planes      land, water, ice, biomes, height deltas, water distances (xy
+	            and z), in that order, each starting on a 64 byte boundary
+
+The planes are mapped copy-on-write, so the game can change the terrain
+freely without touching the file.
+"""
+
+import json
+import struct
+
+import numpy as np
+
+from src.world.astronomy import Astronomy
+from src.world.atmosphere import AtmosphereElement
+from src.world.terrain import (
+	BIOME_DTYPE,
+	HEIGHT_DELTA_DTYPE,
+	HEIGHT_DTYPE,
+	Terrain,
+)
+from src.world.world import World
+
+MAGIC = b'XPLANET\0'
+VERSION = 1
+
+_HEADER = struct.Struct('<8sIIIQ')
+_ALIGN = 64
+
+# (name, dtype, planes per cell); every plane is stored row-major.
+_PLANES = (
+	('land', np.dtype(HEIGHT_DTYPE).newbyteorder('<'), 1),
+	('water', np.dtype(HEIGHT_DTYPE).newbyteorder('<'), 1),
+	('ice', np.dtype(HEIGHT_DTYPE).newbyteorder('<'), 1),
+	('biomes', np.dtype(BIOME_DTYPE), 1),
+	('height_deltas', np.dtype(HEIGHT_DELTA_DTYPE), 4),
+	('water_distance_xy', np.dtype('<i4'), 1),
+	('water_distance_z', np.dtype('<i4'), 1),
+)
+
+
+
+class PlanetFileError(ValueError):
+	"""
+	Raised for files that aren't planet files we can read.
+	"""
+
+
+
+def _aligned(offset: int) -> int:
+	return -(-offset // _ALIGN) * _ALIGN
+
+
+def _plane_layout(width: int, height: int, start: int):
+	"""
+	Yields (name, dtype, shape, offset) for each plane.
+	"""
+	offset = start
+	for name, dtype, depth in _PLANES:
+		offset = _aligned(offset)
+		shape = (height, width) if depth == 1 else (height, width, depth)
+		yield name, dtype, shape, offset
+		offset += dtype.itemsize * width * height * depth
+
+
+def _world_metadata(world: World) -> dict:
+	return {
+		'atmosphere': {
+			element.name: value
+			for element, value in world.atmosphere.average.items()
+		},
+		'astronomy': {
+			'star_luminosity': world.astronomy.star_luminosity,
+			'orbital_radius': world.astronomy.orbital_radius,
+		},
+	}
+
+
+def _write(terrain: Terrain, metadata: dict, path: str):
+	field = terrain.water_distances
+	planes = {
+		'land': terrain.map,
+		'water': terrain.water,
+		'ice': terrain.ice,
+		'biomes': terrain.biomes,
+		'height_deltas': terrain._height_deltas,
+		'water_distance_xy': field.xy,
+		'water_distance_z': field.z,
+	}
+	metadata = json.dumps(metadata).encode('utf-8')
+	header = _HEADER.pack(
+		MAGIC,
+		VERSION,
+		terrain.width,
+		terrain.height,
+		len(metadata)
+	)
+	with open(path, 'wb') as f:
+		f.write(header)
+		f.write(metadata)
+		start = _HEADER.size + len(metadata)
+		layout = _plane_layout(terrain.width, terrain.height, start)
+		for name, dtype, shape, offset in layout:
+			f.write(b'\0' * (offset - f.tell()))
+			plane = np.ascontiguousarray(planes[name], dtype=dtype)
+			f.write(plane.tobytes())
+
+
+def save_world(world: World, path: str):
+	"""
+	Writes the world's terrain, atmosphere, and astronomy to a planet file.
+	"""
+	_write(world.terrain, _world_metadata(world), path)
+
+
+def save_terrain(terrain: Terrain, path: str):
+	"""
+	Writes just a terrain to a planet file. It can be opened with
+	`load_terrain`, but not `load_world`.
+	"""
+	_write(terrain, {}, path)
+
+
+def _read_header(path: str):
+	with open(path, 'rb') as f:
+		header = f.read(_HEADER.size)
+		if len(header) < _HEADER.size:
+			raise PlanetFileError(f"{path} is too short to be a planet file.")
+		magic, version, width, height, metadata_len = _HEADER.unpack(header)
+		if magic != MAGIC:
+			raise PlanetFileError(f"{path} is not a planet file.")
+		if version != VERSION:
+			raise PlanetFileError(
+				f"{path} is a version {version} planet file; "
+				f"we can only read version {VERSION}."
+			)
+		metadata = json.loads(f.read(metadata_len).decode('utf-8'))
+	return width, height, _HEADER.size + metadata_len, metadata
+
+
+def _map_terrain(path, width, height, start) -> Terrain:
+	planes = {}
+	for name, dtype, shape, offset in _plane_layout(width, height, start):
+		try:
+			planes[name] = np.memmap(
+				path,
+				dtype=dtype,
+				mode='c',
+				offset=offset,
+				shape=shape
+			)
+		except ValueError as e:
+			raise PlanetFileError(f"{path} is truncated.") from e
+	return Terrain.from_planes(
+		planes['land'],
+		planes['water'],
+		planes['ice'],
+		biomes=planes['biomes'],
+		height_deltas=planes['height_deltas'],
+		water_distances=(
+			planes['water_distance_xy'],
+			planes['water_distance_z']
+		)
+	)
+
+
+def load_terrain(path: str) -> Terrain:
+	"""
+	Opens the terrain in a planet file. The planes are memory-mapped rather
+	than read, so this takes about as long for a huge planet as a tiny one.
+	"""
+	width, height, start, _ = _read_header(path)
+	return _map_terrain(path, width, height, start)
+
+
+def load_world(path: str) -> World:
+	"""
+	Opens the world in a planet file.
+	"""
+	width, height, start, metadata = _read_header(path)
+	if 'astronomy' not in metadata:
+		raise PlanetFileError(f"{path} only has terrain in it.")
+	return World(
+		_map_terrain(path, width, height, start),
+		astronomy=Astronomy(**metadata['astronomy']),
+		atmosphere_composition={
+			AtmosphereElement[name]: value
+			for name, value in metadata['atmosphere'].items()
+		}
+	)
@@ -1,12 +1,15 @@
 import numpy as np
-import random
-
-from collections import defaultdict
 
 from src.world.terrain import Terrain
+from src.math.random import random_2d_integers_numpy
 from src.math.voronoi import make_voronoi
-from src.math.adj import select_adj_degree, bool_adj_from_labels
-from src.math.matrix import smooth_matrix, round_matrix_to_int
+from src.math.adj import select_adj_degree, sparse_adj_from_labels
+from src.math.matrix import smooth_array
+from src.gen.tiled_generation import (
+	DEFAULT_BAND_ROWS,
+	tiled_height_maps,
+	tiled_voronoi,
+)
 
 TERRAIN_X = 256
 TERRAIN_Y = TERRAIN_X // 2
@@ -22,6 +25,19 @@ LAND_HEIGHT = 10
 class TerrainGenerator:
 	"""
 	Generate terrain with voronoi cells.
+
+	Everything about a voronoi cell (its land, ice, and whether it's sea) is
+	decided per label and kept in arrays indexed by label. The maps are then
+	made in one go by indexing those arrays with the label of every cell,
+	e.g. `land_heights[voronoi]`.
+
+	Every random choice is drawn from one generator made from the seed, so
+	the same seed and settings always make the same terrain. Without a seed,
+	every terrain is different.
+
+	Given more than one worker, the per-cell stages (labeling, heights,
+	smoothing, and the ocean) run a band of rows at a time in that many
+	processes; see `tiled_generation`. The terrain is the same either way.
 	"""
 
 	_ice_caps = False
@@ -36,7 +52,15 @@ class TerrainGenerator:
 	_ocean = False
 	_sea_level = 0
 
-	def __init__(self, width = None, height = None, avg_cell_area = 64):
+	def __init__(
+			self,
+			width = None,
+			height = None,
+			avg_cell_area = 64,
+			seed: int = None,
+			workers: int = None,
+			band_rows: int = DEFAULT_BAND_ROWS
+	):
 		if width is None:
 			width = TERRAIN_X
 		if height is None:
@@ -45,6 +69,10 @@ class TerrainGenerator:
 		self.width = width
 		self.height = height
 		self.dimensions = (width, height)
+		self.seed = seed
+		self._rng = np.random.default_rng(seed)
+		self.workers = workers
+		self.band_rows = band_rows
 
 		self.land_map = np.zeros((height, width))
 		self.water_map = np.zeros((height, width))
@@ -53,15 +81,33 @@ class TerrainGenerator:
 		self._make_voronoi(avg_area=avg_cell_area)
 
 
+	@property
+	def _tiled(self) -> bool:
+		return self.workers is not None and self.workers > 1
+
+
 	def _make_voronoi(self, avg_area = 64):
 		n_points = (self.width * self.height) // avg_area
-		self.voronoi = make_voronoi(self.dimensions, avg_area)
-		self.voronoi_adj = bool_adj_from_labels(self.voronoi, n_points)
+		if self._tiled:
+			points = random_2d_integers_numpy(
+				n_points,
+				self.width,
+				self.height,
+				seed=self._rng
+			)
+			self.voronoi = tiled_voronoi(
+				self.dimensions,
+				points,
+				workers=self.workers,
+				band_rows=self.band_rows
+			)
+		else:
+			self.voronoi = make_voronoi(self.dimensions, avg_area, seed=self._rng)
+		self.voronoi_adj = sparse_adj_from_labels(self.voronoi, n_points)
 		self.voronoi_remaining = set(range(n_points))
-		self.land_heights = defaultdict(int)
-		self.water_heights = defaultdict(int)
-		self.ice_heights = defaultdict(int)
-		self.water_cells = set()
+		self.land_heights = np.zeros(n_points, dtype=np.int64)
+		self.ice_heights = np.zeros(n_points, dtype=np.int64)
+		self.is_sea = np.zeros(n_points, dtype=bool)
 
 
 	def set_ice_caps(
@@ -97,7 +143,8 @@ class TerrainGenerator:
 
 		to_ice = set()
 		to_buffer = set()
-		for label in (self.voronoi[0] + self.voronoi[-1]):
+		polar = np.unique(np.concatenate([self.voronoi[0], self.voronoi[-1]]))
+		for label in polar.tolist():
 			if label not in self.voronoi_remaining:
 				continue
 			to_ice.add(label)
@@ -107,12 +154,10 @@ class TerrainGenerator:
 
 		to_buffer -= to_ice
 
-		for ice_label in to_ice:
-			self.ice_heights[ice_label] = ice_thickness
-			self.land_heights[ice_label] = SEABED_HEIGHT
-		for buffer_label in to_buffer:
-			self.land_heights[buffer_label] = SEABED_HEIGHT
-			self.water_cells.add(buffer_label)
+		self.ice_heights[list(to_ice)] = ice_thickness
+		self.land_heights[list(to_ice)] = SEABED_HEIGHT
+		self.land_heights[list(to_buffer)] = SEABED_HEIGHT
+		self.is_sea[list(to_buffer)] = True
 
 		self.voronoi_remaining -= to_ice | to_buffer
 
@@ -146,19 +191,18 @@ class TerrainGenerator:
 		buffer_radius = self._landmass_buffer
 		v_adj = self.voronoi_adj
 		while self.voronoi_remaining:
-			label = random.choice(list(self.voronoi_remaining))
+			remaining = list(self.voronoi_remaining)
+			label = remaining[self._rng.integers(len(remaining))]
 			self.voronoi_remaining.remove(label)
 			to_set_land = select_adj_degree(v_adj, label, degree=cell_radius)
 			to_set_land &= self.voronoi_remaining
 			to_set_land.add(label)
-			for land_label in to_set_land:
-				self.land_heights[land_label] = land_thickness
+			self.land_heights[list(to_set_land)] = land_thickness
 			to_set_sea = select_adj_degree(v_adj, label, degree=buffer_radius)
 			to_set_sea -= to_set_land
 			to_set_sea &= self.voronoi_remaining
-			for sea_label in to_set_sea:
-				self.land_heights[sea_label] = SEABED_HEIGHT
-				self.water_cells.add(sea_label)
+			self.land_heights[list(to_set_sea)] = SEABED_HEIGHT
+			self.is_sea[list(to_set_sea)] = True
 			self.voronoi_remaining -= to_set_sea | to_set_land
 
 
@@ -174,23 +218,28 @@ class TerrainGenerator:
 	def _make_ocean(self):
 		if not self._ocean:
 			return
-		for y in range(self.height):
-			for x in range(self.width):
-				label = self.voronoi[y][x]
-				if label in self.water_cells:
-					self.water_map[y][x] = self._sea_level - self.land_map[y][x]
-				else:
-					self.water_map[y][x] = 0
+		self.water_map = np.where(
+			self.is_sea[self.voronoi],
+			self._sea_level - self.land_map,
+			0
+		)
 
 
 	def _apply_height_maps(self):
-		for y in range(self.height):
-			for x in range(self.width):
-				label = self.voronoi[y][x]
-				self.land_map[y][x] = self.land_heights[label]
-				self.ice_map[y][x] = self.ice_heights[label]
-		self.land_map = smooth_matrix(self.land_map)
-		self.land_map = round_matrix_to_int(self.land_map)
+		self.ice_map = self.ice_heights[self.voronoi]
+		self.land_map = np.rint(smooth_array(self.land_heights[self.voronoi]))
+
+
+	def _make_tiled_maps(self):
+		self.land_map, self.ice_map, self.water_map = tiled_height_maps(
+			self.voronoi,
+			self.land_heights,
+			self.ice_heights,
+			is_sea=self.is_sea if self._ocean else None,
+			sea_level=self._sea_level,
+			workers=self.workers,
+			band_rows=self.band_rows
+		)
 
 
 	def make(self):
@@ -200,8 +249,11 @@ class TerrainGenerator:
 
 		self._make_ice_caps()
 		self._make_landmasses()
-		self._apply_height_maps()
-		self._make_ocean()
+		if self._tiled:
+			self._make_tiled_maps()
+		else:
+			self._apply_height_maps()
+			self._make_ocean()
 		return Terrain(
 			self.land_map,
 			watermap=self.water_map,
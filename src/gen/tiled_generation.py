@@ -0,0 +1,216 @@
+"""
+This module runs the per-cell stages of terrain generation (labeling the
+voronoi cells, and turning labels into land, ice, and water heights) on
+horizontal bands of the map in a pool of processes, for planets too big to
+generate comfortably on one core.
+
+The bands are written straight into arrays in shared memory, so nothing the
+size of the map is ever pickled. The x-axis needs no special care, since
+every band spans the whole width. Smoothing looks one row up and down, so
+each band reads a halo row on either side and keeps only its own rows.
+
+Every stage gives a cell exactly what the serial generator gives it (voronoi
+ties go to the lowest label however the map is split), so a seed makes the
+same planet either way.
+"""
+
+from concurrent.futures import ProcessPoolExecutor
+from multiprocessing.shared_memory import SharedMemory
+
+import numpy as np
+
+from src.math.matrix import smooth_array
+from src.math.voronoi import voronoi_rows, voronoi_tree
+
+# How many rows of the map each task covers.
+DEFAULT_BAND_ROWS = 128
+
+# Smoothing reaches this many rows up and down.
+HALO_ROWS = 1
+
+# (shared memory name, shape, dtype string); enough to open the array again
+# in another process.
+ArraySpec = tuple[str, tuple[int, ...], str]
+
+# Shared arrays (and k-d trees) this worker process has already opened, so
+# that every band after the first gets them for free.
+_opened = {}
+_trees = {}
+
+
+
+class SharedArrays:
+	"""
+	Makes numpy arrays in shared memory, and frees them all on exit.
+	"""
+
+	_blocks: list[SharedMemory]
+
+	def __init__(self):
+		self._blocks = []
+
+
+	def __enter__(self):
+		return self
+
+
+	def __exit__(self, *exc):
+		for block in self._blocks:
+			block.close()
+			block.unlink()
+		self._blocks = []
+
+
+	def empty(self, shape, dtype) -> tuple[ArraySpec, np.ndarray]:
+		"""
+		Returns the spec of a new shared array and a view of it.
+		"""
+		dtype = np.dtype(dtype)
+		size = max(1, int(np.prod(shape)) * dtype.itemsize)
+		block = SharedMemory(create=True, size=size)
+		self._blocks.append(block)
+		array = np.ndarray(shape, dtype=dtype, buffer=block.buf)
+		return (block.name, tuple(shape), dtype.str), array
+
+
+	def copy(self, array: np.ndarray) -> ArraySpec:
+		"""
+		Returns the spec of a new shared array holding a copy of the array.
+		"""
+		array = np.asarray(array)
+		spec, shared = self.empty(array.shape, array.dtype)
+		shared[...] = array
+		return spec
+
+
+
+def _open(spec: ArraySpec) -> np.ndarray:
+	"""
+	Returns a view of a shared array, in a worker process.
+	"""
+	name, shape, dtype = spec
+	if name not in _opened:
+		_opened[name] = SharedMemory(name=name)
+	return np.ndarray(shape, dtype=np.dtype(dtype), buffer=_opened[name].buf)
+
+
+def bands(height: int, band_rows: int = DEFAULT_BAND_ROWS):
+	"""
+	Yields the (y0, y1) row ranges that cover a map of the given height.
+	"""
+	for y0 in range(0, height, band_rows):
+		yield y0, min(y0 + band_rows, height)
+
+
+def _label_band(points_spec, labels_spec, y0, y1):
+	points = _open(points_spec)
+	labels = _open(labels_spec)
+	height, width = labels.shape
+	name = points_spec[0]
+	if name not in _trees:
+		_trees[name] = voronoi_tree((width, height), points)
+	labels[y0:y1] = voronoi_rows(
+		_trees[name],
+		len(points),
+		width,
+		y0,
+		y1,
+		workers=1
+	)
+
+
+def _height_band(specs, sea_level, y0, y1):
+	"""
+	Fills rows [y0, y1) of the land, ice, and water maps from the labels.
+	"""
+	labels, land_heights, ice_heights, is_sea, land, ice, water = (
+		None if spec is None else _open(spec) for spec in specs
+	)
+	height = labels.shape[0]
+	lo = max(y0 - HALO_ROWS, 0)
+	hi = min(y1 + HALO_ROWS, height)
+	smoothed = smooth_array(land_heights[labels[lo:hi]])
+	land[y0:y1] = np.rint(smoothed[y0 - lo:y1 - lo])
+	ice[y0:y1] = ice_heights[labels[y0:y1]]
+	if is_sea is None:
+		water[y0:y1] = 0
+	else:
+		water[y0:y1] = np.where(
+			is_sea[labels[y0:y1]],
+			sea_level - land[y0:y1],
+			0
+		)
+
+
+def _run_bands(fn, args, height, workers, band_rows):
+	with ProcessPoolExecutor(max_workers=workers) as pool:
+		futures = [
+			pool.submit(fn, *args, y0, y1)
+			for y0, y1 in bands(height, band_rows)
+		]
+		for future in futures:
+			# Re-raises anything that went wrong in a worker.
+			future.result()
+
+
+def tiled_voronoi(
+		dimensions,
+		points,
+		workers: int = None,
+		band_rows: int = DEFAULT_BAND_ROWS
+) -> np.ndarray:
+	"""
+	The same labels as `voronoi_from_points`, worked out a band at a time in
+	a pool of `workers` processes (as many as there are cores, by default).
+	"""
+	width, height = dimensions
+	with SharedArrays() as shared:
+		points_spec = shared.copy(np.asarray(points, dtype=np.int64))
+		labels_spec, labels = shared.empty((height, width), np.intp)
+		_run_bands(
+			_label_band,
+			(points_spec, labels_spec),
+			height,
+			workers,
+			band_rows
+		)
+		return labels.copy()
+
+
+def tiled_height_maps(
+		labels: np.ndarray,
+		land_heights: np.ndarray,
+		ice_heights: np.ndarray,
+		is_sea: np.ndarray = None,
+		sea_level: int = 0,
+		workers: int = None,
+		band_rows: int = DEFAULT_BAND_ROWS
+) -> tuple[np.ndarray, np.ndarray, np.ndarray]:
+	"""
+	Returns the (land, ice, water) maps for the labels, smoothing the land
+	and filling cells whose label is sea up to sea level. Without is_sea,
+	there's no ocean. The maps are the same as `TerrainGenerator` makes on
+	its own.
+	"""
+	shape = labels.shape
+	with SharedArrays() as shared:
+		land_spec, land = shared.empty(shape, np.float64)
+		ice_spec, ice = shared.empty(shape, ice_heights.dtype)
+		water_spec, water = shared.empty(shape, np.float64)
+		specs = (
+			shared.copy(labels),
+			shared.copy(land_heights),
+			shared.copy(ice_heights),
+			None if is_sea is None else shared.copy(is_sea),
+			land_spec,
+			ice_spec,
+			water_spec,
+		)
+		_run_bands(
+			_height_band,
+			(specs, sea_level),
+			shape[0],
+			workers,
+			band_rows
+		)
+		return land.copy(), ice.copy(), water.copy()
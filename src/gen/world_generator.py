@@ -0,0 +1,79 @@
+"""
+Making whole worlds: terrain, atmosphere, and astronomy. Nothing here needs
+a display, so it can run headless (see `batch`).
+"""
+
+from dataclasses import dataclass
+
+from src.world.world import World
+from src.world.astronomy import Astronomy
+
+from src.gen.atmosphere_generator import (
+	AtmosphereType,
+	generate_atmosphere_composition
+)
+from src.gen.planet_cache import PlanetCache
+from src.gen.terrain_generator import TerrainGenerator
+
+@dataclass
+class MakeTerrainOptions:
+	"""Options for making terrain."""
+	width: int = 512
+	height: int = 256
+	ice_cap_size: int = 0
+	landmass_cell_radius: int = 5
+	ocean: bool = False
+	# The same seed and options always make the same terrain.
+	seed: int = None
+
+
+def make_terrain(
+		options: MakeTerrainOptions = None,
+		cache: PlanetCache = None,
+		workers: int = None
+):
+	"""
+	Create a terrain. If a cache is given, a seeded terrain is opened from it
+	when it's already there, and added to it when it isn't. With more than
+	one worker, generation is split across that many processes.
+	"""
+	if options is None:
+		options = MakeTerrainOptions()
+	if cache is not None:
+		terrain = cache.get(options)
+		if terrain is not None:
+			return terrain
+	tgen = TerrainGenerator(
+		width=options.width,
+		height=options.height,
+		seed=options.seed,
+		workers=workers
+	)
+	if options.ice_cap_size:
+		tgen.set_ice_caps(cells_tall=options.ice_cap_size)
+	tgen.set_landmasses(cell_radius=options.landmass_cell_radius)
+	if options.ocean:
+		tgen.set_ocean()
+	terrain = tgen.make()
+	if cache is not None:
+		cache.put(options, terrain)
+	return terrain
+
+
+def make_world(
+		terrain_options: MakeTerrainOptions = None,
+		atmosphere_type = AtmosphereType.MARS_LIKE,
+		terrain_cache: PlanetCache = None,
+		terrain_workers: int = None,
+):
+	terrain = make_terrain(
+		options=terrain_options,
+		cache=terrain_cache,
+		workers=terrain_workers
+	)
+	world = World(
+		terrain,
+		astronomy=Astronomy(),
+		atmosphere_composition=generate_atmosphere_composition(atmosphere_type)
+	)
+	return world
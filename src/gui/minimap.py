@@ -1,32 +1,39 @@
 import pygame
 
 from src.gui.gui import GuiElement
+from src.world.terrain_journal import TerrainLayer
 
 _ICE_COLOR = (250, 250, 250)
 _OCEAN_COLOR = (0, 0, 200)
 
-def minimap_image(terrain, surface_dimensions):
+def minimap_cell_color(terrain, p):
 	"""
-	Render a minimap image of the world.
+	The color of cell p = (x, y) on the minimap.
 	"""
-
-	surface = pygame.Surface(terrain.dimensions)
-
+	x, y = p
+	if terrain.is_cell_ice(p):
+		return _ICE_COLOR
+	if terrain.is_cell_water(p):
+		return _OCEAN_COLOR
 	d_height = terrain.max_tile_height - terrain.min_tile_height
-	min_tile_height = terrain.min_tile_height
+	cell_p = (terrain.map[y][x] - terrain.min_tile_height) / d_height
+	return (int((cell_p * 128) + 127), 0, 0)
 
+def minimap_base(terrain):
+	"""
+	Render the minimap at one pixel per cell.
+	"""
+	surface = pygame.Surface(terrain.dimensions)
 	for x in range(terrain.width):
 		for y in range(terrain.height):
-			cell = terrain.map[y][x]
-			cell_p = (cell - min_tile_height) / d_height
-			color_scale = int((cell_p * 128) + 127)
-			color = (color_scale, 0, 0)
-			if terrain.is_cell_ice((x, y)):
-				color = _ICE_COLOR
-			elif terrain.is_cell_water((x, y)):
-				color = _OCEAN_COLOR
-			surface.set_at((x, y), color)
+			surface.set_at((x, y), minimap_cell_color(terrain, (x, y)))
+	return surface
 
+def minimap_image(terrain, surface_dimensions):
+	"""
+	Render a minimap image of the world.
+	"""
+	surface = minimap_base(terrain)
 	surface = pygame.transform.scale(surface, surface_dimensions)
 	return surface.convert()
 
@@ -35,9 +42,13 @@ class MiniMap(GuiElement):
 	A clickable map of the world.
 	"""
 
+	_base = None
 	_surface = None
 	_draw_surface = None
 
+	# Tells us which cells to repaint; None if the terrain has no journal.
+	_terrain_changes = None
+
 	world = None
 	viewport = None
 
@@ -48,9 +59,32 @@ class MiniMap(GuiElement):
 		self._prepare_minimap()
 
 	def _prepare_minimap(self):
-		self._surface = minimap_image(self.world.terrain, self.dimensions)
+		terrain = self.world.terrain
+		if hasattr(terrain, 'journal'):
+			self._terrain_changes = terrain.journal.subscribe(
+				TerrainLayer.HEIGHT
+			)
+		self._base = minimap_base(terrain)
+		self._rescale()
+
+	def _rescale(self):
+		self._surface = pygame.transform.scale(
+			self._base,
+			self.dimensions
+		).convert()
 		self._draw_surface = self._surface.copy()
 
+	def _sync_terrain(self):
+		"""
+		Repaint the cells whose land, water, or ice changed.
+		"""
+		if self._terrain_changes is None or not self._terrain_changes.has_changes:
+			return
+		terrain = self.world.terrain
+		for p in self._terrain_changes.pull_cells():
+			self._base.set_at(p, minimap_cell_color(terrain, p))
+		self._rescale()
+
 	def _draw_viewport(self):
 		# TODO(jm) -- need to make this sensitive to zoom.
 		cx, cy = self.viewport.camera_pos
@@ -67,6 +101,7 @@ class MiniMap(GuiElement):
 		)
 
 	def my_draw(self, screen):
+		self._sync_terrain()
 		self._draw_surface = self._surface.copy()
 		self._draw_viewport()
 		screen.blit(self._draw_surface, self.pygame_rect)
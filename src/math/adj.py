@@ -3,9 +3,14 @@ This module contains functions for working with the concept of adjacency,
 including: (1) working with adjacency matrices, (2) determining whether
 two cells are adjacent, and (3) finding cells that are a certain number of
 steps away from a given cell.
+
+Adjacency between the labels of a labeled matrix (e.g. the regions of a
+voronoi diagram) is kept as a sparse CSR matrix, since each label only
+borders a handful of others.
 """
 
-from collections import deque
+import numpy as np
+from scipy.sparse import csr_matrix, issparse
 
 from src.math.direction import (
 	is_direction_diagonal,
@@ -59,6 +64,60 @@ def adj_cells(d, p, loop_x = True, loop_y = False, diag = False):
 	)
 
 
+def _label_pairs(matrix, dx, dy, loop_x, loop_y):
+	"""
+	Returns the labels of every cell, and of the cell (dx, dy) from it, as
+	two flat arrays. Pairs that would step off a non-looped edge are left out.
+	"""
+	h, w = matrix.shape
+	shifted = np.roll(matrix, (-dy, -dx), axis=(0, 1))
+	valid = np.ones((h, w), dtype=bool)
+	if not loop_x and dx:
+		xs = np.arange(w) + dx
+		valid &= ((xs >= 0) & (xs < w))[None, :]
+	if not loop_y and dy:
+		ys = np.arange(h) + dy
+		valid &= ((ys >= 0) & (ys < h))[:, None]
+	return matrix[valid], shifted[valid]
+
+
+def sparse_adj_from_labels(
+		matrix,
+		n_labels,
+		loop_x = True,
+		loop_y = False,
+		diag = False
+) -> csr_matrix:
+	"""
+	Returns a symmetric (n_labels * n_labels) boolean CSR matrix in which
+	[a, b] is True if a cell labeled a is next to a cell labeled b. loop_x,
+	loop_y, and diag mean the same as for `adj_cells`.
+	"""
+	matrix = np.asarray(matrix)
+	deltas = [(1, 0), (0, 1)]
+	if diag:
+		deltas += [(1, 1), (-1, 1)]
+	pairs = [
+		_label_pairs(matrix, dx, dy, loop_x, loop_y)
+		for dx, dy in deltas
+	]
+	a = np.concatenate([p for p, _ in pairs]).astype(np.int64)
+	b = np.concatenate([q for _, q in pairs]).astype(np.int64)
+	differ = a != b
+	a = a[differ]
+	b = b[differ]
+
+	# Each edge both ways, once, sorted by row then column.
+	keys = np.unique(np.concatenate([a * n_labels + b, b * n_labels + a]))
+	rows, cols = np.divmod(keys, n_labels)
+	indptr = np.zeros(n_labels + 1, dtype=np.int64)
+	np.cumsum(np.bincount(rows, minlength=n_labels), out=indptr[1:])
+	return csr_matrix(
+		(np.ones(len(cols), dtype=bool), cols, indptr),
+		shape=(n_labels, n_labels)
+	)
+
+
 def bool_adj_from_labels(
 		matrix,
 		n_labels,
@@ -67,57 +126,48 @@ def bool_adj_from_labels(
 		diag = False
 ):
 	"""
-	Returns an adj matrix given a labeled matrix. loop_x, loop_y, and diag are
-	passed to `adj_cells` - see documentation for that function.
+	Returns an adj matrix, as a list of lists, given a labeled matrix. loop_x,
+	loop_y, and diag are passed to `adj_cells` - see documentation for that
+	function.
+
+	This is n_labels^2 booleans; prefer `sparse_adj_from_labels` for anything
+	but small matrices.
 	"""
-	adj = [[False] * n_labels for i in range(n_labels)]
-	w = len(matrix[0])
-	h = len(matrix)
-	d = (w, h)
-	for y in range(h):
-		for x in range(w):
-			if x == y:
-				continue
-			p = (x, y)
-			cells = adj_cells(d, p, loop_x=loop_x, loop_y=loop_y, diag=diag)
-			for q in cells:
-				a, b = q
-				val_p = matrix[y][x]
-				val_q = matrix[b][a]
-				if val_p == val_q:
-					continue
-				adj[val_p][val_q] = True
-				adj[val_q][val_p] = True
-	return adj
+	adj = sparse_adj_from_labels(
+		matrix,
+		n_labels,
+		loop_x=loop_x,
+		loop_y=loop_y,
+		diag=diag
+	)
+	return adj.toarray().tolist()
 
 
 def select_adj_degree(b_adj, p, degree=1):
 	"""
-	Given an adjacency matrix and starting point index p, returns
-	a set of point indexes that are `degree` degrees removed from
-	p or less.
-	"""
-	visited = set([p])
-	queue = deque([(p, 0)])
-	result = set()
-
-	while queue:
-		node, dist = queue.popleft()
-
-		# If within the degree limit, add to result set
-		if dist <= degree:
-			result.add(node)
-
-		# Stop if we have reached the max degree for this path
-		if dist == degree:
-			continue
-
-		# Check neighbors
-		for neighbor, connected in enumerate(b_adj[node]):
-			if connected and neighbor not in visited:
-				visited.add(neighbor)
-				queue.append((neighbor, dist + 1))
-	return result
+	Given an adjacency matrix (sparse, or a list of lists) and starting point
+	index p, returns a set of point indexes that are `degree` degrees removed
+	from p or less.
+	"""
+	if not issparse(b_adj):
+		b_adj = csr_matrix(np.asarray(b_adj, dtype=bool))
+	indptr = b_adj.indptr
+	indices = b_adj.indices
+	visited = np.zeros(b_adj.shape[0], dtype=bool)
+	visited[p] = True
+	frontier = np.array([p])
+	for _ in range(degree):
+		starts = indptr[frontier]
+		counts = indptr[frontier + 1] - starts
+		total = int(counts.sum())
+		if not total:
+			break
+		# The positions in `indices` of every neighbor of the frontier.
+		offsets = np.repeat(starts - np.cumsum(counts) + counts, counts)
+		neighbors = indices[offsets + np.arange(total)]
+		frontier = np.unique(neighbors[~visited[neighbors]])
+		visited[frontier] = True
+	return set(np.flatnonzero(visited).tolist())
 
 
 def are_cells_adj_cardinally(p: Vector2, q: Vector2):
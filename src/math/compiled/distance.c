@@ -19,13 +19,7 @@ double x_looped_distance2(Vector2 *p, Vector2 *q, int w) {
 	p->x = temp_x - w;
 	double behind = distance2(p, q);
 	p->x = temp_x;
-	if (normal < beyond && normal < behind) {
-		return normal;
-	} else if (beyond < normal && beyond < behind) {
-		return beyond;
-	} else {
-		return behind;
-	}
+	return fmin(normal, fmin(beyond, behind));
 }
 
 int find_closest(Vector2 *p, Vector2 *qs, int num_points) {
@@ -3,119 +3,153 @@
 #include <time.h>
 #include <math.h>
 
-#include "../../o10n/compiled/bitmatrix.h"
-
 #include "distance.h"
 #include "vector2.h"
 #include "voronoi.h"
 #include "matrix.h"
 
-char FANOUT_DIRECTION_SOURCE = 0;
-char FANOUT_DIRECTION_NORTH = 1;
-char FANOUT_DIRECTION_EAST = 2;
-char FANOUT_DIRECTION_SOUTH = 3;
-char FANOUT_DIRECTION_WEST = 4;
-
 Vector2 *make_points(int num_points) {
 	Vector2 *points = (Vector2 *)malloc(num_points * sizeof(Vector2));
 	return points;
 }
 
-void voronoi_visit(
-	IntMatrix *matrix,
-	Vector2 *position,
-	Vector2 *voronois,
-	int label, bitmatrix *visited,
-	char fanout_direction
-) {
-	int x = position->x;
-	int y = position->y;
-	int w = matrix->width;
-	int h = matrix->height;
-
-	if (bitmatrix_get_bit_at(visited, y, x) == 1) {
-		return;
-	}
-	bitmatrix_set_bit_at(visited, y, x, 1);
-	int set_value = x_looped_find_closest(position, voronois, label, w) + 1;
-	int_matrix_set_at(matrix, y, x, set_value);
-	if (set_value != label) {
-		return;
+/**
+ * The points sorted into square buckets of `size` cells, so that finding the
+ * closest point to a cell only has to look at the buckets around it.
+ */
+typedef struct {
+	int size;
+	int cols;
+	int rows;
+	// Bucket b holds the points indices[starts[b] .. starts[b + 1]), in
+	// ascending order.
+	int *starts;
+	int *indices;
+} PointGrid;
+
+PointGrid *make_point_grid(Vector2 *points, int num_points, int w, int h) {
+	PointGrid *grid = malloc(sizeof(PointGrid));
+	int area = (w * h) / (num_points > 0 ? num_points : 1);
+	grid->size = (int)sqrt(area);
+	if (grid->size < 1) {
+		grid->size = 1;
 	}
+	grid->cols = (w + grid->size - 1) / grid->size;
+	grid->rows = (h + grid->size - 1) / grid->size;
 
-	// Visit north.
-	if (fanout_direction != FANOUT_DIRECTION_SOUTH && y > 0) {
-		position->y = y - 1;
-		voronoi_visit(
-			matrix, position, voronois, label, visited, FANOUT_DIRECTION_NORTH
-		);
-	}
+	int num_buckets = grid->cols * grid->rows;
+	grid->starts = calloc(num_buckets + 1, sizeof(int));
+	grid->indices = malloc(sizeof(int) * (num_points > 0 ? num_points : 1));
 
-	// Visit south.
-	if (fanout_direction != FANOUT_DIRECTION_NORTH && y < h - 1) {
-		position->y = y + 1;
-		voronoi_visit(
-			matrix, position, voronois, label, visited, FANOUT_DIRECTION_NORTH
-		);
+	for (int i = 0; i < num_points; i++) {
+		int b = (points[i].y / grid->size) * grid->cols
+			+ (points[i].x / grid->size);
+		grid->starts[b + 1]++;
 	}
-
-	// Visit east.
-	if (fanout_direction != FANOUT_DIRECTION_WEST) {
-		position->x = (x + 1) % w;
-		voronoi_visit(
-			matrix, position, voronois, label, visited, FANOUT_DIRECTION_EAST
-		);
+	for (int b = 0; b < num_buckets; b++) {
+		grid->starts[b + 1] += grid->starts[b];
 	}
-
-	// Visit west.
-	if (fanout_direction != FANOUT_DIRECTION_EAST) {
-		position->x = (x - 1 + w) % w;
-		voronoi_visit(
-			matrix, position, voronois, label, visited, FANOUT_DIRECTION_WEST
-		);
+	int *fill = malloc(sizeof(int) * num_buckets);
+	for (int b = 0; b < num_buckets; b++) {
+		fill[b] = grid->starts[b];
 	}
-
-	// Reset the point back to original value.
-	position->x = x;
-	position->y = y;
+	for (int i = 0; i < num_points; i++) {
+		int b = (points[i].y / grid->size) * grid->cols
+			+ (points[i].x / grid->size);
+		grid->indices[fill[b]++] = i;
+	}
+	free(fill);
+	return grid;
 }
 
-void fill_voronoi(IntMatrix *matrix, int num_points) {
-	Vector2 *points = make_points(num_points);
-	generate_random_points(points, num_points, matrix->width, matrix->height);
-
-	bitmatrix *visited = make_bitmatrix(matrix->width, matrix->height);
+void free_point_grid(PointGrid *grid) {
+	free(grid->starts);
+	free(grid->indices);
+	free(grid);
+}
 
-	for (int y = 0; y < matrix->height; y++) {
-		for (int x = 0; x < matrix->width; x++) {
-			int_matrix_set_at(matrix, y, x, 1);
+/**
+ * Compare the cell against every point in the given bucket, keeping the
+ * closest (and, among equally close points, the lowest index).
+ */
+void scan_bucket(
+	PointGrid *grid, Vector2 *points, int w,
+	int col, int row, int x, int y,
+	int *best, long long *best_d2
+) {
+	int b = row * grid->cols + col;
+	for (int j = grid->starts[b]; j < grid->starts[b + 1]; j++) {
+		int i = grid->indices[j];
+		long long dx = abs(points[i].x - x);
+		if (w - dx < dx) {
+			dx = w - dx;
+		}
+		long long dy = points[i].y - y;
+		long long d2 = dx * dx + dy * dy;
+		if (*best < 0 || d2 < *best_d2 || (d2 == *best_d2 && i < *best)) {
+			*best = i;
+			*best_d2 = d2;
 		}
 	}
+}
 
-	Vector2 p;
-	for (int i = 1; i < num_points; i++) {
-		p = points[i];
-		voronoi_visit(
-			matrix,
-			&p, points,
-			i + 1, visited,
-			FANOUT_DIRECTION_SOURCE
-		);
-		bitmatrix_clear(visited);
+int closest_point(PointGrid *grid, Vector2 *points, int w, int x, int y) {
+	int bx = x / grid->size;
+	int by = y / grid->size;
+	int max_ring = grid->cols > grid->rows ? grid->cols : grid->rows;
+	int best = -1;
+	long long best_d2 = 0;
+
+	for (int r = 0; r <= max_ring; r++) {
+		// Every point outside the rings we've searched is at least this far
+		// away, allowing a bucket's worth of slack for the narrow last column
+		// where the x-axis wraps.
+		long long bound = (long long)(r - 2) * grid->size + 1;
+		if (best >= 0 && bound > 0 && best_d2 < bound * bound) {
+			break;
+		}
+		for (int dy = -r; dy <= r; dy++) {
+			int row = by + dy;
+			if (row < 0 || row >= grid->rows) {
+				continue;
+			}
+			int step = (dy == -r || dy == r) ? 1 : 2 * r;
+			for (int dx = -r; dx <= r; dx += (step > 0 ? step : 1)) {
+				int col = ((bx + dx) % grid->cols + grid->cols) % grid->cols;
+				scan_bucket(grid, points, w, col, row, x, y, &best, &best_d2);
+			}
+		}
 	}
-
-	free(points);
-	free_bitmatrix(visited);
+	return best;
 }
 
-void norm_voronoi(IntMatrix *matrix) {
+void voronoi_from_points(IntMatrix *matrix, Vector2 *points, int num_points) {
 	int w = matrix->width;
 	int h = matrix->height;
+	if (num_points <= 0) {
+		for (int y = 0; y < h; y++) {
+			for (int x = 0; x < w; x++) {
+				int_matrix_set_at(matrix, y, x, 0);
+			}
+		}
+		return;
+	}
+
+	PointGrid *grid = make_point_grid(points, num_points, w, h);
 	for (int y = 0; y < h; y++) {
 		for (int x = 0; x < w; x++) {
-			int_matrix_delta_at(matrix, y, x, -1);
+			int label = closest_point(grid, points, w, x, y);
+			int_matrix_set_at(matrix, y, x, label);
 		}
 	}
+	free_point_grid(grid);
+}
+
+void fill_voronoi(IntMatrix *matrix, int num_points) {
+	Vector2 *points = make_points(num_points);
+	generate_random_points(points, num_points, matrix->width, matrix->height);
+	voronoi_from_points(matrix, points, num_points);
+	free(points);
 }
 
 int **make_voronoi(int w, int h, int density) {
@@ -124,7 +158,6 @@ int **make_voronoi(int w, int h, int density) {
 	srand(time(NULL));
 	int num_points = (w * h) / density;
 	fill_voronoi(matrix, num_points);
-	norm_voronoi(matrix);
 
 	int **values = int_matrix_values(matrix);
 	free_int_matrix(matrix);
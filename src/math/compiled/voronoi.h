@@ -1,6 +1,15 @@
 #ifndef VORONOI_H
 #define VORONOI_H
 
+#include "matrix.h"
+#include "vector2.h"
+
+/**
+ * Label every cell of the matrix with the index of the closest of the given
+ * points, looping on the x-axis. Ties go to the lower index.
+ */
+void voronoi_from_points(IntMatrix *matrix, Vector2 *points, int num_points);
+
 /**
  * Create a voronoi matrix with dimensions (w * h) and a total of (w * h) /
  * density points.
@@ -4,7 +4,14 @@ Utility functions for smoothing matrixes out.
 
 import math
 
+import numpy as np
+
 from src.math.adj import adj_cells
+from src.math.direction import (
+	Direction,
+	direction_to_delta,
+	is_direction_diagonal,
+)
 
 def matrix_sized_as(
 		matrix: list[list[int]],
@@ -39,22 +46,46 @@ def smooth_matrix(
 	On a planet, we loop_x but do not loop_y. Recommended to use diag=True,
 	but =False will produce a valid result too.
 	"""
-	h = len(matrix)
-	w = len(matrix[0])
+	return smooth_array(
+		matrix,
+		weight=weight,
+		loop_x=loop_x,
+		loop_y=loop_y,
+		diag=diag
+	).tolist()
 
-	smoothed = [[0] * w for _ in range(h)]
 
-	for y in range(h):
-		for x in range(w):
-			v = matrix[y][x]
-			sv = 1
-			adj = adj_cells((w,h), (x,y), loop_x=loop_x, loop_y=loop_y, diag=diag)
-			sv += len(adj) * weight
-			for x2,y2 in adj:
-				v += matrix[y2][x2] * weight
-			smoothed[y][x] = v / sv
-
-	return smoothed
+def smooth_array(
+	array,
+	weight = 0.5,
+	loop_x = True,
+	loop_y = False,
+	diag = True
+) -> np.ndarray:
+	"""
+	Like `smooth_matrix`, but takes and returns a numpy array, and does the
+	whole array at once: each neighbor direction is one shifted copy of the
+	array (rolled where the axis loops, zeroed past the edge where it
+	doesn't), added in the same order `adj_cells` visits them, so the
+	results are identical.
+	"""
+	array = np.asarray(array, dtype=np.float64)
+	h, w = array.shape
+	smoothed = array.copy()
+	n_adj = np.zeros((h, w), dtype=np.int64)
+	for dcn in Direction:
+		if not diag and is_direction_diagonal(dcn):
+			continue
+		dx, dy = direction_to_delta(dcn)
+		shifted = np.roll(array, (-dy, -dx), axis=(0, 1))
+		exists = np.ones((h, w), dtype=bool)
+		if not loop_y and dy:
+			exists[0 if dy < 0 else -1, :] = False
+		if not loop_x and dx:
+			exists[:, 0 if dx < 0 else -1] = False
+		smoothed += np.where(exists, shifted * weight, 0.0)
+		n_adj += exists
+	return smoothed / (1 + n_adj * weight)
 
 
 def round_matrix_to_int(matrix):
@@ -22,12 +22,30 @@ def vary_value_nominal(value, variation):
 	return value + random.uniform(-variation, variation)
 
 
-def random_2d_integers_numpy(n, width, height):
+def random_2d_integers_numpy(n, width, height, seed=None):
 	"""
-	Generate random 2D points within a width and height.
+	Generate n unique random 2D points within a width and height, as an (n, 2)
+	array of (x, y). The same seed (an int, or a numpy Generator to draw
+	from) always gives the same points.
+
+	We pick cells by their linear index (y * width + x), so we never build
+	the grid of every cell: we draw indices, keep the first copy of each, and
+	draw again for however many were duplicates. That settles in a round or
+	two unless we want most of the cells, in which case shuffling them all is
+	cheaper anyway.
 	"""
-	if n > width * height:
+	size = width * height
+	if n > size:
 		raise ValueError('Cant make more points than there are cells')
-	grid = np.array([(x, y) for x in range(width) for y in range(height)])
-	idxs = np.random.choice(len(grid), n, replace=False)
-	return grid[idxs]
+	rng = np.random.default_rng(seed)
+	if 2 * n > size:
+		idxs = rng.permutation(size)[:n]
+	else:
+		idxs = np.zeros(0, dtype=np.int64)
+		while len(idxs) < n:
+			draws = rng.integers(0, size, n - len(idxs), dtype=np.int64)
+			idxs = np.concatenate([idxs, draws])
+			_, first = np.unique(idxs, return_index=True)
+			idxs = idxs[np.sort(first)]
+	ys, xs = np.divmod(idxs, width)
+	return np.column_stack((xs, ys))
@@ -1,38 +1,106 @@
 import numpy as np
-from scipy.spatial import cKDTree, Voronoi
+from scipy.spatial import cKDTree
 
 from src.math.random import random_2d_integers_numpy
+from src.o10n import native
 
-def make_voronoi(dimensions, density):
+# The cells we look up in the k-d tree at once, when we can't use the compiled
+# library. Going a block of rows at a time keeps memory bounded on big maps.
+QUERY_BLOCK_CELLS = 1 << 18
+
+
+def make_voronoi(dimensions, density, seed=None) -> np.ndarray:
 	"""
 	Creates a voronoi matrix with dimensions = (width * height). The x-axis is
 	looped, as is the case on a planet. The density is the average area of the
 	voronoi regions. (width * height) / density points will be created.
+
+	The seed is passed to `random_2d_integers_numpy`. Returns a numpy array of
+	labels, indexed [y][x].
 	"""
 
 	width, height = dimensions
 	num_points = width * height // density
 
-	rand_points = random_2d_integers_numpy(num_points, width, height)
-	wrapped_points = np.vstack([
-		rand_points,
-		rand_points + [width, 0],
-		rand_points - [width, 0],
-	])
+	rand_points = random_2d_integers_numpy(num_points, width, height, seed)
+	return voronoi_from_points(dimensions, rand_points)
 
-	y_indices, x_indices = np.indices((height, width))
-	cell_coords = np.column_stack(
-		(x_indices.ravel(), y_indices.ravel())
+
+def voronoi_tree(dimensions, points) -> cKDTree:
+	"""
+	Returns a k-d tree of the points and their copies a width to either side,
+	so that distances in it loop on the x-axis. Entry i is point i % n.
+	"""
+	width, _ = dimensions
+	points = np.asarray(points)
+	return cKDTree(np.vstack([
+		points,
+		points + [width, 0],
+		points - [width, 0],
+	]))
+
+
+def _lowest_tied(tree, coords, num_points, workers):
+	"""
+	Returns the lowest label among the points closest to each of the cells.
+	"""
+	labels = np.empty(len(coords), dtype=np.intp)
+	todo = np.arange(len(coords))
+	k = 4
+	while len(todo):
+		k = min(k, tree.n)
+		_, idxs = tree.query(coords[todo], k=k, workers=workers)
+		# Exact squared distances; the tree's float distances may round.
+		deltas = tree.data[idxs] - coords[todo][:, None, :]
+		d2s = (deltas ** 2).sum(axis=2).astype(np.int64)
+		closest = d2s == d2s.min(axis=1, keepdims=True)
+		candidates = np.where(closest, idxs % num_points, num_points)
+		labels[todo] = candidates.min(axis=1)
+		# If even the k-th point is among the closest, there may be more.
+		if k == tree.n:
+			break
+		todo = todo[closest[:, -1]]
+		k *= 2
+	return labels
+
+
+def voronoi_rows(tree, num_points, width, y0, y1, workers=-1) -> np.ndarray:
+	"""
+	Labels the cells in rows [y0, y1) using a tree from `voronoi_tree`. Cells
+	equally close to several points get the lowest label, so that a row gets
+	the same labels however the map is split up (and the same labels as the
+	compiled library gives it).
+	"""
+	block_ys, block_xs = np.meshgrid(
+		np.arange(y0, y1), np.arange(width), indexing='ij'
 	)
+	coords = np.column_stack((block_xs.ravel(), block_ys.ravel()))
+	dists, idxs = tree.query(coords, k=min(2, tree.n), workers=workers)
+	idxs = idxs.reshape(len(coords), -1)
+	dists = dists.reshape(len(coords), -1)
+	labels = idxs[:, 0] % num_points
+	if idxs.shape[1] > 1:
+		tied = np.flatnonzero(dists[:, 1] <= dists[:, 0])
+		if len(tied):
+			labels[tied] = _lowest_tied(tree, coords[tied], num_points, workers)
+	return labels.reshape((y1 - y0, width))
 
-	tree  = cKDTree(wrapped_points)
-	_, regions = tree.query(cell_coords)
-	regions = regions % num_points
-	matrix = regions.reshape((height, width))
 
-	py_matrix = [[0] * width for _ in range(height)]
-	for y in range(height):
-		for x in range(width):
-			py_matrix[y][x] = matrix[y, x]
+def voronoi_from_points(dimensions, points):
+	"""
+	Labels each cell of a (width * height) matrix with the index of the point
+	closest to it, looping the x-axis. Ties go to the lower index. Returns a
+	numpy array of labels.
+	"""
+	if native.is_available():
+		return native.voronoi_from_points(dimensions, points)
 
-	return py_matrix
+	width, height = dimensions
+	tree = voronoi_tree(dimensions, points)
+	num_points = len(points)
+	labels = np.empty((height, width), dtype=np.intp)
+	rows_per_block = max(1, QUERY_BLOCK_CELLS // width)
+	for y0 in range(0, height, rows_per_block):
+		y1 = min(y0 + rows_per_block, height)
+		labels[y0:y1] = voronoi_rows(tree, num_points, width, y0, y1)
+	return labels
@@ -13,6 +13,7 @@ from src.ctrl.clickmap import ClickMap
 from src.render.render import Render
 from src.utility.calendar import next_christmas, utc_tuple_to_utc_float
 from src.math.vector2 import Vector2
+from src.path.path_service import PathService
 
 from src.gui.gui import _GuiManager, init_gui_manager
 from src.gui.mission_clock import MissionClock
@@ -22,6 +23,7 @@ from src.gui.colony_name import ColonyName
 
 from src.mgmt.event_manager import EventManager
 from src.mgmt.listener import Listener
+from src.mgmt.occupancy_grid import OccupancyGrid
 
 def christmas_event(score):
 	return random.choice([
@@ -78,6 +80,20 @@ class GameManager(Listener):
 
 	game_objects: set[GameObject]
 	colonies: set[Colony]
+
+	# Goes up whenever game objects are added, removed or moved, so caches
+	# of which cells are occupied (like flow fields) know when they're stale.
+	occupancy_version: int = 0
+
+	# Which cells game objects are on; made the first time it's needed.
+	_occupancy: OccupancyGrid = None
+
+	# The last occupancy snapshot, and the occupancy_version it's of.
+	_snapshot = None
+	_snapshot_version: int = None
+
+	# Finds paths for actors, off the main thread.
+	paths: PathService
 	world: World
 	vp = None
 
@@ -103,6 +119,7 @@ class GameManager(Listener):
 		self.colonies = []
 		self.world = world
 		self.world.game_mgr = self
+		self.paths = PathService()
 		self.vp = viewport
 		self.on_quit = on_quit
 		self.selected_actor = None
@@ -184,6 +201,8 @@ class GameManager(Listener):
 			self.world.tick_second(floor_new_utc - floor_old_utc, self.utc)
 			self._check_for_holidays(int(self.utc + dt))
 		self.utc += dt
+		# Paths asked for in earlier ticks.
+		self.paths.tick()
 		self.evt_mgr.tick(dt, self.utc)
 		for obj in self.game_objects:
 			obj.tick(dt, self.utc)
@@ -236,6 +255,9 @@ class GameManager(Listener):
 		new_character = Actor(self, pos=position, owner=self.player.uid)
 		new_character.motives.set_all(100)
 		self.game_objects.add(new_character)
+		if self._occupancy is not None:
+			self._occupancy.add(new_character)
+		self.occupancy_version += 1
 		if self.selected_actor is None:
 			self.selected_actor = new_character
 		return new_character
@@ -245,6 +267,9 @@ class GameManager(Listener):
 		Adds the given game object to the world.
 		"""
 		self.game_objects.add(go)
+		if self._occupancy is not None:
+			self._occupancy.add(go)
+		self.occupancy_version += 1
 		go.on_init()
 
 	def remove_game_object(self, go: GameObject):
@@ -252,8 +277,35 @@ class GameManager(Listener):
 		Removes the given game object from the world.
 		"""
 		self.game_objects.remove(go)
+		if self._occupancy is not None:
+			self._occupancy.remove(go)
+		self.occupancy_version += 1
 		go.on_remove()
 
+	def game_object_moved(self, go: GameObject):
+		"""
+		Called when a game object moves or changes size.
+		"""
+		if self._occupancy is None or self._occupancy.move(go):
+			self.occupancy_version += 1
+
+	@property
+	def occupancy(self) -> OccupancyGrid:
+		"""
+		Which cells game objects are on.
+		"""
+		if self._occupancy is None:
+			self._occupancy = OccupancyGrid(self.world.terrain.dimensions)
+			for go in self.game_objects:
+				self._occupancy.add(go)
+		return self._occupancy
+
+	def shutdown(self):
+		"""
+		Call when the game is over; stops finding paths.
+		"""
+		self.paths.shutdown()
+
 	def new_colony(self, position=None, owner=None, is_first=False):
 		"""
 		Establish a new colony at the given position for the given owner, and
@@ -279,10 +331,26 @@ class GameManager(Listener):
 		"""
 		Returns True if the given position is occupied by a game object.
 		"""
-		for go in self.game_objects:
-			if go.occupies_cell(position):
-				return True
-		return False
+		return self.occupancy.is_occupied(position)
+
+	def occupancy_snapshot(self):
+		"""
+		Returns which cells are occupied, as a read-only (rows, columns)
+		boolean array that later changes don't touch, for handing to other
+		threads. Made once per occupancy_version.
+		"""
+		if self._snapshot_version != self.occupancy_version:
+			self._snapshot = self.occupancy.snapshot()
+			self._snapshot_version = self.occupancy_version
+		return self._snapshot
+
+	def occupied_mask(self, origin, size):
+		"""
+		Returns which cells of the rectangle at origin, of size (columns,
+		rows), are occupied by game objects, as a (rows, columns) boolean
+		array. Columns wrap around the planet.
+		"""
+		return self.occupancy.mask(origin, size)
 
 	def can_place_gameobject_at(self, gobj: GameObject, origin: Vector2):
 		"""
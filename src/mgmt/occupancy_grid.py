@@ -0,0 +1,135 @@
+"""
+Which cells game objects are on, kept as a grid the size of the terrain so
+that looking up a cell doesn't mean asking every game object.
+"""
+
+import numpy as np
+
+
+
+class OccupancyGrid:
+	"""
+	How many game objects cover each cell. The game manager keeps it up to
+	date as objects are added, removed and moved. Columns wrap around the
+	planet; rows off the map are never occupied.
+	"""
+
+	# (rows, columns) counts.
+	_counts: np.ndarray
+
+	# Object -> the (x, y, w, h) it was counted at.
+	_rects: dict
+
+	def __init__(self, dimensions):
+		w, h = dimensions
+		self._counts = np.zeros((h, w), dtype=np.int32)
+		self._rects = {}
+
+
+	def __len__(self):
+		return len(self._rects)
+
+
+	def __contains__(self, go):
+		return go in self._rects
+
+
+	@staticmethod
+	def _rect_of(go):
+		x, y = go.pos
+		w, h = go.size[:2]
+		return (int(x), int(y), int(w), int(h))
+
+
+	def _count(self, rect, n: int):
+		x, y, w, h = rect
+		rows, columns = self._counts.shape
+		y0 = max(y, 0)
+		y1 = min(y + h, rows)
+		if y0 >= y1:
+			return
+		xs = np.arange(x, x + min(w, columns)) % columns
+		self._counts[y0:y1, xs] += n
+
+
+	def add(self, go):
+		"""
+		Counts the cells the game object is on.
+		"""
+		if go in self._rects:
+			return
+		rect = self._rect_of(go)
+		self._count(rect, 1)
+		self._rects[go] = rect
+
+
+	def remove(self, go):
+		"""
+		Stops counting the game object.
+		"""
+		rect = self._rects.pop(go, None)
+		if rect is not None:
+			self._count(rect, -1)
+
+
+	def move(self, go) -> bool:
+		"""
+		Recounts the game object where it is now, after it moved or changed
+		size. Returns True if it covers different cells than before.
+		"""
+		old = self._rects.get(go)
+		if old is None:
+			return False
+		new = self._rect_of(go)
+		if new == old:
+			return False
+		self._count(old, -1)
+		self._count(new, 1)
+		self._rects[go] = new
+		return True
+
+
+	def is_occupied(self, cell) -> bool:
+		"""
+		True if any game object is on the cell.
+		"""
+		x, y = cell
+		rows, columns = self._counts.shape
+		if not 0 <= y < rows:
+			return False
+		return self._counts.item(int(y), int(x) % columns) > 0
+
+
+	def mask(self, origin, size) -> np.ndarray:
+		"""
+		Returns which cells of the rectangle at origin, of size (columns,
+		rows), are occupied, as a (rows, columns) boolean array.
+		"""
+		ox, oy = origin
+		w, h = size
+		rows, columns = self._counts.shape
+		mask = np.zeros((h, w), dtype=bool)
+		y0 = max(oy, 0)
+		y1 = min(oy + h, rows)
+		if y0 < y1:
+			xs = np.arange(ox, ox + w) % columns
+			mask[y0 - oy:y1 - oy] = self._counts[y0:y1][:, xs] > 0
+		return mask
+
+
+	def snapshot(self) -> np.ndarray:
+		"""
+		Returns which cells are occupied, as a read-only (rows, columns)
+		boolean array that later changes to the grid don't touch.
+		"""
+		occupied = self._counts > 0
+		occupied.setflags(write=False)
+		return occupied
+
+
+	def is_area_occupied(self, origin, size) -> bool:
+		"""
+		True if any cell of the rectangle at origin, of size (columns, rows),
+		is occupied.
+		"""
+		return bool(self.mask(origin, size).any())
@@ -0,0 +1,259 @@
+"""
+Bindings for the C kernels that `compile.sh` builds into `bin/compiled.so`.
+
+The library is optional. If it hasn't been built, or can't be loaded on this
+platform, `is_available()` is False and callers should use their Python
+implementations instead. Setting the EXPLORERS_NO_NATIVE environment variable
+ignores the library even when it is built.
+
+These functions deal in numpy arrays rather than the list-of-lists matrices the
+rest of the game uses; the modules that dispatch here convert at the boundary.
+"""
+
+import contextlib
+import ctypes
+import os
+
+import numpy as np
+
+LIBRARY_PATH = os.path.join(
+	os.path.dirname(os.path.dirname(os.path.dirname(os.path.abspath(__file__)))),
+	'bin',
+	'compiled.so'
+)
+
+# Mirrors WD_INFINITY in water_distance.h. Distances at or above this mean
+# there is no water to reach.
+WD_INFINITY = 1 << 30
+
+# Mirrors the Biome enum in biome.h, mapping its codes to the names of the
+# matching src.world.biome.Biome members.
+BIOME_NAMES_BY_CODE = {
+	0x00: 'BARREN',
+	0x200: 'OUTBACK',
+	0x300: 'BEACH',
+	0x11: 'TROPICAL',
+	0x21: 'DESERT',
+	0x12: 'LUSH',
+	0x22: 'SAVANNAH',
+	0x13: 'SNOW',
+	0x23: 'TUNDRA',
+}
+
+
+
+class _IntMatrix(ctypes.Structure):
+	_fields_ = [
+		('data', ctypes.POINTER(ctypes.c_int)),
+		('width', ctypes.c_int),
+		('height', ctypes.c_int),
+	]
+
+
+
+class _WaterDistanceMtx(ctypes.Structure):
+	# Each row is an array of (xy, z) int pairs; we read them as flat ints.
+	_fields_ = [
+		('matrix', ctypes.POINTER(ctypes.POINTER(ctypes.c_int))),
+		('width', ctypes.c_int),
+		('height', ctypes.c_int),
+	]
+
+
+
+class _BiomeMatrix(ctypes.Structure):
+	_fields_ = [
+		('matrix', ctypes.POINTER(ctypes.POINTER(ctypes.c_int))),
+		('width', ctypes.c_int),
+		('height', ctypes.c_int),
+	]
+
+
+_library = None
+_loaded = False
+_enabled = True
+
+
+def _declare(lib):
+	"""
+	Sets the argument and return types of the functions we call.
+	"""
+	wdm_p = ctypes.POINTER(_WaterDistanceMtx)
+	bm_p = ctypes.POINTER(_BiomeMatrix)
+	im_p = ctypes.POINTER(_IntMatrix)
+
+	lib.calculate_water_distance_matrix.argtypes = [im_p, im_p]
+	lib.calculate_water_distance_matrix.restype = wdm_p
+	lib.water_distance_matrix_minfold.argtypes = [wdm_p]
+	lib.water_distance_matrix_minfold.restype = wdm_p
+	lib.make_water_distance_matrix.argtypes = [ctypes.c_int, ctypes.c_int]
+	lib.make_water_distance_matrix.restype = wdm_p
+	lib.free_water_distance_matrix.argtypes = [wdm_p]
+	lib.free_water_distance_matrix.restype = None
+
+	lib.calculate_biomes.argtypes = [
+		wdm_p,
+		ctypes.POINTER(ctypes.c_double),
+		ctypes.c_int
+	]
+	lib.calculate_biomes.restype = bm_p
+	lib.free_biome_matrix.argtypes = [bm_p]
+	lib.free_biome_matrix.restype = None
+
+	lib.voronoi_from_points.argtypes = [
+		im_p,
+		ctypes.POINTER(ctypes.c_int),
+		ctypes.c_int
+	]
+	lib.voronoi_from_points.restype = None
+
+
+def load(path: str = LIBRARY_PATH):
+	"""
+	Loads the shared library, returning None if it isn't there. The result is
+	cached, so only the first call's path matters.
+	"""
+	global _library, _loaded
+	if _loaded:
+		return _library
+	_loaded = True
+	if os.environ.get('EXPLORERS_NO_NATIVE') or not os.path.exists(path):
+		return None
+	try:
+		lib = ctypes.CDLL(path)
+		_declare(lib)
+	except (OSError, AttributeError):
+		# Either not a library we can load, or a stale build that's missing
+		# some of the functions above.
+		return None
+	_library = lib
+	return _library
+
+
+def is_available() -> bool:
+	"""
+	True if the compiled kernels are loaded and should be used.
+	"""
+	return _enabled and load() is not None
+
+
+@contextlib.contextmanager
+def disabled():
+	"""
+	Forces the Python implementations for the duration of the block. Useful
+	for comparing the two.
+	"""
+	global _enabled
+	was_enabled = _enabled
+	_enabled = False
+	try:
+		yield
+	finally:
+		_enabled = was_enabled
+
+
+def _int_matrix(array: np.ndarray) -> _IntMatrix:
+	"""
+	Wraps a C-contiguous int32 array in an IntMatrix without copying. The
+	caller must keep the array alive while the struct is in use.
+	"""
+	h, w = array.shape
+	return _IntMatrix(
+		array.ctypes.data_as(ctypes.POINTER(ctypes.c_int)),
+		w,
+		h
+	)
+
+
+def _int32(matrix) -> np.ndarray:
+	return np.ascontiguousarray(matrix, dtype=np.int32)
+
+
+def water_distances(land_height, water_level, loop_x: bool = True):
+	"""
+	The compiled equivalent of src.world.biome.water_distances. Returns the
+	xy and z distances as two int arrays of shape (h, w), holding values of
+	at least WD_INFINITY where there is no water to reach.
+	"""
+	lib = load()
+	land = _int32(land_height)
+	water = _int32(water_level)
+	if loop_x:
+		land = np.ascontiguousarray(np.tile(land, (1, 2)))
+		water = np.ascontiguousarray(np.tile(water, (1, 2)))
+	land_mtx = _int_matrix(land)
+	water_mtx = _int_matrix(water)
+
+	wdm = lib.calculate_water_distance_matrix(
+		ctypes.byref(land_mtx),
+		ctypes.byref(water_mtx)
+	)
+	if loop_x:
+		folded = lib.water_distance_matrix_minfold(wdm)
+		lib.free_water_distance_matrix(wdm)
+		wdm = folded
+
+	h = wdm.contents.height
+	w = wdm.contents.width
+	pairs = np.empty((h, w, 2), dtype=np.int32)
+	for y in range(h):
+		pairs[y] = np.ctypeslib.as_array(
+			wdm.contents.matrix[y],
+			shape=(w * 2,)
+		).reshape(w, 2)
+	lib.free_water_distance_matrix(wdm)
+	return pairs[:, :, 0], pairs[:, :, 1]
+
+
+def calculate_biomes(wd_xys, wd_zs, tpr_deg_fs, wet_cutoff: int = 64):
+	"""
+	The compiled equivalent of src.world.biome.calculate_biomes. Takes water
+	distances as two int arrays (WD_INFINITY or more for no water) and one
+	temperature per row. Returns an array of biome.h Biome codes; see
+	BIOME_NAMES_BY_CODE.
+	"""
+	lib = load()
+	wd_xys = np.minimum(wd_xys, WD_INFINITY)
+	wd_zs = np.minimum(wd_zs, WD_INFINITY)
+	h, w = wd_xys.shape
+	tprs = np.ascontiguousarray(tpr_deg_fs, dtype=np.float64)
+
+	wdm = lib.make_water_distance_matrix(w, h)
+	for y in range(h):
+		row = np.ctypeslib.as_array(
+			wdm.contents.matrix[y],
+			shape=(w * 2,)
+		).reshape(w, 2)
+		row[:, 0] = wd_xys[y]
+		row[:, 1] = wd_zs[y]
+	biomes = lib.calculate_biomes(
+		wdm,
+		tprs.ctypes.data_as(ctypes.POINTER(ctypes.c_double)),
+		wet_cutoff
+	)
+	lib.free_water_distance_matrix(wdm)
+
+	codes = np.empty((h, w), dtype=np.int32)
+	for y in range(h):
+		codes[y] = np.ctypeslib.as_array(biomes.contents.matrix[y], shape=(w,))
+	lib.free_biome_matrix(biomes)
+	return codes
+
+
+def voronoi_from_points(dimensions, points) -> np.ndarray:
+	"""
+	Labels every cell with the index of the closest of the given (x, y)
+	points, looping on the x-axis. Ties go to the lower index. Returns an int
+	array of shape (height, width).
+	"""
+	lib = load()
+	width, height = dimensions
+	points = _int32(points).reshape(-1, 2)
+	labels = np.zeros((height, width), dtype=np.int32)
+	labels_mtx = _int_matrix(labels)
+	lib.voronoi_from_points(
+		ctypes.byref(labels_mtx),
+		points.ctypes.data_as(ctypes.POINTER(ctypes.c_int)),
+		len(points)
+	)
+	return labels
@@ -3,6 +3,8 @@ import heapq
 from src.world.terrain import Terrain
 from src.math.adj import keyed_adj_cells
 from src.math.distance import planet_manhattan_distance
+from src.math.vector2 import Vector2
+from src.path.astar_engine import engine_for
 
 def _always_false(_):
 	return False
@@ -12,9 +14,29 @@ def astar(start, goal, terrain: Terrain, is_cell_occupied=None):
 	Perform an A* search on the terrain to find the shortest path from the
 	start cell to the goal.
 
+	The search itself runs on the terrain's `AstarEngine`; this translates
+	cells to and from its flat indices, and gives the same paths as
+	`reference_astar`.
+
 	TODO(jm) - make it take in a player object, to account for different
 	terrain negotiation skills.
 	"""
+	engine = engine_for(terrain)
+	is_blocked = None
+	if is_cell_occupied is not None:
+		cell = engine.cell
+		def is_blocked(index):
+			return is_cell_occupied(cell(index))
+	path = engine.search(engine.index(start), engine.index(goal), is_blocked)
+	if not path:
+		return []
+	return [start] + [Vector2(*engine.cell(index)) for index in path[1:]]
+
+def reference_astar(start, goal, terrain: Terrain, is_cell_occupied=None):
+	"""
+	The straightforward A* on (x, y) cells that `astar` replaced, kept to
+	check and benchmark the engine against.
+	"""
 	if is_cell_occupied is None:
 		is_cell_occupied = _always_false
 	if is_cell_occupied(goal):
@@ -25,7 +47,7 @@ def astar(start, goal, terrain: Terrain, is_cell_occupied=None):
 
 	def heuristic(cell):
 		z = abs(terrain.height_at(cell) - goal_height)
-		xy = planet_manhattan_distance(dims, cell, goal)
+		xy = planet_manhattan_distance(cell, goal, dims)
 		return xy + z
 
 	def cost(src, direction):
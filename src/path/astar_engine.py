@@ -0,0 +1,255 @@
+"""
+An A* search over flat cell indices, for paths long enough that the
+tuple-and-dict bookkeeping of a straightforward A* stalls the frame.
+
+Everything per cell lives in flat `array.array`s built once per terrain:
+each cell's total height, the indices of its cardinal neighbors (-1 off the
+top and bottom of the map; the x-axis wraps), and the cost of stepping to
+each. The g-scores and parent pointers are arrays too, kept from search to
+search; a search number stamped on every cell it touches tells this
+search's scores from stale ones, so nothing is cleared in between. The
+engine is kept as long as its terrain, so the tables are 32-bit and the
+expanded flags a byte each: 49 bytes a cell in all.
+
+Cells are numbered column by column, `index = x * height + y`, so comparing
+indices compares (x, y) tuples. That keeps the heap's tie-breaking, and so
+the paths, the same as `astar` on tuples.
+"""
+
+import heapq
+import weakref
+
+from array import array
+
+import numpy as np
+
+from src.math.direction import Direction, is_direction_diagonal
+from src.world.terrain import Terrain
+from src.world.terrain_journal import TerrainLayer
+
+# The neighbors of a cell, in the order the tuple A* visits them.
+CARDINALS = [
+	direction for direction in Direction
+	if not is_direction_diagonal(direction)
+]
+DELTAS = {
+	Direction.NORTH: (0, -1),
+	Direction.EAST: (1, 0),
+	Direction.SOUTH: (0, 1),
+	Direction.WEST: (-1, 0),
+}
+
+_engines = weakref.WeakKeyDictionary()
+
+
+
+def engine_for(terrain: Terrain) -> 'AstarEngine':
+	"""
+	Returns the engine for the terrain, making it the first time.
+	"""
+	engine = _engines.get(terrain)
+	if engine is None:
+		engine = AstarEngine(terrain)
+		_engines[terrain] = engine
+	return engine
+
+
+
+class AstarEngine:
+	"""
+	Finds paths on one terrain. The tables follow the terrain's height
+	changes through its journal, catching up at the start of each search.
+	"""
+
+	width: int
+	height: int
+
+	# Per cell: the total height.
+	heights: array
+
+	# Per cell: the search that last touched it.
+	_stamp: array
+
+	# Per cell and cardinal (index * 4 + k): the neighbor's index, or -1,
+	# and the cost of stepping to it.
+	_neighbors: array
+	_costs: array
+
+	# Per cell, valid where the stamp is the current search: the best cost
+	# from the start so far, the cell it was reached from, and whether it
+	# has been expanded with that cost.
+	_g: array
+	_parent: array
+	_expanded: bytearray
+
+	_search: int = 0
+
+	def __init__(self, terrain: Terrain):
+		self._terrain = terrain
+		self.width, self.height = terrain.dimensions
+		n = self.width * self.height
+		self._changes = terrain.journal.subscribe(TerrainLayer.HEIGHT)
+		self.heights = array('i', self._column_major(self._total_heights()))
+		self._neighbors = array('i', self._neighbor_table())
+		self._costs = array('i', self._cost_table())
+		self._stamp = array('i', bytes(4 * n))
+		self._g = array('i', bytes(4 * n))
+		self._parent = array('i', bytes(4 * n))
+		self._expanded = bytearray(n)
+
+
+	@staticmethod
+	def _column_major(plane: np.ndarray) -> bytes:
+		"""
+		Returns a (height, width, ...) plane's bytes as int32, in index
+		order.
+		"""
+		return np.ascontiguousarray(
+			plane.swapaxes(0, 1), dtype=np.int32
+		).tobytes()
+
+
+	def _total_heights(self) -> np.ndarray:
+		terrain = self._terrain
+		return terrain.map.astype(np.int64) + terrain.water + terrain.ice
+
+
+	def _neighbor_table(self) -> bytes:
+		w, h = self.width, self.height
+		xs = np.arange(w)[:, None]
+		ys = np.arange(h)[None, :]
+		table = np.empty((w, h, len(CARDINALS)), dtype=np.int32)
+		for k, direction in enumerate(CARDINALS):
+			dx, dy = DELTAS[direction]
+			ny = ys + dy
+			index = ((xs + dx) % w) * h + ny
+			table[..., k] = np.where((ny >= 0) & (ny < h), index, -1)
+		return table.tobytes()
+
+
+	def _cost_table(self) -> bytes:
+		values = [direction.value for direction in CARDINALS]
+		deltas = self._terrain.height_deltas[..., values]
+		return self._column_major(np.abs(deltas.astype(np.int64)) + 1)
+
+
+	def _refresh(self):
+		"""
+		Catches the tables up with the terrain's height changes. A cell's
+		costs depend on its neighbors' heights, so the cells around each
+		change are redone too.
+		"""
+		if not self._changes.has_changes:
+			return
+		xs, ys = self._changes.pull_arrays()
+		w, h = self.width, self.height
+		offsets = np.array([(0, 0), (0, -1), (1, 0), (0, 1), (-1, 0)])
+		xs = ((xs[:, None] + offsets[:, 0]) % w).ravel()
+		ys = (ys[:, None] + offsets[:, 1]).ravel()
+		inside = (ys >= 0) & (ys < h)
+		indices, first = np.unique(
+			xs[inside] * h + ys[inside], return_index=True
+		)
+		xs = xs[inside][first]
+		ys = ys[inside][first]
+		values = [direction.value for direction in CARDINALS]
+		deltas = self._terrain.height_deltas[ys, xs][:, values]
+		# The arrays share their memory with these views.
+		heights = np.frombuffer(self.heights, dtype=np.int32)
+		costs = np.frombuffer(self._costs, dtype=np.int32).reshape(-1, 4)
+		heights[indices] = self._total_heights()[ys, xs]
+		costs[indices] = np.abs(deltas.astype(np.int64)) + 1
+
+
+	def index(self, cell) -> int:
+		"""
+		Returns the index of an (x, y) cell.
+		"""
+		x, y = cell
+		return (x % self.width) * self.height + y
+
+
+	def cell(self, index: int) -> tuple[int, int]:
+		"""
+		Returns the (x, y) cell of an index.
+		"""
+		return divmod(index, self.height)
+
+
+	def search(self, start: int, goal: int, is_blocked=None) -> list[int]:
+		"""
+		Returns the indices of the cheapest path from start to goal, both
+		included, or an empty list if there isn't one. is_blocked, if given,
+		is called with an index and returns True for cells that can't be
+		entered.
+		"""
+		if is_blocked is not None and is_blocked(goal):
+			return []
+		self._refresh()
+		self._search += 1
+		search = self._search
+
+		w = self.width
+		h = self.height
+		heights = self.heights
+		neighbors = self._neighbors
+		costs = self._costs
+		stamp = self._stamp
+		g = self._g
+		parent = self._parent
+		expanded = self._expanded
+		heappush = heapq.heappush
+		heappop = heapq.heappop
+
+		goal_x, goal_y = divmod(goal, h)
+		goal_z = heights[goal]
+
+		stamp[start] = search
+		g[start] = 0
+		parent[start] = -1
+		expanded[start] = 0
+		open_set = [(0, start)]
+
+		while open_set:
+			_, current = heappop(open_set)
+
+			if current == goal:
+				path = [current]
+				while parent[current] != -1:
+					current = parent[current]
+					path.append(current)
+				return path[::-1]
+
+			# Expanding a cell again with the same cost finds nothing new.
+			if expanded[current]:
+				continue
+			expanded[current] = 1
+
+			g_current = g[current]
+			base = 4 * current
+			for k in range(4):
+				nxt = neighbors[base + k]
+				if nxt < 0:
+					continue
+				if is_blocked is not None and is_blocked(nxt):
+					continue
+				tentative = g_current + costs[base + k]
+				if stamp[nxt] == search and tentative >= g[nxt]:
+					continue
+				stamp[nxt] = search
+				g[nxt] = tentative
+				parent[nxt] = current
+				expanded[nxt] = 0
+				# The wrapped Manhattan distance to the goal, plus the
+				# height difference.
+				x, y = divmod(nxt, h)
+				dx = x - goal_x if x >= goal_x else goal_x - x
+				if w - dx < dx:
+					dx = w - dx
+				dy = y - goal_y if y >= goal_y else goal_y - y
+				dz = heights[nxt] - goal_z
+				if dz < 0:
+					dz = -dz
+				heappush(open_set, (tentative + dx + dy + dz, nxt))
+
+		return []
@@ -0,0 +1,363 @@
+"""
+Flow fields, for many actors heading to the same place.
+
+A flow field is one Dijkstra search out from a goal, over the cells within
+a radius of it, that leaves every cell the cost of getting to the goal and
+the next cell to step to. Any number of actors in the field can then walk
+their path out of it, in time proportional to the path's length, instead
+of each searching on their own.
+
+A field only pays for itself once several actors share it, so a goal gets
+one the second time it's asked for; a one-off move is searched for with
+`hpa_astar` instead. Fields are cached by goal, dropping the least recently
+used. A field is thrown away when the terrain changes inside it (through
+the terrain journal), or when the occupancy it was built with is out of
+date.
+"""
+
+import weakref
+
+from collections import OrderedDict
+
+import numpy as np
+from scipy.sparse import coo_matrix
+from scipy.sparse.csgraph import dijkstra
+
+from src.math.vector2 import Vector2
+from src.path.astar_engine import CARDINALS, DELTAS
+from src.path.hpa import hpa_astar
+from src.world.terrain import Terrain
+from src.world.terrain_journal import TerrainLayer
+
+# How far from its goal a field reaches, in cells along each axis.
+DEFAULT_RADIUS = 64
+
+# How many fields are kept.
+DEFAULT_CAPACITY = 16
+
+# How many goals without fields are remembered, per field kept.
+ASKED_PER_FIELD = 4
+
+_services = weakref.WeakKeyDictionary()
+
+
+
+def flow_fields_for(terrain: Terrain) -> 'FlowFieldService':
+	"""
+	Returns the flow field service for the terrain, making it the first
+	time.
+	"""
+	service = _services.get(terrain)
+	if service is None:
+		service = FlowFieldService(terrain)
+		_services[terrain] = service
+	return service
+
+
+def flow_astar(
+		start,
+		goal,
+		terrain: Terrain,
+		is_cell_occupied=None,
+		occupied_mask=None,
+		occupancy_version=None
+):
+	"""
+	Like `astar`, but walks the path out of the goal's flow field, if the
+	goal has one or was asked for lately (see `FlowFieldService.wants_field`).
+	Other goals, and starts outside the field, go to `hpa_astar`.
+
+	occupied_mask(origin, size) returns which cells of a rectangle are
+	occupied, as a (rows, columns) boolean array; with it, fields go around
+	occupied cells. occupancy_version should change whenever what
+	occupied_mask would say does. Paths are still checked against
+	is_cell_occupied, in case the field is out of date, and searched for
+	the old way if they run into something.
+	"""
+	if is_cell_occupied is not None and is_cell_occupied(goal):
+		return []
+	service = flow_fields_for(terrain)
+	cells = None
+	if service.wants_field(goal):
+		cells = service.path(start, goal, occupied_mask, occupancy_version)
+	if cells is not None and is_cell_occupied is not None:
+		if any(is_cell_occupied(cell) for cell in cells[1:]):
+			cells = None
+	if cells is None:
+		return hpa_astar(start, goal, terrain, is_cell_occupied)
+	return [start] + [Vector2(*cell) for cell in cells[1:]]
+
+
+
+class FlowField:
+	"""
+	The costs to a goal, and the next step towards it, for every cell within
+	a window around the goal.
+	"""
+
+	goal: tuple[int, int]
+
+	# The window is the columns x0, x0 + 1, ... (wrapping around) and the
+	# rows y0 <= y < y1. Local indices go column by column.
+	x0: int
+	columns: int
+	y0: int
+	y1: int
+
+	# Per local index: the cost to the goal (inf if it can't get there), and
+	# the local index of the next cell on the way.
+	dist: np.ndarray
+	next: np.ndarray
+
+	# The occupancy the field was built with.
+	occupancy_version: object
+
+	def __init__(
+			self,
+			terrain: Terrain,
+			goal,
+			radius: int,
+			occupied_mask=None,
+			occupancy_version=None
+	):
+		self._width = terrain.width
+		gx, gy = goal
+		gx %= self._width
+		self.goal = (gx, gy)
+		if 2 * radius + 1 >= self._width:
+			self.x0 = 0
+			self.columns = self._width
+		else:
+			self.x0 = (gx - radius) % self._width
+			self.columns = 2 * radius + 1
+		self.y0 = max(gy - radius, 0)
+		self.y1 = min(gy + radius + 1, terrain.height)
+		self.occupancy_version = occupancy_version
+
+		blocked = None
+		if occupied_mask is not None:
+			blocked = occupied_mask(
+				(self.x0, self.y0),
+				(self.columns, self.y1 - self.y0)
+			).swapaxes(0, 1).ravel()
+		graph = self._make_graph(terrain.height_deltas, blocked)
+		# Searching the reversed graph from the goal gives every cell's cost
+		# to the goal, and for each, the next cell on its way there.
+		self.dist, self.next = dijkstra(
+			graph.T,
+			indices=self.local(self.goal),
+			return_predecessors=True
+		)
+
+
+	def _make_graph(self, deltas, blocked):
+		"""
+		Returns the window's cells as a sparse graph of the steps between
+		them, weighted like `astar`. Steps into blocked cells are left out.
+		"""
+		rows = self.y1 - self.y0
+		cs, ys = np.meshgrid(
+			np.arange(self.columns),
+			np.arange(self.y0, self.y1),
+			indexing='ij'
+		)
+		xs = (self.x0 + cs) % self._width
+		src = cs * rows + (ys - self.y0)
+		here = deltas[ys, xs].astype(np.int64)
+		full_width = self.columns == self._width
+		srcs, dsts, costs = [], [], []
+		for direction in CARDINALS:
+			dx, dy = DELTAS[direction]
+			ncs = cs + dx
+			if full_width:
+				ncs %= self._width
+			nys = ys + dy
+			inside = (
+				(ncs >= 0) & (ncs < self.columns)
+				& (nys >= self.y0) & (nys < self.y1)
+			)
+			dst = ncs * rows + (nys - self.y0)
+			if blocked is not None:
+				inside[inside] &= ~blocked[dst[inside]]
+			srcs.append(src[inside])
+			dsts.append(dst[inside])
+			costs.append(np.abs(here[..., direction.value][inside]) + 1)
+		n = self.columns * rows
+		return coo_matrix(
+			(np.concatenate(costs), (np.concatenate(srcs), np.concatenate(dsts))),
+			shape=(n, n)
+		).tocsr()
+
+
+	def local(self, cell) -> int:
+		"""
+		Returns the local index of a cell, or -1 if it's outside the window.
+		"""
+		x, y = cell
+		column = (x - self.x0) % self._width
+		if column >= self.columns or not self.y0 <= y < self.y1:
+			return -1
+		return column * (self.y1 - self.y0) + (y - self.y0)
+
+
+	def cell(self, local: int) -> tuple[int, int]:
+		"""
+		Returns the cell of a local index.
+		"""
+		column, row = divmod(local, self.y1 - self.y0)
+		return (self.x0 + column) % self._width, self.y0 + row
+
+
+	def cost(self, start) -> float:
+		"""
+		Returns the cost from start to the goal; inf if start can't get
+		there, or is outside the window.
+		"""
+		local = self.local(start)
+		if local < 0:
+			return np.inf
+		return float(self.dist[local])
+
+
+	def path(self, start) -> list[tuple[int, int]]:
+		"""
+		Returns the cells from start to the goal, both included, or None if
+		start can't get there within the window.
+		"""
+		local = self.local(start)
+		if local < 0 or self.dist[local] == np.inf:
+			return None
+		x, y = start
+		cells = [(x % self._width, y)]
+		nxt = self.next
+		goal = self.local(self.goal)
+		while local != goal:
+			local = int(nxt[local])
+			cells.append(self.cell(local))
+		return cells
+
+
+	def touches(self, xs: np.ndarray, ys: np.ndarray) -> bool:
+		"""
+		True if any of the cells are in the window, or next to it.
+		"""
+		columns = (xs - self.x0 + 1) % self._width
+		inside_x = columns < self.columns + 2
+		if self.columns == self._width:
+			inside_x[:] = True
+		inside_y = (ys >= self.y0 - 1) & (ys <= self.y1)
+		return bool((inside_x & inside_y).any())
+
+
+
+class FlowFieldService:
+	"""
+	Makes and caches the flow fields of one terrain.
+	"""
+
+	radius: int
+	capacity: int
+
+	# Goal -> field, least recently used first.
+	_fields: OrderedDict
+
+	# Goals asked for without a field, least recently first.
+	_asked: OrderedDict
+
+	def __init__(
+			self,
+			terrain: Terrain,
+			radius: int = DEFAULT_RADIUS,
+			capacity: int = DEFAULT_CAPACITY
+	):
+		self._terrain = terrain
+		self.radius = radius
+		self.capacity = capacity
+		self._fields = OrderedDict()
+		self._asked = OrderedDict()
+		self._changes = terrain.journal.subscribe(TerrainLayer.HEIGHT)
+
+
+	def __len__(self):
+		return len(self._fields)
+
+
+	def __contains__(self, goal):
+		return self._key(goal) in self._fields
+
+
+	def _key(self, goal):
+		x, y = goal
+		return (x % self._terrain.width, y)
+
+
+	def wants_field(self, goal) -> bool:
+		"""
+		True if goal has a field, or was asked about lately; a field is
+		worth making for the second actor heading there, not the first.
+		"""
+		key = self._key(goal)
+		if key in self._fields or key in self._asked:
+			self._asked.pop(key, None)
+			return True
+		self._asked[key] = True
+		while len(self._asked) > self.capacity * ASKED_PER_FIELD:
+			self._asked.popitem(last=False)
+		return False
+
+
+	def _refresh(self):
+		"""
+		Throws away the fields the terrain changed under.
+		"""
+		if not self._changes.has_changes:
+			return
+		xs, ys = self._changes.pull_arrays()
+		for goal, field in list(self._fields.items()):
+			if field.touches(xs, ys):
+				del self._fields[goal]
+
+
+	def field(
+			self,
+			goal,
+			occupied_mask=None,
+			occupancy_version=None
+	) -> FlowField:
+		"""
+		Returns the flow field to goal, making it if there isn't one for
+		this occupancy.
+		"""
+		self._refresh()
+		key = self._key(goal)
+		field = self._fields.get(key)
+		if field is not None and field.occupancy_version == occupancy_version:
+			self._fields.move_to_end(key)
+			return field
+		field = FlowField(
+			self._terrain,
+			key,
+			self.radius,
+			occupied_mask,
+			occupancy_version
+		)
+		self._fields[key] = field
+		self._fields.move_to_end(key)
+		while len(self._fields) > self.capacity:
+			self._fields.popitem(last=False)
+		return field
+
+
+	def path(
+			self,
+			start,
+			goal,
+			occupied_mask=None,
+			occupancy_version=None
+	) -> list[tuple[int, int]]:
+		"""
+		Returns the cells from start to goal out of goal's flow field, or
+		None if start can't get there within the field.
+		"""
+		field = self.field(goal, occupied_mask, occupancy_version)
+		return field.path(start)
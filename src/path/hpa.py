@@ -0,0 +1,587 @@
+"""
+Hierarchical pathfinding (HPA*), for paths across continents.
+
+The terrain is cut into square clusters (16 cells a side by default, like
+the render chunks). Where two clusters meet, each stretch of border gets an
+entrance: the pair of cells, one either side, that is cheapest to cross.
+The entrance cells are the nodes of an abstract graph, joined across
+borders by the crossing and within a cluster by the cheapest path through
+the cluster (found with scipy's Dijkstra, the first time the cluster is
+searched). Costs are the same `height_delta`-based step costs as `astar`.
+
+A search connects the start and goal to the nodes of their clusters, runs
+A* over the abstract graph, then refines each abstract step into cells
+from the predecessors Dijkstra left behind; the cell paths inside a cluster
+are only ever worked out for the steps a path takes. The result is near
+optimal, rather than optimal. Short paths are left to the flat search.
+
+The clusters follow the terrain's height changes through its journal:
+changed cells throw away their clusters' graphs and redo the entrances on
+their borders, catching up at the start of each search.
+"""
+
+import heapq
+import weakref
+
+import numpy as np
+from scipy.sparse import coo_matrix
+from scipy.sparse.csgraph import dijkstra
+
+from src.math.direction import Direction
+from src.math.vector2 import Vector2
+from src.path.astar_engine import CARDINALS, DELTAS, engine_for
+from src.world.terrain import Terrain
+from src.world.terrain_journal import TerrainLayer
+
+DEFAULT_CLUSTER_SIZE = 16
+
+# Paths between cells fewer than this many clusters apart (in wrapped
+# Manhattan distance) are found by the flat search, which is optimal and
+# quick enough at that range.
+FLAT_CLUSTERS = 2
+
+# How an abstract step is turned back into cells.
+_CROSS = 0
+_INTRA = 1
+_FROM_START = 2
+_TO_GOAL = 3
+
+_pathfinders = weakref.WeakKeyDictionary()
+
+
+
+def pathfinder_for(terrain: Terrain) -> 'HierarchicalPathfinder':
+	"""
+	Returns the hierarchical pathfinder for the terrain, making it the first
+	time.
+	"""
+	pathfinder = _pathfinders.get(terrain)
+	if pathfinder is None:
+		pathfinder = HierarchicalPathfinder(terrain)
+		_pathfinders[terrain] = pathfinder
+	return pathfinder
+
+
+def hpa_astar(start, goal, terrain: Terrain, is_cell_occupied=None):
+	"""
+	Like `astar`, but searches the terrain's clusters first. Paths are near
+	optimal rather than optimal.
+	"""
+	pathfinder = pathfinder_for(terrain)
+	engine = pathfinder.engine
+	is_blocked = None
+	if is_cell_occupied is not None:
+		cell = engine.cell
+		def is_blocked(index):
+			return is_cell_occupied(cell(index))
+	path = pathfinder.search(
+		engine.index(start),
+		engine.index(goal),
+		is_blocked
+	)
+	if not path:
+		return []
+	return [start] + [Vector2(*engine.cell(index)) for index in path[1:]]
+
+
+
+class ClusterGraph:
+	"""
+	The cells of one cluster as a graph, and the cheapest paths between its
+	entrance nodes.
+	"""
+
+	# The cluster's cells are x0 <= x < x1, y0 <= y < y1. Local indices are
+	# column by column, like the engine's.
+	x0: int
+	x1: int
+	y0: int
+	y1: int
+
+	graph: object
+
+	# The entrance nodes (as cell indices), and for each, the costs and
+	# predecessors of Dijkstra from it, by local index.
+	nodes: list[int]
+	_rows: dict[int, int]
+	_dist: np.ndarray
+	_pred: np.ndarray
+
+	# node -> [(other node, cost)] within the cluster.
+	edges: dict[int, list[tuple[int, int]]]
+
+	def __init__(self, bounds, map_height, deltas, nodes):
+		self.x0, self.x1, self.y0, self.y1 = bounds
+		self._map_height = map_height
+		self.graph = self._make_graph(deltas)
+		self.nodes = sorted(nodes)
+		self._rows = {node: row for row, node in enumerate(self.nodes)}
+		self.edges = {}
+		if not self.nodes:
+			return
+		locals_ = [self.local(node) for node in self.nodes]
+		self._dist, self._pred = dijkstra(
+			self.graph,
+			indices=locals_,
+			return_predecessors=True
+		)
+		for row, node in enumerate(self.nodes):
+			costs = self._dist[row, locals_]
+			self.edges[node] = [
+				(other, int(cost))
+				for other, cost in zip(self.nodes, costs.tolist())
+				if other != node and cost != np.inf
+			]
+
+
+	def _make_graph(self, deltas):
+		"""
+		Returns the cluster's cells as a sparse graph whose edges are the
+		steps between them, weighted like `astar`.
+		"""
+		x0, x1, y0, y1 = self.x0, self.x1, self.y0, self.y1
+		cols = x1 - x0
+		rows = y1 - y0
+		width = deltas.shape[1]
+		xs, ys = np.meshgrid(np.arange(x0, x1), np.arange(y0, y1), indexing='ij')
+		src = (xs - x0) * rows + (ys - y0)
+		block = deltas[y0:y1, x0:x1].swapaxes(0, 1).astype(np.int64)
+		srcs, dsts, costs = [], [], []
+		for direction in CARDINALS:
+			dx, dy = DELTAS[direction]
+			nx = (xs + dx) % width
+			ny = ys + dy
+			inside = (nx >= x0) & (nx < x1) & (ny >= y0) & (ny < y1)
+			srcs.append(src[inside])
+			dsts.append(((nx - x0) * rows + (ny - y0))[inside])
+			costs.append(np.abs(block[..., direction.value][inside]) + 1)
+		n = cols * rows
+		return coo_matrix(
+			(np.concatenate(costs), (np.concatenate(srcs), np.concatenate(dsts))),
+			shape=(n, n)
+		).tocsr()
+
+
+	def local(self, index: int) -> int:
+		"""
+		Returns the local index of a cell of the cluster.
+		"""
+		x, y = divmod(index, self._map_height)
+		return (x - self.x0) * (self.y1 - self.y0) + (y - self.y0)
+
+
+	def index(self, local: int) -> int:
+		"""
+		Returns the cell index of a local index.
+		"""
+		lx, ly = divmod(local, self.y1 - self.y0)
+		return (self.x0 + lx) * self._map_height + self.y0 + ly
+
+
+	def contains(self, index: int) -> bool:
+		"""
+		True if the cell is in the cluster.
+		"""
+		x, y = divmod(index, self._map_height)
+		return self.x0 <= x < self.x1 and self.y0 <= y < self.y1
+
+
+	def from_cell(self, index: int) -> tuple[np.ndarray, np.ndarray]:
+		"""
+		Returns the costs from a cell to every cell of the cluster, and the
+		predecessors to walk back along.
+		"""
+		return dijkstra(
+			self.graph,
+			indices=self.local(index),
+			return_predecessors=True
+		)
+
+
+	def to_cell(self, index: int) -> tuple[np.ndarray, np.ndarray]:
+		"""
+		Returns the costs from every cell of the cluster to a cell, and for
+		each cell the next one on its way there.
+		"""
+		return dijkstra(
+			self.graph.T,
+			indices=self.local(index),
+			return_predecessors=True
+		)
+
+
+	def walk_back(self, pred, source: int, target: int) -> list[int]:
+		"""
+		Returns the cells after source up to target, following Dijkstra's
+		predecessors from source.
+		"""
+		stop = self.local(source)
+		local = self.local(target)
+		cells = []
+		while local != stop:
+			cells.append(self.index(local))
+			local = pred[local]
+		return cells[::-1]
+
+
+	def walk_forward(self, pred, source: int, target: int) -> list[int]:
+		"""
+		Returns the cells after source up to target, following the next
+		cells left by `to_cell(target)`.
+		"""
+		stop = self.local(target)
+		local = self.local(source)
+		cells = []
+		while local != stop:
+			local = pred[local]
+			cells.append(self.index(local))
+		return cells
+
+
+	def node_path(self, source: int, target: int) -> list[int]:
+		"""
+		Returns the cells after one entrance node up to another.
+		"""
+		return self.walk_back(self._pred[self._rows[source]], source, target)
+
+
+
+class HierarchicalPathfinder:
+	"""
+	Finds paths on one terrain by way of its clusters.
+	"""
+
+	width: int
+	height: int
+	cluster_size: int
+
+	# How many clusters there are across and down.
+	clusters_x: int
+	clusters_y: int
+
+	# (cluster, side) -> [(a, b, a to b cost, b to a cost)], for the east
+	# and south borders of each cluster.
+	_borders: dict
+
+	# node -> {node across a border: cost}
+	_cross: dict[int, dict[int, int]]
+
+	# cluster -> its entrance nodes
+	_nodes: dict[tuple[int, int], set[int]]
+
+	# cluster -> its graph, built when first searched.
+	_graphs: dict[tuple[int, int], ClusterGraph]
+
+	def __init__(self, terrain: Terrain, cluster_size=DEFAULT_CLUSTER_SIZE):
+		self._terrain = terrain
+		self.engine = engine_for(terrain)
+		self.width, self.height = terrain.dimensions
+		self.cluster_size = cluster_size
+		self.clusters_x = -(-self.width // cluster_size)
+		self.clusters_y = -(-self.height // cluster_size)
+		self._entrance_span = max(1, cluster_size // 2)
+		self._changes = terrain.journal.subscribe(TerrainLayer.HEIGHT)
+		self._borders = {}
+		self._cross = {}
+		self._nodes = {
+			(cx, cy): set()
+			for cx in range(self.clusters_x)
+			for cy in range(self.clusters_y)
+		}
+		self._graphs = {}
+		for cluster in self._nodes:
+			for side in (Direction.EAST, Direction.SOUTH):
+				self._set_border(cluster, side)
+
+
+	def cluster_of(self, index: int) -> tuple[int, int]:
+		"""
+		Returns the cluster a cell is in.
+		"""
+		x, y = divmod(index, self.height)
+		return x // self.cluster_size, y // self.cluster_size
+
+
+	def _bounds(self, cluster) -> tuple[int, int, int, int]:
+		cx, cy = cluster
+		size = self.cluster_size
+		return (
+			cx * size,
+			min((cx + 1) * size, self.width),
+			cy * size,
+			min((cy + 1) * size, self.height),
+		)
+
+
+	def _border_cells(self, cluster, side):
+		"""
+		Returns the cells on either side of a cluster's east or south border
+		as (xs, ys) of the near side, the far side, and the direction from
+		near to far; or None if there's no border there (the bottom row of
+		clusters has nothing to its south).
+		"""
+		x0, x1, y0, y1 = self._bounds(cluster)
+		if side == Direction.EAST:
+			ys = np.arange(y0, y1)
+			near = (np.full(len(ys), x1 - 1), ys)
+			far = (np.full(len(ys), x1 % self.width), ys)
+			return near, far
+		if y1 >= self.height:
+			return None
+		xs = np.arange(x0, x1)
+		near = (xs, np.full(len(xs), y1 - 1))
+		far = (xs, np.full(len(xs), y1))
+		return near, far
+
+
+	def _find_entrances(self, cluster, side) -> list[tuple[int, int, int, int]]:
+		"""
+		Returns the entrances on a border: the cheapest crossing in each
+		stretch of it.
+		"""
+		cells = self._border_cells(cluster, side)
+		if cells is None:
+			return []
+		(nxs, nys), (fxs, fys) = cells
+		deltas = self._terrain.height_deltas
+		opposite = Direction.WEST if side == Direction.EAST else Direction.NORTH
+		there = np.abs(deltas[nys, nxs, side.value].astype(np.int64)) + 1
+		back = np.abs(deltas[fys, fxs, opposite.value].astype(np.int64)) + 1
+		both = there + back
+		entrances = []
+		for lo in range(0, len(both), self._entrance_span):
+			k = lo + int(np.argmin(both[lo:lo + self._entrance_span]))
+			entrances.append((
+				int(nxs[k]) * self.height + int(nys[k]),
+				int(fxs[k]) * self.height + int(fys[k]),
+				int(there[k]),
+				int(back[k]),
+			))
+		return entrances
+
+
+	def _set_border(self, cluster, side) -> set[tuple[int, int]]:
+		"""
+		Redoes the entrances on a border. Returns the clusters whose nodes
+		changed.
+		"""
+		old = self._borders.get((cluster, side), [])
+		new = self._find_entrances(cluster, side)
+		if old == new:
+			return set()
+		for a, b, _, _ in old:
+			self._unlink(a, b)
+			self._unlink(b, a)
+		for a, b, there, back in new:
+			self._link(a, b, there)
+			self._link(b, a, back)
+		self._borders[(cluster, side)] = new
+		return {
+			self.cluster_of(cell)
+			for a, b, _, _ in old + new
+			for cell in (a, b)
+		}
+
+
+	def _link(self, a, b, cost):
+		self._cross.setdefault(a, {})[b] = cost
+		self._nodes[self.cluster_of(a)].add(a)
+
+
+	def _unlink(self, a, b):
+		links = self._cross[a]
+		del links[b]
+		if not links:
+			del self._cross[a]
+			self._nodes[self.cluster_of(a)].discard(a)
+
+
+	def _graph(self, cluster) -> ClusterGraph:
+		graph = self._graphs.get(cluster)
+		if graph is None:
+			graph = ClusterGraph(
+				self._bounds(cluster),
+				self.height,
+				self._terrain.height_deltas,
+				self._nodes[cluster]
+			)
+			self._graphs[cluster] = graph
+		return graph
+
+
+	def _refresh(self):
+		"""
+		Catches the clusters up with the terrain's height changes.
+		"""
+		if not self._changes.has_changes:
+			return
+		xs, ys = self._changes.pull_arrays()
+		size = self.cluster_size
+		# A step's cost depends on the cells at both ends, so the clusters
+		# next to a changed cell are touched too.
+		dirty = set()
+		for dx, dy in ((0, 0), (0, -1), (1, 0), (0, 1), (-1, 0)):
+			nys = ys + dy
+			inside = (nys >= 0) & (nys < self.height)
+			cxs = ((xs[inside] + dx) % self.width) // size
+			cys = nys[inside] // size
+			dirty.update(zip(cxs.tolist(), cys.tolist()))
+		stale = set(dirty)
+		for cx, cy in dirty:
+			west = ((cx - 1) % self.clusters_x, cy)
+			north = (cx, cy - 1)
+			stale |= self._set_border((cx, cy), Direction.EAST)
+			stale |= self._set_border((cx, cy), Direction.SOUTH)
+			stale |= self._set_border(west, Direction.EAST)
+			if cy > 0:
+				stale |= self._set_border(north, Direction.SOUTH)
+		for cluster in stale:
+			self._graphs.pop(cluster, None)
+
+
+	def _is_close(self, start: int, goal: int) -> bool:
+		sx, sy = divmod(start, self.height)
+		gx, gy = divmod(goal, self.height)
+		dx = abs(sx - gx)
+		dx = min(dx, self.width - dx)
+		return dx + abs(sy - gy) < FLAT_CLUSTERS * self.cluster_size
+
+
+	def _abstract_path(self, start: int, goal: int):
+		"""
+		Returns the abstract path from start to goal as [(cell, kind)] hops,
+		where kind says how the hop gets from the cell before; plus the
+		start and goal clusters' Dijkstra predecessors. None if there's no
+		path.
+		"""
+		start_cluster = self.cluster_of(start)
+		goal_cluster = self.cluster_of(goal)
+		start_graph = self._graph(start_cluster)
+		goal_graph = self._graph(goal_cluster)
+		start_dist, start_pred = start_graph.from_cell(start)
+		goal_dist, goal_pred = goal_graph.to_cell(goal)
+
+		start_edges = [
+			(node, _FROM_START, start_dist[start_graph.local(node)])
+			for node in start_graph.nodes
+		]
+		if start_cluster == goal_cluster:
+			start_edges.append(
+				(goal, _FROM_START, start_dist[start_graph.local(goal)])
+			)
+		to_goal = {
+			node: goal_dist[goal_graph.local(node)]
+			for node in goal_graph.nodes
+		}
+
+		width = self.width
+		height = self.height
+		heights = self.engine.heights
+		goal_x, goal_y = divmod(goal, height)
+		goal_z = heights[goal]
+		g_score = {start: 0}
+		came_from = {}
+		closed = set()
+		open_set = [(0, start)]
+		while open_set:
+			_, current = heapq.heappop(open_set)
+			if current in closed:
+				continue
+			closed.add(current)
+			if current == goal:
+				hops = []
+				while current != start:
+					prev, kind = came_from[current]
+					hops.append((current, kind))
+					current = prev
+				return hops[::-1], start_pred, goal_pred
+			if current == start:
+				edges = list(start_edges)
+			else:
+				graph = self._graph(self.cluster_of(current))
+				edges = [
+					(node, _INTRA, cost)
+					for node, cost in graph.edges.get(current, ())
+				]
+				if current in to_goal:
+					edges.append((goal, _TO_GOAL, to_goal[current]))
+			for node, cost in self._cross.get(current, {}).items():
+				edges.append((node, _CROSS, cost))
+			g_current = g_score[current]
+			for node, kind, cost in edges:
+				if cost == np.inf:
+					continue
+				tentative = g_current + int(cost)
+				if node in g_score and tentative >= g_score[node]:
+					continue
+				g_score[node] = tentative
+				came_from[node] = (current, kind)
+				closed.discard(node)
+				# The wrapped Manhattan distance to the goal, plus the height
+				# difference, as in `AstarEngine`.
+				x, y = divmod(node, height)
+				dx = abs(x - goal_x)
+				dx = min(dx, width - dx)
+				f = tentative + dx + abs(y - goal_y) + abs(heights[node] - goal_z)
+				heapq.heappush(open_set, (f, node))
+		return None
+
+
+	def _refine_hop(self, prev, cell, kind, start_pred, goal_pred):
+		"""
+		Returns the cells after prev up to cell.
+		"""
+		if kind == _CROSS:
+			return [cell]
+		graph = self._graph(self.cluster_of(prev))
+		if kind == _FROM_START:
+			return graph.walk_back(start_pred, prev, cell)
+		if kind == _TO_GOAL:
+			return graph.walk_forward(goal_pred, prev, cell)
+		return graph.node_path(prev, cell)
+
+
+	def search(self, start: int, goal: int, is_blocked=None) -> list[int]:
+		"""
+		Like `AstarEngine.search`: returns the indices of a cheap path from
+		start to goal, both included, or an empty list if there isn't one.
+
+		Occupied cells aren't known to the clusters. A stretch of the path
+		through one is searched again within its cluster, and if that fails
+		too, the whole path is left to the flat search.
+		"""
+		if is_blocked is not None and is_blocked(goal):
+			return []
+		if start == goal or self._is_close(start, goal):
+			return self.engine.search(start, goal, is_blocked)
+		self._refresh()
+		found = self._abstract_path(start, goal)
+		if found is None:
+			return self.engine.search(start, goal, is_blocked)
+		hops, start_pred, goal_pred = found
+		path = [start]
+		for cell, kind in hops:
+			prev = path[-1]
+			cells = self._refine_hop(prev, cell, kind, start_pred, goal_pred)
+			if is_blocked is not None and any(map(is_blocked, cells)):
+				cells = self._detour(prev, cell, kind, is_blocked)
+				if cells is None:
+					return self.engine.search(start, goal, is_blocked)
+			path.extend(cells)
+		return path
+
+
+	def _detour(self, prev, cell, kind, is_blocked):
+		"""
+		Returns the cells after prev up to cell, avoiding blocked cells and
+		staying in the hop's cluster; or None if there's no way.
+		"""
+		if kind == _CROSS:
+			return None
+		graph = self._graph(self.cluster_of(prev))
+		def is_out(index):
+			return not graph.contains(index) or is_blocked(index)
+		cells = self.engine.search(prev, cell, is_out)
+		if not cells:
+			return None
+		return cells[1:]
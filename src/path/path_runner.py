@@ -125,6 +125,14 @@ class PathRunner:
 			dir_delta = last - prev_last
 			self._direction = delta_to_direction(dir_delta)
 
+	def stop(self):
+		"""
+		Stops where it is, dropping the rest of the path without calling
+		on_done.
+		"""
+		self._position = self.position
+		self._clearPath()
+
 	@property
 	def target(self):
 		"""
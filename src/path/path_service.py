@@ -0,0 +1,223 @@
+"""
+Finds paths off the main thread, so a long search never stalls a frame.
+
+Path requests go into a queue and come back as `PathRequest` handles. The
+searches run on a worker thread, against a copy of which cells were occupied
+when they were asked for. Their paths are handed back on the main thread, in
+`PathService.tick`, which stops for the frame once it has used up its time
+budget.
+
+There is one worker: the search caches of a terrain (see `engine_for`,
+`pathfinder_for` and `flow_fields_for`) can only be used by one search at a
+time. With no worker, searches run inside `tick` instead; a search can't be
+cut short, so one long search overruns the budget by however long it takes.
+That's for tests and tools, not the game loop.
+"""
+
+import time
+
+from collections import deque
+from concurrent.futures import ThreadPoolExecutor
+
+import numpy as np
+
+from src.path.flow_field import flow_astar
+from src.world.terrain import Terrain
+
+# How long, in seconds, a tick can spend handing back paths (or finding
+# them, without a worker; no search starts once it's spent).
+DEFAULT_BUDGET = 0.002
+
+
+
+class PathRequest:
+	"""
+	A handle to a path being looked for.
+	"""
+
+	start: tuple[int, int]
+	goal: tuple[int, int]
+
+	# The path found, once it's handed back. Empty if there isn't one.
+	path: list = None
+
+	cancelled: bool = False
+
+	def __init__(self, start, goal, on_done=None):
+		self.start = start
+		self.goal = goal
+		self._on_done = on_done
+		self._future = None
+		self._search = None
+
+
+	def done(self) -> bool:
+		"""
+		True once the path has been handed back.
+		"""
+		return self.path is not None
+
+
+	def cancel(self):
+		"""
+		Stops the path from being handed back, and from being looked for if
+		it hasn't been yet.
+		"""
+		self.cancelled = True
+		if self._future is not None:
+			self._future.cancel()
+
+
+	def _deliver(self, path):
+		self.path = path
+		if self._on_done:
+			self._on_done(path)
+
+
+
+def _occupancy(occupied: np.ndarray):
+	"""
+	Returns an is_cell_occupied and an occupied_mask, as `flow_astar` takes
+	them, for an occupancy grid of (rows, columns).
+	"""
+	rows, columns = occupied.shape
+
+	def is_cell_occupied(cell):
+		x, y = cell
+		return 0 <= y < rows and bool(occupied[y, x % columns])
+
+	def occupied_mask(origin, size):
+		ox, oy = origin
+		width, height = size
+		xs = np.arange(ox, ox + width) % columns
+		return occupied[oy:oy + height][:, xs]
+
+	return is_cell_occupied, occupied_mask
+
+
+
+class PathService:
+	"""
+	Queues up path requests and hands back what they find.
+	"""
+
+	# Worker threads; with none, paths are found in `tick` (see the module
+	# docstring).
+	workers: int
+
+	budget: float
+
+	# Requests not handed back yet, oldest first.
+	_pending: deque
+
+	def __init__(
+			self,
+			workers: int = 1,
+			budget: float = DEFAULT_BUDGET
+	):
+		if workers > 1:
+			raise ValueError("Searches on a terrain can't run side by side")
+		self.workers = workers
+		self.budget = budget
+		self._pending = deque()
+		self._executor = None
+
+
+	def __len__(self):
+		return len(self._pending)
+
+
+	def request(
+			self,
+			terrain: Terrain,
+			start,
+			goal,
+			occupied: np.ndarray = None,
+			occupancy_version=None,
+			on_done=None
+	) -> PathRequest:
+		"""
+		Asks for a path from start to goal on the terrain, around the cells
+		that are True in occupied (a grid the size of the terrain, which is
+		not written to after). on_done is called with the path when it's
+		handed back; the path is empty if there isn't one.
+		"""
+		request = PathRequest(start, goal, on_done)
+		request._search = (terrain, start, goal, occupied, occupancy_version)
+		if self.workers:
+			if self._executor is None:
+				self._executor = ThreadPoolExecutor(
+					max_workers=self.workers,
+					thread_name_prefix='path'
+				)
+			request._future = self._executor.submit(self._search, request)
+		self._pending.append(request)
+		return request
+
+
+	def _search(self, request: PathRequest) -> list:
+		terrain, start, goal, occupied, occupancy_version = request._search
+		is_cell_occupied, occupied_mask = None, None
+		if occupied is not None:
+			is_cell_occupied, occupied_mask = _occupancy(occupied)
+		return flow_astar(
+			start,
+			goal,
+			terrain,
+			is_cell_occupied,
+			occupied_mask,
+			occupancy_version
+		)
+
+
+	def _finish(self, request: PathRequest, wait: bool) -> bool:
+		"""
+		Hands back the request's path, if it's been found (or wait is set).
+		Returns False if it hasn't been.
+		"""
+		if request._future is None:
+			path = self._search(request)
+		elif wait or request._future.done():
+			path = request._future.result()
+		else:
+			return False
+		request._deliver(path)
+		return True
+
+
+	def tick(self):
+		"""
+		Hands back the paths found since the last tick, in the order they were
+		asked for, until the budget runs out. Without a worker, finds them
+		too, starting none once the budget is spent.
+		"""
+		deadline = time.perf_counter() + self.budget
+		while self._pending:
+			request = self._pending[0]
+			if not request.cancelled and not self._finish(request, False):
+				break
+			self._pending.popleft()
+			if time.perf_counter() >= deadline:
+				break
+
+
+	def flush(self):
+		"""
+		Waits for every path asked for, and hands them all back.
+		"""
+		while self._pending:
+			request = self._pending.popleft()
+			if not request.cancelled:
+				self._finish(request, True)
+
+
+	def shutdown(self):
+		"""
+		Drops every request, and stops the worker.
+		"""
+		for request in self._pending:
+			request.cancel()
+		self._pending.clear()
+		if self._executor is not None:
+			self._executor.shutdown(wait=False, cancel_futures=True)
+			self._executor = None
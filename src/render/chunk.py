@@ -24,6 +24,7 @@ from src.rendermath.order import cells_draw_order
 from src.rendermath.terrain import TERRAIN_STEPS_PER_CELL
 from src.rendermath.tile import tile_z_for_width
 from src.world.terrain import Terrain
+from src.world.terrain_journal import JournalReader, grow_rect
 
 from src.render.terrain_helper import TerrainSurfacer
 
@@ -417,6 +418,8 @@ class TerrainChunker:
 
 	_get_ridge_type: callable = None
 
+	_terrain_changes: JournalReader = None
+
 	def __init__(
 			self,
 			terrain: Terrain = None,
@@ -430,6 +433,8 @@ class TerrainChunker:
 		self._chunks = {}
 		self._dirty = set()
 		self._get_ridge_type = get_ridge_type
+		if terrain is not None:
+			self._terrain_changes = terrain.journal.subscribe()
 
 
 	def get_chunks(self):
@@ -467,6 +472,48 @@ class TerrainChunker:
 		self._dirty.add(chunk_index)
 
 
+	def mark_rect_dirty(self, rect: tuple[Vector2, Vector2]):
+		"""
+		Mark every chunk that intersects the rectangle (origin, size) dirty.
+		"""
+		(ox, oy), (sx, sy) = rect
+		y_min = max(oy, 0)
+		y_max = min(oy + sy, self._terrain.height) - 1
+		if y_max < y_min or sx <= 0:
+			return
+		xs = list(range(ox, ox + sx, self.chunk_size)) + [ox + sx - 1]
+		ys = list(range(y_min, y_max, self.chunk_size)) + [y_max]
+		for y in ys:
+			for x in xs:
+				self.mark_cell_dirty((x, y))
+
+
+	def sync_terrain(self):
+		"""
+		Marks the chunks around everything that changed in the terrain since
+		the last sync dirty, then rebuilds a few dirty chunks.
+		"""
+		if self._terrain_changes is not None:
+			for rect in self._terrain_changes.pull():
+				self.mark_rect_dirty(grow_rect(rect))
+		self.rebuild_dirty_chunks()
+
+
+	def rebuild_dirty_chunks(self, limit: int = None):
+		"""
+		Replaces up to `limit` (by default, _dirties_per_render) dirty chunks
+		with fresh ones. The rest are drawn cell by cell until their turn.
+		"""
+		if limit is None:
+			limit = self._dirties_per_render
+		for _ in range(min(limit, len(self._dirty))):
+			cx, cy = self._dirty.pop()
+			self._chunks.pop((cx, cy), None)
+			origin_y = cy * self.chunk_size
+			if 0 <= origin_y < self._terrain.height:
+				self.make_chunk(Vector2(cx * self.chunk_size, origin_y))
+
+
 	def is_cell_dirty(self, cell_pos: Vector2) -> bool:
 		"""
 		Is the cell dirty?
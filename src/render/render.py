@@ -285,6 +285,9 @@ class Render:
 
 		self.window.fill((0,0,200))
 
+		self.render_terrain.sync_terrain()
+		self._chunker.sync_terrain()
+
 		order = self.render_order()
 		render_tile = self.render_tile
 		render_gobj = self._render_game_object
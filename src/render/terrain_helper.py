@@ -1,4 +1,7 @@
 from src.world.terrain import Terrain
+from src.world.terrain_journal import (
+	JournalReader, TerrainLayer, grow_rect, rect_cells
+)
 from src.world.biome import Biome
 
 from src.math.direction import (
@@ -132,10 +135,13 @@ class TerrainHelper:
 
 	terrain_surfacer: TerrainSurfacer = None
 
+	_terrain_changes: JournalReader
+
 	def __init__(self, terrain: Terrain, vp: Viewport):
 		self.terrain = terrain
 		self.vp = vp
 		self.terrain_surfacer = TerrainSurfacer()
+		self._terrain_changes = terrain.journal.subscribe(TerrainLayer.HEIGHT)
 		self._calc_ridges()
 		self._calc_land_visibility()
 		self._calc_wall_thicknesses()
@@ -201,6 +207,30 @@ class TerrainHelper:
 			self._wall_thicknesses[d] = self._calc_wall_thicknesses_for_dir(d)
 
 
+	def _update_cell(self, cell_pos):
+		for d in DIAGONAL_DIRECTIONS:
+			self._all_ridge_draws[d][cell_pos] = self._calc_ridge(cell_pos, d)
+			self._wall_thicknesses[d][cell_pos] = (
+				self._calc_wall_thicknesses_for_cell_in_dir(cell_pos, d)
+			)
+		self._land_visibility[cell_pos] = self.land_visible_at(cell_pos)
+
+
+	def sync_terrain(self):
+		"""
+		Recomputes the cached ridges, land visibility, and wall thicknesses
+		around every cell whose height changed since the last sync. Returns
+		the rectangles that changed.
+		"""
+		rects = self._terrain_changes.pull()
+		w, h = self.terrain.dimensions
+		for rect in rects:
+			for x, y in rect_cells(grow_rect(rect)):
+				if 0 <= y < h:
+					self._update_cell((x % w, y))
+		return rects
+
+
 	def tile_bottom_polygon(self, tile_p):
 		"""
 		Return the polygon of the bottom of the rectangular prism of the tile
@@ -268,7 +298,7 @@ class TerrainHelper:
 		screen_x -= (self.vp.tile_width // 2)
 		screen_y -= (self.vp.tile_height // 2)
 		ridges = self._ridge_draws[cell_pos_mod]
-		biome = self_terrain.biomes[y][x_mod]
+		biome = self_terrain.biome_at(cell_pos_mod)
 
 		land_height = self_terrain.land_height_at(cell_pos)
 		delta_height = self._wall_thicknesses[self.vp.camera_orientation][cell_pos_mod]
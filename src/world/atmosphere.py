@@ -8,6 +8,8 @@ Further Reading:
 
 from enum import Enum
 
+import numpy as np
+
 from src.mgmt.listener import Listener
 from src.mgmt.event import Event
 from src.mgmt.event_manager import EventManager
@@ -121,11 +123,75 @@ def greenhouse_factor(weights):
 	k = ADJ_TPR * (greenhouseness(weights) / EARTH_GREENHOUSE_WEIGHTS)
 	return 1 + k
 
+# The elements in order of their values, which index the vectors below and
+# the state of `Atmosphere`.
+ELEMENTS = sorted(AtmosphereElement, key=lambda element: element.value)
+NUM_ELEMENTS = len(ELEMENTS)
+
+
+def element_vector(amounts) -> np.ndarray:
+	"""
+	Returns a dict of amounts by element as a vector indexed by element
+	value. Missing elements are zero.
+	"""
+	vector = np.zeros(NUM_ELEMENTS)
+	for element, amount in amounts.items():
+		vector[element.value] = amount
+	return vector
+
+
+def element_dict(vector) -> dict[AtmosphereElement, float]:
+	"""
+	The inverse of `element_vector`.
+	"""
+	return {element: float(vector[element.value]) for element in ELEMENTS}
+
+
+MOLAR_MASS_VECTOR = element_vector(ELEMENT_MOLAR_MASS)
+GREENHOUSE_WEIGHT_VECTOR = element_vector(GREENHOUSE_WEIGHTS)
+
 # This is the Stefan-Boltzman constant in different units. The normal one,
 # with a value of 5.67 * 10^-8, is in Watts per square meter per Kelvin^4.
 # This one is based on multiples of Earth's solar radiation.
 BOLTZMANN = (2.416 / 4) * 10**10
 
+class AtmosphereContribution:
+	"""
+	A handle on what one emitter (a tree, a factory) adds to an atmosphere's
+	deltas and transforms. See `Atmosphere.contribute`.
+	"""
+
+	_atmosphere = None
+
+	delta: dict[AtmosphereElement, float]
+	transform: dict[
+		tuple[AtmosphereElement, AtmosphereElement], tuple[float, float]
+	]
+
+	def __init__(self, atmosphere, delta, transform):
+		self._atmosphere = atmosphere
+		self.delta = delta
+		self.transform = transform
+
+
+	@property
+	def released(self) -> bool:
+		"""Whether the contribution has been taken back."""
+		return self._atmosphere is None
+
+
+	def release(self):
+		"""
+		Takes the contribution back out of the atmosphere. Releasing twice
+		does nothing.
+		"""
+		if self._atmosphere is None:
+			return
+		self._atmosphere.apply_contribution(self, -1)
+		self._atmosphere = None
+
+
+
 class Atmosphere(Listener, Tickable):
 	"""
 	The atmosphere of a planet is modeled by distributing many "units" of
@@ -135,21 +201,44 @@ class Atmosphere(Listener, Tickable):
 	For example, if the player plants a bunch of trees, the amount of carbon
 	removed from the atmosphere will be proportional to the number of trees
 	that the player planted.
+
+	The state is kept in small numpy arrays indexed by `AtmosphereElement`
+	value: a vector of totals, a vector of deltas, and a matrix of transforms
+	(consumed by [consumed, produced] and produced by [consumed, produced]).
+	`total`, `average`, `composition`, `delta`, and `transform` give the same
+	numbers as dicts keyed by element.
+
+	Derived quantities (density, temperatures, habitability) are memoized
+	against a version number that goes up whenever the totals change, along
+	with the other things they depend on (the overrides, the astronomy, and
+	the planet's area), so asking again between changes is free.
 	"""
 
 	_evt_mgr = None
 
-	total = None
-	average = None
-	composition = None
+	_total: np.ndarray
+	_average: np.ndarray
+	_delta: np.ndarray
 
-	delta = None
-	transform: dict[
-		tuple[AtmosphereElement, AtmosphereElement], tuple[int, int]
-	] = None
+	# What each transform consumes and produces per second, indexed
+	# [consumed element, produced element].
+	_consumed: np.ndarray
+	_produced: np.ndarray
+
+	# The (consumed, produced) index pairs of the transforms, in the order
+	# they were first changed. When an element runs short, earlier transforms
+	# get first pick of it.
+	_transform_order: list[tuple[int, int]]
 
 	planet_area = 1024 * 512
 
+	# Goes up every time the totals change.
+	_version: int = 0
+
+	# Memoized values by name, each with the `_state_key` it was worked out
+	# for.
+	_memo: dict
+
 	# Debug overrides
 	_tpr_surface_override: float = None
 	_density_override: float = None
@@ -162,17 +251,14 @@ class Atmosphere(Listener, Tickable):
 			planet_area=(1024 * 512),
 			evt_mgr: EventManager=None
 	):
-		self.total = {}
-		self.average = {}
-		self.composition = {}
 		self.planet_area = planet_area
 		self._evt_mgr = evt_mgr
+		self._memo = {}
 
-		self.delta = {
-			element: 0
-			for element in AtmosphereElement
-		}
-		self.transform = {}
+		self._delta = np.zeros(NUM_ELEMENTS)
+		self._consumed = np.zeros((NUM_ELEMENTS, NUM_ELEMENTS))
+		self._produced = np.zeros((NUM_ELEMENTS, NUM_ELEMENTS))
+		self._transform_order = []
 
 		if astronomy is not None:
 			self.astronomy = astronomy
@@ -182,35 +268,58 @@ class Atmosphere(Listener, Tickable):
 		if total is None and average is None:
 			raise ValueError('Please specify an atmospheric composition.')
 		elif total is not None:
-			self.total = total.copy()
-			self.average = {
-				key: count / self.planet_area
-				for key, count in self.total.items()
-			}
+			self._total = element_vector(total)
+			self._average = self._total / self.planet_area
 		elif average is not None:
-			self.average = average.copy()
-			self.total = {
-				key: count * self.planet_area
-				for key, count in self.average.items()
-			}
-
-		self._ensure_keys()
-		self._recalculate_composition()
+			self._average = element_vector(average)
+			self._total = self._average * self.planet_area
+
 		if evt_mgr is not None:
 			self._subscribe_to_events()
 
 
-	def _ensure_keys(self):
+	@property
+	def total(self) -> dict[AtmosphereElement, float]:
+		"""The amount of each element in the whole atmosphere."""
+		return element_dict(self._total)
+
+
+	@property
+	def average(self) -> dict[AtmosphereElement, float]:
+		"""The amount of each element above each square."""
+		return element_dict(self._average)
+
+
+	@property
+	def composition(self) -> dict[AtmosphereElement, float]:
+		"""The fraction of the atmosphere that is each element."""
+		moles_total = self._total.sum()
+		if moles_total == 0:
+			return element_dict(np.zeros(NUM_ELEMENTS))
+		return element_dict(self._total / moles_total)
+
+
+	@property
+	def delta(self) -> dict[AtmosphereElement, float]:
+		"""How much of each element is added per second."""
+		return element_dict(self._delta)
+
+
+	@property
+	def transform(self) -> dict[
+		tuple[AtmosphereElement, AtmosphereElement], tuple[float, float]
+	]:
 		"""
-		Ensures that all keys are in the atmosphere dictionaries.
+		The amounts consumed and produced per second by each transform, keyed
+		by (consumed element, produced element).
 		"""
-		for key in AtmosphereElement:
-			if key not in self.total:
-				self.total[key] = 0
-			if key not in self.average:
-				self.average[key] = 0
-			if key not in self.delta:
-				self.delta[key] = 0
+		return {
+			(ELEMENTS[c], ELEMENTS[p]): (
+				float(self._consumed[c, p]),
+				float(self._produced[c, p])
+			)
+			for c, p in self._transform_order
+		}
 
 
 	def __str__(self):
@@ -228,18 +337,36 @@ class Atmosphere(Listener, Tickable):
 		return s
 
 
-	def _recalculate_composition(self):
-		moles_total = self.moles_total()
-		if moles_total == 0:
-			self.composition = {
-				key: 0
-				for key in self.total.keys()
-			}
-		else:
-			self.composition = {
-				key: count / moles_total
-				for key, count in self.total.items()
-			}
+	def _state_key(self) -> tuple:
+		"""
+		Everything the memoized values depend on.
+		"""
+		return (
+			self._version,
+			self.planet_area,
+			self.astronomy.star_luminosity,
+			self.astronomy.orbital_radius,
+			self._tpr_surface_override,
+			self._density_override,
+		)
+
+
+	def _memoized(self, name, compute):
+		"""
+		Returns compute(), or what it returned last time if nothing it
+		depends on has changed since.
+		"""
+		key = self._state_key()
+		hit = self._memo.get(name)
+		if hit is not None and hit[0] == key:
+			return hit[1]
+		value = compute()
+		self._memo[name] = (key, value)
+		return value
+
+
+	def _totals_changed(self):
+		self._version += 1
 
 
 	def _subscribe_to_events(self):
@@ -298,27 +425,21 @@ class Atmosphere(Listener, Tickable):
 		"""
 		Returns the total number of moles of stuff in the atmosphere.
 		"""
-		return sum(self.total.values())
+		return float(self._total.sum())
 
 
 	def moles_avg(self):
 		"""
 		Returns the number of moles found in the atmosphere per square.
 		"""
-		moles = 0
-		for _, count in self.total.items():
-			moles += count
-		return moles / self.planet_area
+		return self.moles_total() / self.planet_area
 
 
 	def total_molar_mass(self):
 		"""
 		Returns the total molecular mass of the atmosphere.
 		"""
-		total_molar_mass = 0
-		for key, count in self.total.items():
-			total_molar_mass += ELEMENT_MOLAR_MASS[key] * count
-		return total_molar_mass
+		return float(MOLAR_MASS_VECTOR @ self._total)
 
 
 	def density(self):
@@ -327,6 +448,10 @@ class Atmosphere(Listener, Tickable):
 		"""
 		if self._density_override is not None:
 			return self._density_override
+		return self._memoized('density', self._density)
+
+
+	def _density(self):
 		raw = self.total_molar_mass() / self.planet_area
 		return raw / EARTH_ATMOSPHERE_DENSITY
 
@@ -335,9 +460,10 @@ class Atmosphere(Listener, Tickable):
 		"""
 		First derivative - change the amount of atmosphere element.
 		"""
-		self.total[element] += count
-		self.average[element] = self.total[element] / self.planet_area
-		self._recalculate_composition()
+		i = element.value
+		self._total[i] += count
+		self._average[i] = self._total[i] / self.planet_area
+		self._totals_changed()
 
 
 	def change_delta(self, element, count):
@@ -347,7 +473,7 @@ class Atmosphere(Listener, Tickable):
 		
 		New(Atmosphere[element]) = Atmosphere[element] + count
 		"""
-		self.delta[element] += count
+		self._delta[element.value] += count
 
 
 	def change_transform(self, consumed, produced):
@@ -360,17 +486,144 @@ class Atmosphere(Listener, Tickable):
 		produced_elem, produced_amount = produced
 		if consumed_amount * produced_amount < 0:
 			raise ValueError("Values must have same sign.")
-		pair = (consumed_elem, produced_elem)
-		if pair not in self.transform:
-			self.transform[pair] = (consumed_amount, produced_amount)
-		else:
-			old_consumed, old_produced = self.transform[pair]
-			self.transform[pair] = (
-				old_consumed + consumed_amount,
-				old_produced + produced_amount
+		pair = (consumed_elem.value, produced_elem.value)
+		if pair not in self._transform_order:
+			self._transform_order.append(pair)
+		self._consumed[pair] += consumed_amount
+		self._produced[pair] += produced_amount
+
+
+	def contribute(self, delta=None, transform=None) -> AtmosphereContribution:
+		"""
+		Adds an emitter's deltas (by element) and transforms (by
+		(consumed, produced) pair, as in `AtmosphereChangeTransformEvent`)
+		to the atmosphere, and returns a handle to take them back out with.
+
+		Contributions are summed straight into the atmosphere's delta vector
+		and transform matrices, so ticking costs the same however many
+		emitters there are, and there's no event to publish per emitter.
+		"""
+		contribution = AtmosphereContribution(
+			self,
+			delta if delta is not None else {},
+			transform if transform is not None else {}
+		)
+		self.apply_contribution(contribution, 1)
+		return contribution
+
+
+	def apply_contribution(self, contribution, direction=1):
+		"""
+		Adds a contribution's amounts, times direction, to the atmosphere.
+		Use `contribute` and `AtmosphereContribution.release` instead.
+		"""
+		for elem, count in contribution.delta.items():
+			self.change_delta(elem, count * direction)
+		for elems, amounts in contribution.transform.items():
+			consumed_elem, produced_elem = elems
+			consumed_amount, produced_amount = amounts
+			self.change_transform(
+				(consumed_elem, consumed_amount * direction),
+				(produced_elem, produced_amount * direction)
 			)
 
 
+	def _demand(self, dt) -> np.ndarray:
+		"""
+		The most of each element the transforms could take away in a step of
+		dt seconds: what they consume of it, plus any negative production.
+		"""
+		return dt * (
+			np.maximum(self._consumed, 0).sum(axis=1)
+			+ np.maximum(-self._produced, 0).sum(axis=0)
+		)
+
+
+	def _step(self, dt):
+		"""
+		Applies the deltas, then the transforms, for dt seconds. Totals that
+		would go negative stop at zero, and a transform that wants more than
+		is left takes what is left (and produces in proportion).
+		"""
+		total = self._total
+		total += self._delta * dt
+		np.maximum(total, 0, out=total)
+		if not self._transform_order:
+			return
+		if (total >= self._demand(dt)).all():
+			# Nothing runs short, so the order doesn't matter.
+			total += dt * (self._produced.sum(axis=0) - self._consumed.sum(axis=1))
+			return
+		for c, p in self._transform_order:
+			consumed_amount = self._consumed[c, p]
+			produced_amount = self._produced[c, p]
+			if consumed_amount == 0 and produced_amount == 0:
+				continue
+			to_consume = consumed_amount * dt
+			to_produce = produced_amount * dt
+			if to_consume > total[c]:
+				to_consume = total[c]
+				to_produce = to_consume * (produced_amount / consumed_amount)
+			total[c] -= to_consume
+			total[p] += to_produce
+
+
+	def _pinned(self) -> np.ndarray:
+		"""
+		Returns which elements are used up and will stay at zero: nothing
+		adds to them, so the deltas and transforms that would take from them
+		have nothing to take.
+		"""
+		pinned = (self._total == 0) & (self._delta <= 0)
+		while True:
+			# Transforms still at work: those whose input isn't used up, and
+			# those that would put some of a used up input back.
+			active = (self._consumed != 0) | (self._produced != 0)
+			active &= ~pinned[:, None] | (self._consumed < 0)
+			touched = (active & (self._produced != 0)).any(axis=0)
+			touched |= active.any(axis=1)
+			still_pinned = pinned & ~touched
+			if (still_pinned == pinned).all():
+				return pinned
+			pinned = still_pinned
+
+
+	def _linear_steps(self, dt) -> tuple[np.ndarray, int]:
+		"""
+		Returns (rate, n): for the next n steps of dt seconds, nothing runs
+		short and every total changes by rate * dt per step. n may be zero,
+		or infinite (as a float).
+		"""
+		pinned = self._pinned()
+		live = ~pinned[:, None]
+		consumed = np.where(live, self._consumed, 0)
+		produced = np.where(live, self._produced, 0)
+		rate = (
+			np.where(pinned, 0, self._delta)
+			+ produced.sum(axis=0)
+			- consumed.sum(axis=1)
+		)
+		# A step is exact if every element has enough, after its delta, for
+		# everything the transforms could take; see `_step`.
+		need = self._demand(dt) - self._delta * dt
+		need = np.where(pinned, -np.inf, np.maximum(need, 0))
+		room = self._total - need
+		if (room < 0).any():
+			return rate, 0
+		falling = rate < 0
+		if not falling.any():
+			return rate, np.inf
+		# Whole steps until the first falling total gets too low; always at
+		# least one, since there's room for this step.
+		steps = np.floor(room[falling] / (-rate[falling] * dt)).min()
+		return rate, max(1, int(steps))
+
+
+	def _sync_average(self):
+		self._average = self._total / self.planet_area
+		self._totals_changed()
+
+
 	def tick_second(self, dt, utc):
 		"""
 		Mutates the atmosphere according to the delta.
@@ -381,30 +634,69 @@ class Atmosphere(Listener, Tickable):
 
 		Call this once per second (not frame!).
 		"""
-		for key, count in self.delta.items():
-			self.total[key] += count * dt
-			if self.total[key] < 0:
-				self.total[key] = 0
+		self._step(dt)
+		self._sync_average()
 
-		for elements, amounts in self.transform.items():
-			consumed, produced = elements
-			consumed_amount, produced_amount = amounts
-			if consumed_amount == 0 and produced_amount == 0:
+
+	def advance(self, seconds):
+		"""
+		Evolves the atmosphere by `seconds` seconds, as though `tick_second`
+		were called once per second, without doing every second.
+
+		While nothing runs out, every second changes the totals by the same
+		amount, so we jump straight to the second where something would. Only
+		the seconds where an element runs out (or is held at zero while other
+		transforms still want it) are stepped through one at a time.
+		"""
+		whole = int(seconds)
+		fraction = seconds - whole
+		remaining = whole
+		last_change = None
+		while remaining > 0:
+			rate, n = self._linear_steps(1)
+			if n:
+				n = min(n, remaining)
+				self._total += rate * n
+				remaining -= n
+				last_change = None
 				continue
-			ratio = produced_amount / consumed_amount
-			to_consume = consumed_amount * dt
-			to_produce = produced_amount * dt
-			if to_consume > self.total[consumed]:
-				to_consume = self.total[consumed]
-				to_produce = to_consume * ratio
-			self.total[consumed] -= to_consume
-			self.total[produced] += to_produce
-
-		self.average = {
-			key: subtotal / self.planet_area
-			for key, subtotal in self.total.items()
-		}
-		self._recalculate_composition()
+			before = self._total.copy()
+			self._step(1)
+			remaining -= 1
+			change = self._total - before
+			# A transform limited by how much of its input arrives each second
+			# changes the totals by the same amount every second, until one of
+			# the totals that's going down gets low enough to matter.
+			if last_change is not None and np.allclose(
+				change,
+				last_change,
+				rtol=1e-12,
+				atol=0
+			):
+				n = min(self._steady_steps(change), remaining)
+				self._total += change * n
+				remaining -= n
+			last_change = change
+		if fraction:
+			self._step(fraction)
+		self._sync_average()
+
+
+	def _steady_steps(self, change) -> int:
+		"""
+		Returns how many more steps can repeat the given change. Only totals
+		with enough for everything the transforms could take may be changing
+		(those can't affect what runs short); the rest must hold still.
+		"""
+		need = np.maximum(self._demand(1) - self._delta, 0)
+		enough = self._total >= need
+		if (~enough & (change != 0)).any():
+			return 0
+		falling = change < 0
+		if not falling.any():
+			return np.iinfo(np.int64).max
+		room = self._total[falling] - need[falling]
+		return int(np.floor(room / -change[falling]).min())
 
 
 	def albedo(self):
@@ -447,8 +739,14 @@ class Atmosphere(Listener, Tickable):
 		"""
 		if self._tpr_surface_override is not None:
 			return self._tpr_surface_override
+		return self._memoized('tpr_surface', self._tpr_surface)
+
+
+	def _tpr_surface(self):
 		tpr_eff = self.tpr_effective()
-		gh = greenhouse_factor(self.average)
+		gh = 1 + ADJ_TPR * (
+			(GREENHOUSE_WEIGHT_VECTOR @ self._average) / EARTH_GREENHOUSE_WEIGHTS
+		)
 		return tpr_eff * gh
 
 
@@ -509,11 +807,26 @@ class Atmosphere(Listener, Tickable):
 		return self.tpr_surface() + delta_lat
 
 
-	def biome_tprs(self, latitudes):
+	def biome_tprs(self, latitudes) -> np.ndarray:
 		"""
-		Returns a list of the temperatures at the given latitudes.
+		Returns an array of the biome temperatures at the given latitudes.
 		"""
-		return [self.biome_tpr_at(lat) for lat in latitudes]
+		lats = np.asarray(latitudes, dtype=np.float64)
+		return self.tpr_surface() + self.delta_tpr_latitude(lats)
+
+
+	def frozen_rows(self, latitudes) -> np.ndarray:
+		"""
+		Returns a boolean array of which of the given latitudes are frozen;
+		see `is_frozen_at`.
+		"""
+		lats = np.asarray(latitudes, dtype=np.float64)
+		tprs = (
+			self.tpr_surface()
+			+ self.delta_tpr_daily(0.25)
+			+ self.delta_tpr_latitude(lats)
+		)
+		return tprs < WATER_FREEZE_POINT
 
 
 	def is_frozen_at(self, latitude):
@@ -529,6 +842,10 @@ class Atmosphere(Listener, Tickable):
 		"""
 		Returns a dictionary of the habitability factors of the atmosphere.
 		"""
+		return dict(self._memoized('habitability', self._habitability))
+
+
+	def _habitability(self):
 		return {
 			HabitabilityFactor.TEMPERATURE: temperature_habitability(
 				self.tpr_surface()
@@ -5,10 +5,12 @@ the game world, as well as calculating the biome type of a given tile.
 
 import math
 import line_profiler
+import numpy as np
 
 from enum import Enum
 
 from src.math.matrix import matrix_double_width, matrix_fold_width
+from src.o10n import native
 from src.utility.temperature import kelvin_to_fahrenheit
 
 # We express distance to the nearest body of water as tuple of two integers.
@@ -21,6 +23,10 @@ WaterDistance = tuple[int, int]
 
 WaterDistanceMatrix = list[list[WaterDistance]]
 
+# When water distances are stored as integer arrays, this marks "no water on
+# the planet" in place of infinity.
+NO_WATER_DISTANCE = 1 << 30
+
 
 
 class BiomeTemperature(Enum):
@@ -73,6 +79,11 @@ class Biome(Enum):
 	TUNDRA = 9
 
 
+# Biomes are stored as their values in terrain arrays. Use this to get the
+# enumeration back without paying for an Enum lookup per cell.
+BIOMES_BY_CODE: dict[int, Biome] = {biome.value: biome for biome in Biome}
+
+
 _BIOME_LOOKUP: dict[tuple[BiomeTemperature, BiomeWetness], Biome] = {
 	(BiomeTemperature.BARREN, BiomeWetness.BARREN): Biome.BARREN,
 	(BiomeTemperature.BARREN, BiomeWetness.WET): Biome.BARREN,
@@ -93,6 +104,27 @@ _BIOME_LOOKUP: dict[tuple[BiomeTemperature, BiomeWetness], Biome] = {
 
 
 
+# The same table as _BIOME_LOOKUP, indexed by [temperature value, wetness
+# value], holding biome values.
+_BIOME_CODE_LOOKUP = np.zeros(
+	(len(BiomeTemperature), len(BiomeWetness)),
+	dtype=np.uint8
+)
+for (_tpr, _wet), _biome in _BIOME_LOOKUP.items():
+	_BIOME_CODE_LOOKUP[_tpr.value, _wet.value] = _biome.value
+
+# Temperature bucket cutoffs used by get_biome_temperature, and the bucket
+# value for each interval between them.
+_TPR_CUTOFFS = np.array([0, 45, 75, 110])
+_TPR_BUCKETS = np.array([
+	BiomeTemperature.BARREN.value,
+	BiomeTemperature.COLD.value,
+	BiomeTemperature.TEMPERATE.value,
+	BiomeTemperature.HOT.value,
+	BiomeTemperature.BARREN.value,
+], dtype=np.uint8)
+
+
 def get_biome_temperature(tpr_deg_f: float) -> BiomeTemperature:
 	"""
 	Maps degrees fahrenheit to a BiomeTemperature enumeration.
@@ -264,6 +296,9 @@ def water_distances(
 	"""
 	Calculates the water distances for each tile in the land_height matrix.
 	"""
+	if native.is_available():
+		xys, zs = native.water_distances(land_height, water_level, loop_x)
+		return _water_distance_matrix(xys, zs, native.WD_INFINITY)
 	if not loop_x:
 		return _water_distances(land_height, water_level)
 	else:
@@ -273,6 +308,18 @@ def water_distances(
 		return matrix_fold_width(unfolded, _min_water_dist)
 
 
+def _water_distance_matrix(xys, zs, infinity) -> WaterDistanceMatrix:
+	"""
+	Zips integer xy and z arrays into a WaterDistanceMatrix, using math.inf
+	for distances at or above `infinity`.
+	"""
+	no_water = (math.inf, math.inf)
+	return [
+		[no_water if xy >= infinity else (xy, z) for xy, z in zip(xy_row, z_row)]
+		for xy_row, z_row in zip(xys.tolist(), zs.tolist())
+	]
+
+
 def _min_water_dist(pair1, pair2):
 	"""
 	Given two water distance pairs, returns the one that's smaller.
@@ -323,6 +370,9 @@ def calculate_biomes(
 
 	tpr_deg_fs = _ensure_deg_f(tpr_deg_fs, tpr_kelvins)
 
+	if native.is_available():
+		return _native_calculate_biomes(water_distances, tpr_deg_fs, wet_cutoff)
+
 	height = len(water_distances)
 
 	biomes = []
@@ -336,3 +386,112 @@ def calculate_biomes(
 		biomes.append(row)
 	
 	return biomes
+
+
+def _native_calculate_biomes(water_distances, tpr_deg_fs, wet_cutoff):
+	pairs = np.array(water_distances, dtype=np.float64)
+	pairs[pairs == math.inf] = native.WD_INFINITY
+	pairs = pairs.astype(np.int64)
+	codes = native.calculate_biomes(
+		pairs[:, :, 0],
+		pairs[:, :, 1],
+		tpr_deg_fs,
+		wet_cutoff=wet_cutoff
+	)
+	lookup = {
+		code: Biome[name]
+		for code, name in native.BIOME_NAMES_BY_CODE.items()
+	}
+	return [[lookup[code] for code in row] for row in codes.tolist()]
+
+
+
+def get_biome_temperatures(tpr_deg_fs) -> np.ndarray:
+	"""
+	Vectorized get_biome_temperature. Returns an array of BiomeTemperature
+	values.
+	"""
+	tpr_deg_fs = np.asarray(tpr_deg_fs, dtype=np.float64)
+	return _TPR_BUCKETS[np.searchsorted(_TPR_CUTOFFS, tpr_deg_fs, side='right')]
+
+
+def classify_biomes(
+		wd_xys: np.ndarray,
+		wd_zs: np.ndarray,
+		tpr_buckets: np.ndarray,
+		wet_cutoff: int = 64,
+) -> np.ndarray:
+	"""
+	Vectorized get_biome. Takes the two halves of the water distances as
+	integer arrays (NO_WATER_DISTANCE for no water) and BiomeTemperature
+	values that broadcast against them, e.g. one per row with shape (h, 1).
+	Returns an array of Biome values.
+	"""
+	no_water = wd_xys >= NO_WATER_DISTANCE
+	# In int64 and clamped, so two NO_WATER_DISTANCEs can't wrap negative.
+	wd_totals = np.minimum(
+		wd_xys.astype(np.int64) + wd_zs,
+		NO_WATER_DISTANCE
+	)
+	wetness = np.where(
+		wd_totals < wet_cutoff,
+		BiomeWetness.WET.value,
+		BiomeWetness.DRY.value
+	)
+	biomes = _BIOME_CODE_LOOKUP[tpr_buckets, wetness]
+	is_beach = (wd_xys == 0) | (
+		(wd_zs <= MAX_BEACH_Z_DISTANCE) & (wd_totals <= MAX_BEACH_DISTANCE)
+	)
+	biomes = np.where(is_beach, Biome.BEACH.value, biomes)
+	is_barren = no_water | (tpr_buckets == BiomeTemperature.BARREN.value)
+	return np.where(is_barren, Biome.BARREN.value, biomes).astype(np.uint8)
+
+
+
+class BiomeClassifier:
+	"""
+	Classifies the biomes of a whole map, remembering the temperature bucket
+	of each row so that it can skip the work when nothing would change.
+	"""
+
+	wet_cutoff: int
+
+	_tpr_buckets: np.ndarray = None
+
+	def __init__(self, wet_cutoff: int = 64):
+		self.wet_cutoff = wet_cutoff
+
+
+	def classify(self, wd_xys, wd_zs, tpr_deg_fs):
+		"""
+		Returns the (h, w) array of biome values, or None if the temperature
+		bucket of every row is the same as in the last call (so the biomes
+		are unchanged unless the water distances changed; use
+		`classify_cells` for those).
+		"""
+		tpr_buckets = get_biome_temperatures(tpr_deg_fs)
+		if (
+			self._tpr_buckets is not None
+			and np.array_equal(tpr_buckets, self._tpr_buckets)
+		):
+			return None
+		self._tpr_buckets = tpr_buckets
+		return classify_biomes(
+			wd_xys, wd_zs, tpr_buckets[:, np.newaxis], self.wet_cutoff
+		)
+
+
+	def classify_cells(self, wd_xys, wd_zs, cells, biomes):
+		"""
+		Reclassifies the given (x, y) cells in place using the temperatures
+		from the last `classify` call.
+		"""
+		if self._tpr_buckets is None or not cells:
+			return
+		xs, ys = np.array(cells).T
+		biomes[ys, xs] = classify_biomes(
+			wd_xys[ys, xs],
+			wd_zs[ys, xs],
+			self._tpr_buckets[ys],
+			self.wet_cutoff
+		)
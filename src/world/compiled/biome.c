@@ -13,26 +13,28 @@ BiomeMatrix *make_biome_matrix(int width, int height) {
 	matrix->width = width;
 	matrix->height = height;
 	matrix->matrix = malloc(sizeof(Biome *) * height);
-	// Initialize all biomes to barren.
-	for (int i = 0; i < width; i++) {
+	for (int i = 0; i < height; i++) {
 		matrix->matrix[i] = malloc(sizeof(Biome) * width);
 	}
 	return matrix;
 }
 
 void free_biome_matrix(BiomeMatrix *matrix) {
+	for (int i = 0; i < matrix->height; i++) {
+		free(matrix->matrix[i]);
+	}
 	free(matrix->matrix);
 	free(matrix);
 }
 
-BiomeTemperature get_biome_temperature(float tpr_deg_f) {
+BiomeTemperature get_biome_temperature(double tpr_deg_f) {
 	if (tpr_deg_f < 0) {
 		return BIOME_TPR__BARREN;
-	} else if (tpr_deg_f <= 45) {
+	} else if (tpr_deg_f < 45) {
 		return BIOME_TPR__COLD;
-	} else if (tpr_deg_f <= 75) {
+	} else if (tpr_deg_f < 75) {
 		return BIOME_TPR__TEMPERATE;
-	} else if (tpr_deg_f <= 110) {
+	} else if (tpr_deg_f < 110) {
 		return BIOME_TPR__HOT;
 	} else {
 		return BIOME_TPR__BARREN;
@@ -40,6 +42,9 @@ BiomeTemperature get_biome_temperature(float tpr_deg_f) {
 }
 
 BiomeWetness get_biome_wetness(WaterDistance *water_distance, int wet_cutoff) {
+	if (water_distance->xy >= WD_INFINITY) {
+		return BIOME_WET__BARREN;
+	}
 	int mag = water_distance_magnitude(water_distance);
 	if (mag < wet_cutoff) {
 		return BIOME_WET__WET;
@@ -52,19 +57,29 @@ BiomeWetness get_biome_wetness(WaterDistance *water_distance, int wet_cutoff) {
 #define MAX_BEACH_DISTANCE 6
 
 bool get_is_beach(WaterDistance *water_distance) {
+	if (water_distance->xy == 0) {
+		return true;
+	}
 	int mag = water_distance_magnitude(water_distance);
+	if (mag < 0) {
+		return false;
+	}
 	bool z_in_range = water_distance->z <= MAX_BEACH_Z_DISTANCE;
 	return z_in_range && mag <= MAX_BEACH_DISTANCE;
 }
 
 Biome get_biome(
-	float tpr_deg_f,
+	double tpr_deg_f,
 	WaterDistance *water_distance,
 	int wet_cutoff
 ) {
 	BiomeTemperature tpr = get_biome_temperature(tpr_deg_f);
 	BiomeWetness wet = get_biome_wetness(water_distance, wet_cutoff);
-	
+
+	if (tpr == BIOME_TPR__BARREN || wet == BIOME_WET__BARREN) {
+		return BIOME__BARREN;
+	}
+
 	if (get_is_beach(water_distance)) {
 		return BIOME__BEACH;
 	}
@@ -74,7 +89,7 @@ Biome get_biome(
 
 BiomeMatrix *calculate_biomes(
 	WaterDistanceMtx *water_distances,
-	float *tpr_deg_fs,
+	double *tpr_deg_fs,
 	int wet_cutoff
 ) {
 	int width = water_distances->width;
@@ -82,7 +97,7 @@ BiomeMatrix *calculate_biomes(
 	BiomeMatrix *biomes = make_biome_matrix(width, height);
 
 	for (int y = 0; y < height; y++) {
-		float tpr_deg_f = tpr_deg_fs[y];
+		double tpr_deg_f = tpr_deg_fs[y];
 		for (int x = 0; x < width; x++) {
 			WaterDistance *water_distance = water_distance_matrix_get_at(
 				water_distances, x, y
@@ -45,7 +45,7 @@ typedef struct BiomeMatrix {
 /**
  * Get the temperature of the given temperature in degrees Fahrenheit.
  */
-BiomeTemperature get_biome_temperature(float tpr_deg_f);
+BiomeTemperature get_biome_temperature(double tpr_deg_f);
 
 /**
  * Get the wetness of the given water distance.
@@ -60,7 +60,11 @@ bool get_is_beach(WaterDistance *water_distance);
 /**
  * Get the biome for the given temperature and water distance.
  */
-Biome get_biome(float tpr_deg_f, WaterDistance *water_distance, int wet_cutoff);
+Biome get_biome(
+	double tpr_deg_f,
+	WaterDistance *water_distance,
+	int wet_cutoff
+);
 
 /**
  * Create a malloc'd BiomeMatrix struct.
@@ -77,7 +81,7 @@ void free_biome_matrix(BiomeMatrix *matrix);
  */
 BiomeMatrix *calculate_biomes(
 	WaterDistanceMtx *water_distances,
-	float *tpr_deg_fs,
+	double *tpr_deg_fs,
 	int wet_cutoff
 );
 
@@ -19,9 +19,10 @@ int main() {
 	assert(get_biome_temperature(-1) == BIOME_TPR__BARREN);
 	assert(get_biome_temperature(0) == BIOME_TPR__COLD);
 	assert(get_biome_temperature(46) == BIOME_TPR__TEMPERATE);
-	assert(get_biome_temperature(75) == BIOME_TPR__TEMPERATE);
-	assert(get_biome_temperature(76) == BIOME_TPR__HOT);
-	assert(get_biome_temperature(110) == BIOME_TPR__HOT);
+	assert(get_biome_temperature(74) == BIOME_TPR__TEMPERATE);
+	assert(get_biome_temperature(75) == BIOME_TPR__HOT);
+	assert(get_biome_temperature(109) == BIOME_TPR__HOT);
+	assert(get_biome_temperature(110) == BIOME_TPR__BARREN);
 	assert(get_biome_temperature(1000) == BIOME_TPR__BARREN);
 	printf("Passed!\n");
 
@@ -35,6 +36,9 @@ int main() {
 	WaterDistance *wd3 = make_water_distance(33, 33);
 	assert(get_biome_wetness(wd3, 64) == BIOME_WET__DRY);
 	free_water_distance(wd3);
+	WaterDistance *wd7 = make_water_distance(WD_INFINITY, WD_INFINITY);
+	assert(get_biome_wetness(wd7, 64) == BIOME_WET__BARREN);
+	free_water_distance(wd7);
 	printf("Passed!\n");
 
 	printf("Testing get_is_beach...\n");
@@ -34,6 +34,18 @@ int main() {
 	assert(water_distance_magnitude(wd3) == 65);
 	printf("Passed!\n");
 
+	// Test a matrix that isn't square.
+	printf("Testing non-square matrix...\n");
+	WaterDistanceMtx *wide = make_water_distance_matrix(5, 2);
+	water_distance_matrix_set_at(wide, 4, 1, 7, 9);
+	assert(water_distance_matrix_get_at(wide, 4, 1)->z == 9);
+	free_water_distance_matrix(wide);
+	WaterDistanceMtx *tall = make_water_distance_matrix(2, 5);
+	water_distance_matrix_set_at(tall, 1, 4, 3, 5);
+	assert(water_distance_matrix_get_at(tall, 1, 4)->xy == 3);
+	free_water_distance_matrix(tall);
+	printf("Passed!\n");
+
 	// Clean up.
 	free_water_distance_matrix(wdm);
 }
@@ -46,7 +46,7 @@ WaterDistanceMtx *make_water_distance_matrix(int width, int height) {
 	matrix->width = width;
 	matrix->height = height;
 	matrix->matrix = malloc(sizeof(WaterDistance *) * height);
-	for (int i = 0; i < width; i++) {
+	for (int i = 0; i < height; i++) {
 		matrix->matrix[i] = malloc(sizeof(WaterDistance) * width);
 	}
 	return matrix;
@@ -101,7 +101,7 @@ WaterDistanceMtx *calculate_water_distance_matrix(
 	IntMatrix *land_heights,
 	IntMatrix *water_heights
 ) {
-	int wd_infinity = land_heights->width + land_heights->height + 1;
+	int wd_infinity = WD_INFINITY;
 
 	IntMatrix *total_heights = int_matrix_add(land_heights, water_heights);
 
@@ -163,7 +163,7 @@ WaterDistanceMtx *calculate_water_distance_matrix(
 				)->z + dz;
 			}
 
-			int xy = min(look_north_xy, look_west_xy);
+			int xy = min(look_north_xy + 1, look_west_xy + 1);
 			xy = min(xy, my_wd.xy);
 
 			int z = min(look_north_z, look_west_z);
@@ -212,7 +212,7 @@ WaterDistanceMtx *calculate_water_distance_matrix(
 				)->z + dz;
 			}
 
-			int xy = min(look_south_xy, look_east_xy);
+			int xy = min(look_south_xy + 1, look_east_xy + 1);
 			xy = min(xy, my_wd.xy);
 
 			int z = min(look_south_z, look_east_z);
@@ -3,6 +3,11 @@
 
 #include "../../math/compiled/matrix.h"
 
+/**
+ * Distances at or above this mean there is no water to reach.
+ */
+#define WD_INFINITY (1 << 30)
+
 typedef struct WaterDistance {
 	int xy;
 	int z;
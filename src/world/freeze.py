@@ -0,0 +1,114 @@
+"""
+This module decides which rows of the terrain are cold enough for their water
+to freeze, without asking the atmosphere about every row every second.
+"""
+
+from src.world.atmosphere import Atmosphere
+from src.world.terrain import Terrain
+from src.world.terrain_journal import JournalReader, TerrainLayer
+
+
+
+class FreezeFrontier:
+	"""
+	Tracks the band of latitudes where water freezes, and freezes the water
+	in it.
+
+	The atmosphere's temperature only depends on latitude through
+	`delta_tpr_latitude`, so if we sort the rows from coldest to warmest once,
+	the frozen rows are always a prefix of that order. We remember where the
+	prefix ends (the frontier). When the surface temperature changes, we walk
+	the frontier forward or back over just the rows that crossed the freezing
+	point. Otherwise, a tick only looks at frozen rows whose water changed
+	since the last tick (according to the terrain's journal), which is
+	nothing in the steady state.
+
+	Ice never melts on its own, so rows that thaw keep their ice; they just
+	stop refreezing new water.
+	"""
+
+	_terrain: Terrain
+	_atmosphere: Atmosphere
+	_water_changes: JournalReader
+
+	# Rows from coldest to warmest, and each row's position in that order.
+	_order: list[int]
+	_rank: list[int]
+
+	# The first _num_frozen rows of _order are frozen.
+	_num_frozen: int
+
+	# The surface temperature the frontier was last placed at.
+	_tpr_surface: float = None
+
+	def __init__(self, terrain: Terrain, atmosphere: Atmosphere):
+		self._terrain = terrain
+		self._atmosphere = atmosphere
+		self._water_changes = terrain.journal.subscribe(TerrainLayer.WATER)
+		lats = terrain.lats
+		self._order = sorted(
+			range(terrain.height),
+			key=lambda y: (atmosphere.delta_tpr_latitude(lats[y]), y)
+		)
+		self._rank = [0] * terrain.height
+		for rank, y in enumerate(self._order):
+			self._rank[y] = rank
+		self._num_frozen = 0
+
+
+	@property
+	def frozen_rows(self) -> list[int]:
+		"""
+		The rows that are currently frozen, coldest first.
+		"""
+		return self._order[:self._num_frozen]
+
+
+	def is_row_frozen(self, y: int) -> bool:
+		"""
+		Returns True if water in row y freezes.
+		"""
+		return self._rank[y] < self._num_frozen
+
+
+	def _advance(self) -> list[int]:
+		"""
+		Moves the frontier to match the atmosphere's current temperature.
+		Returns the rows that just froze.
+		"""
+		is_frozen_at = self._atmosphere.is_frozen_at
+		lats = self._terrain.lats
+		order = self._order
+		n = self._num_frozen
+		newly_frozen = []
+		while n < len(order) and is_frozen_at(lats[order[n]]):
+			newly_frozen.append(order[n])
+			n += 1
+		if not newly_frozen:
+			while n > 0 and not is_frozen_at(lats[order[n - 1]]):
+				n -= 1
+		self._num_frozen = n
+		return newly_frozen
+
+
+	def tick(self) -> list[tuple[int, int]]:
+		"""
+		Freezes the water that should be frozen. Returns the (x, y) cells
+		that froze.
+		"""
+		rows = set()
+		tpr_surface = self._atmosphere.tpr_surface()
+		if tpr_surface != self._tpr_surface:
+			self._tpr_surface = tpr_surface
+			rows.update(self._advance())
+
+		# Water may have flowed or melted into a frozen row since last time.
+		for (_, y0), (_, h) in self._water_changes.pull():
+			rows.update(y for y in range(y0, y0 + h) if self.is_row_frozen(y))
+
+		frozen = []
+		for y in sorted(rows):
+			frozen.extend(self._terrain.freeze_water_row(y))
+		# Freezing is a water change too; there's nothing left to refreeze.
+		self._water_changes.clear()
+		return frozen
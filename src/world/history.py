@@ -1,24 +1,276 @@
+"""
+This module keeps the planet's history of habitability for graphing.
+
+Every factor is kept in fixed-size numpy ring buffers at a few resolutions
+(a bucket per day, per month, and per year of game time), each bucket
+holding the low, high, and mean of the samples that fell in it. Memory stays
+the same however long the game runs: the finest tiers forget their oldest
+buckets first, while the coarse ones still reach back to the start.
+
+Graphs ask for a series at a pixel width, and get at most that many points,
+taken from the coarsest tier that still has a bucket per pixel.
+"""
+
+from dataclasses import dataclass
+
+import numpy as np
+
 from src.utility.habitability import HabitabilityFactor
 
+# (seconds per bucket, buckets kept) for each tier, finest first. One second
+# of UTC is one day, so these are days, months, and years.
+DEFAULT_TIERS = ((1, 4096), (30, 4096), (360, 4096))
+
+FACTORS = list(HabitabilityFactor)
+
+
+
+@dataclass
+class HistorySeries:
+	"""
+	A stretch of history for one factor, one point per column.
+	"""
+
+	# When each point starts.
+	utc: np.ndarray
+
+	# The lowest, highest, and mean values over each point.
+	low: np.ndarray
+	high: np.ndarray
+	mean: np.ndarray
+
+	def points(self) -> list[tuple[float, float]]:
+		"""
+		Returns the (utc, mean) points, as a `LineGraph` series.
+		"""
+		return list(zip(self.utc.tolist(), self.mean.tolist()))
+
+
+	def __len__(self):
+		return len(self.utc)
+
+
+
+class HistoryTier:
+	"""
+	A ring buffer of buckets `span` seconds wide for every factor.
+	"""
+
+	span: float
+	capacity: int
+
+	# The start of each bucket, and how many samples are in it.
+	_start: np.ndarray
+	_count: np.ndarray
+
+	# The low, high, and mean of each bucket; one column per factor.
+	_low: np.ndarray
+	_high: np.ndarray
+	_mean: np.ndarray
+
+	# Where the oldest bucket is, and how many buckets there are.
+	_first: int = 0
+	_size: int = 0
+
+	def __init__(self, span: float, capacity: int, num_factors: int):
+		self.span = span
+		self.capacity = capacity
+		self._start = np.zeros(capacity, dtype=np.float64)
+		self._count = np.zeros(capacity, dtype=np.int64)
+		shape = (capacity, num_factors)
+		self._low = np.zeros(shape, dtype=np.float64)
+		self._high = np.zeros(shape, dtype=np.float64)
+		self._mean = np.zeros(shape, dtype=np.float64)
+
+
+	def __len__(self):
+		return self._size
+
+
+	def _slot(self, n: int) -> int:
+		"""
+		Returns where the nth oldest bucket is kept.
+		"""
+		return (self._first + n) % self.capacity
+
+
+	@property
+	def oldest(self) -> float:
+		"""
+		The start of the oldest bucket, or None if there aren't any.
+		"""
+		if self._size == 0:
+			return None
+		return float(self._start[self._first])
+
+
+	def add(self, utc: float, values: np.ndarray):
+		"""
+		Adds a sample to the bucket it falls in, starting a new bucket (and
+		forgetting the oldest, if full) if it doesn't fall in the newest.
+		"""
+		start = (utc // self.span) * self.span
+		if self._size > 0:
+			last = self._slot(self._size - 1)
+			if self._start[last] == start:
+				count = self._count[last] + 1
+				self._count[last] = count
+				np.minimum(self._low[last], values, out=self._low[last])
+				np.maximum(self._high[last], values, out=self._high[last])
+				self._mean[last] += (values - self._mean[last]) / count
+				return
+		if self._size < self.capacity:
+			self._size += 1
+		else:
+			self._first = self._slot(1)
+		slot = self._slot(self._size - 1)
+		self._start[slot] = start
+		self._count[slot] = 1
+		self._low[slot] = values
+		self._high[slot] = values
+		self._mean[slot] = values
+
+
+	def _rank(self, utc: float, side: str) -> int:
+		"""
+		Returns how many buckets start before utc (or at it, on the right),
+		searching the ring's two sorted runs rather than unrolling it.
+		"""
+		end = self._first + self._size
+		if end <= self.capacity:
+			return int(np.searchsorted(
+				self._start[self._first:end], utc, side
+			))
+		older = self._start[self._first:]
+		rank = int(np.searchsorted(older, utc, side))
+		if rank < len(older):
+			return rank
+		newer = self._start[:end - self.capacity]
+		return rank + int(np.searchsorted(newer, utc, side))
+
+
+	def _between(self, start: float, end: float) -> tuple[int, int]:
+		"""
+		Returns the [lo, hi) range of buckets that overlap [start, end].
+		"""
+		lo = max(self._rank(start, 'right') - 1, 0)
+		return lo, self._rank(end, 'right')
+
+
+	def count_between(self, start: float, end: float) -> int:
+		"""
+		Returns how many buckets overlap [start, end].
+		"""
+		lo, hi = self._between(start, end)
+		return max(hi - lo, 0)
+
+
+	def series(self, column: int, width: int, start, end) -> HistorySeries:
+		"""
+		Returns the buckets overlapping [start, end] for a factor, merged
+		down to at most `width` points.
+		"""
+		if width < 1:
+			raise ValueError(f"width must be at least 1, not {width}")
+		lo, hi = self._between(start, end)
+		slots = (self._first + np.arange(lo, hi)) % self.capacity
+		utc = self._start[slots]
+		count = self._count[slots]
+		low = self._low[slots, column]
+		high = self._high[slots, column]
+		mean = self._mean[slots, column]
+		if len(slots) > width:
+			edges = np.unique(
+				np.linspace(0, len(slots), width, endpoint=False).astype(int)
+			)
+			utc = utc[edges]
+			low = np.minimum.reduceat(low, edges)
+			high = np.maximum.reduceat(high, edges)
+			mean = (
+				np.add.reduceat(mean * count, edges)
+				/ np.add.reduceat(count, edges)
+			)
+		return HistorySeries(utc=utc, low=low, high=high, mean=mean)
+
+
+
 class PlanetHistory:
 	"""
 	Represents the planet's history of habitability, atmospheric composition,
 	temperature, etc.
 	"""
 
-	habitability = None
+	tiers: list[HistoryTier]
 
-	def __init__(self, world):
+	# The first and most recent samples' times, or None before the first.
+	first_utc: float = None
+	latest_utc: float = None
+
+	def __init__(self, world, tiers=DEFAULT_TIERS):
 		super().__init__()
 		self.world = world
-		self.habitability = {
-			factor: [] for factor in HabitabilityFactor
-		}
+		self.tiers = [
+			HistoryTier(span, capacity, len(FACTORS))
+			for span, capacity in tiers
+		]
+
 
 	def update(self, utc: float):
 		"""
 		Appends the current state to the history.
 		"""
 		habitability = self.world.habitability()
-		for key, value in habitability.items():
-			self.habitability[key].append((utc, value))
+		# Factors the world doesn't report yet are kept as NaN.
+		values = np.array(
+			[habitability.get(factor, np.nan) for factor in FACTORS],
+			dtype=np.float64
+		)
+		for tier in self.tiers:
+			tier.add(utc, values)
+		if self.first_utc is None:
+			self.first_utc = utc
+		self.latest_utc = utc
+
+
+	def _pick_tier(self, width: int, start: float, end: float) -> HistoryTier:
+		"""
+		Returns the coarsest tier that reaches back to start and still has a
+		bucket for every column, or the finest that reaches back if none
+		have that many. Falls back to the coarsest tier if no tier reaches
+		back that far.
+		"""
+		reaching = [
+			tier for tier in self.tiers
+			if tier.oldest is not None and tier.oldest <= start
+		]
+		if not reaching:
+			return self.tiers[-1]
+		for tier in reversed(reaching):
+			if tier.count_between(start, end) >= width:
+				return tier
+		return reaching[0]
+
+
+	def habitability(
+			self,
+			factor: HabitabilityFactor,
+			width: int,
+			start: float = None,
+			end: float = None
+	) -> HistorySeries:
+		"""
+		Returns the history of a habitability factor between start and end
+		(all of it, by default) as at most `width` points, for drawing
+		`width` pixels wide.
+		"""
+		if width < 1:
+			raise ValueError(f"width must be at least 1, not {width}")
+		if self.latest_utc is None:
+			empty = np.zeros(0, dtype=np.float64)
+			return HistorySeries(utc=empty, low=empty, high=empty, mean=empty)
+		if start is None:
+			start = self.first_utc
+		if end is None:
+			end = self.latest_utc
+		tier = self._pick_tier(width, start, end)
+		return tier.series(FACTORS.index(factor), width, start, end)
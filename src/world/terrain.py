@@ -1,19 +1,37 @@
-from collections import defaultdict
+import numpy as np
 
 from src.math.adj import adj_cells
 from src.math.direction import *
 from src.math.vector2 import Vector2
 
-from src.world.biome import (
-	Biome,
-	calculate_biomes,
-	WaterDistanceMatrix,
-	water_distances
-)
+from src.utility.temperature import kelvin_to_fahrenheit
 
+from src.world.biome import Biome, BIOMES_BY_CODE, BiomeClassifier
+from src.world import water_balance
+from src.world.terrain_journal import TerrainJournal, TerrainLayer
+from src.world.terrain_stats import TerrainStats
+from src.world.water_balance import WaterBalanceReport
+from src.world.water_distance import WaterDistanceField
 
-def make_height_delta():
-	return [0] * 4
+# Storage types for the terrain planes. Heights are signed so that generators
+# can hand us negative water levels without wrapping around.
+HEIGHT_DTYPE = np.int16
+BIOME_DTYPE = np.uint8
+HEIGHT_DELTA_DTYPE = np.int8
+
+_HEIGHT_DELTA_MIN = np.iinfo(HEIGHT_DELTA_DTYPE).min
+_HEIGHT_DELTA_MAX = np.iinfo(HEIGHT_DELTA_DTYPE).max
+
+
+def make_height_plane(matrix=None, dimensions=None):
+	"""
+	Returns a contiguous height plane. Pass a matrix (list of lists or array)
+	to copy it, or dimensions = (w, h) to get a plane filled with zeros.
+	"""
+	if matrix is None:
+		w, h = dimensions
+		return np.zeros((h, w), dtype=HEIGHT_DTYPE)
+	return np.array(matrix, dtype=HEIGHT_DTYPE)
 
 
 def lat(y, h):
@@ -33,91 +51,189 @@ class Terrain:
 	"""
 	Represents the terrain of the game world as two heightmaps: one for the
 	land layer, and one for the water layer.
+
+	Each layer is stored as a (height, width) NumPy array, so `map[y][x]` and
+	`map[y, x]` both work. Biomes are stored as their enum values; use
+	`biome_at` to get the Biome back.
 	"""
 
-	map: list[list[int]]
-	water: list[list[int]]
-	ice: list[list[int]]
-	biomes: list[list[Biome]]
-	_water_distances: WaterDistanceMatrix
+	map: np.ndarray
+	water: np.ndarray
+	ice: np.ndarray
+	biomes: np.ndarray
+	_height_deltas: np.ndarray
+	_water_distances: WaterDistanceField
+	_biome_classifier: BiomeClassifier
+	_biome_dirty_cells: set[tuple[int, int]]
+
+	# Every change to the planes is recorded here. See `terrain_journal`.
+	journal: TerrainJournal
+
+	# Areas, sea level, and so on, kept up to date from the journal.
+	stats: TerrainStats
 
 	width: int
 	height: int
 	area: int
 	dimensions: tuple[int, int]
 
-	_water_area = 0
-	_ice_area = 0
-
-	max_tile_height = 0
-	min_tile_height = 0
-
 	lats = []
 	longs = []
 
 	def __init__(self, heightmap: list[list[int]], watermap=None, icemap=None):
-		self.map = heightmap
-
-		w = len(self.map[0])
-		h = len(self.map)
+		land = make_height_plane(heightmap)
+		h, w = land.shape
+		if watermap is None:
+			water = make_height_plane(dimensions=(w, h))
+		else:
+			water = make_height_plane(watermap)
+		if icemap is None:
+			ice = make_height_plane(dimensions=(w, h))
+		else:
+			ice = make_height_plane(icemap)
+		self._init_planes(land, water, ice)
+
+
+	@classmethod
+	def from_planes(
+			cls,
+			land: np.ndarray,
+			water: np.ndarray,
+			ice: np.ndarray,
+			biomes: np.ndarray = None,
+			height_deltas: np.ndarray = None,
+			water_distances: tuple[np.ndarray, np.ndarray] = None
+	):
+		"""
+		Makes a terrain that uses the given arrays as its planes, without
+		copying them (e.g. planes memory-mapped from a planet file). The
+		derived planes (height deltas, and water distances as an (xy, z)
+		pair) are computed if they aren't given.
+		"""
+		planes = (
+			(land, HEIGHT_DTYPE),
+			(water, HEIGHT_DTYPE),
+			(ice, HEIGHT_DTYPE),
+			(biomes, BIOME_DTYPE),
+			(height_deltas, HEIGHT_DELTA_DTYPE),
+		)
+		for plane, dtype in planes:
+			if plane is not None and plane.dtype != dtype:
+				raise ValueError(f"Expected a {dtype} plane, got {plane.dtype}.")
+			if plane is not None and plane.shape[:2] != land.shape:
+				raise ValueError("All planes must be the same size.")
+		terrain = cls.__new__(cls)
+		terrain._init_planes(
+			land,
+			water,
+			ice,
+			biomes=biomes,
+			height_deltas=height_deltas,
+			water_distances=water_distances
+		)
+		return terrain
+
+
+	def _init_planes(
+			self,
+			land,
+			water,
+			ice,
+			biomes=None,
+			height_deltas=None,
+			water_distances=None
+	):
+		self.map = land
+		self.water = water
+		self.ice = ice
+
+		h, w = self.map.shape
 		self.width = w
 		self.height = h
 		self.area = w * h
 		self.dimensions = (w, h)
 
-		if watermap is None:
-			self.water = [[0] * w for _ in range(h)]
-			self._water_area = 0
+		self.journal = TerrainJournal(self.dimensions)
+		self.stats = TerrainStats(self)
+		if water_distances is None:
+			self._water_distances = WaterDistanceField(self.map, self.water)
 		else:
-			self.water = [row[:] for row in watermap]
-			self._water_area = sum(
-				sum(cell > 0 for cell in row)
-				for row in watermap
+			xy, z = water_distances
+			self._water_distances = WaterDistanceField.from_planes(
+				self.map, self.water, xy, z
 			)
-		if icemap is None:
-			self.ice = [[0] * w for _ in range(h)]
-			self._ice_area = 0
+		self._water_distance_changes = self.journal.subscribe(
+			TerrainLayer.LAND | TerrainLayer.WATER
+		)
+		if biomes is None:
+			biomes = np.full((h, w), Biome.BARREN.value, dtype=BIOME_DTYPE)
+		self.biomes = biomes
+		self._biome_classifier = BiomeClassifier()
+		self._biome_dirty_cells = set()
+
+		if height_deltas is None:
+			self._height_deltas = np.zeros((h, w, 4), dtype=HEIGHT_DELTA_DTYPE)
+			self._calc_height_deltas()
 		else:
-			self.ice = icemap
-			self._ice_area = sum(
-				sum(cell > 0 for cell in row)
-				for row in icemap
-			)
-
-		self._water_distances = water_distances(self.map, self.water)
-		self.biomes = [
-			[Biome.BARREN for _ in range(w)]
-			for _ in range(h)
-		]
-
-		self._height_deltas = [
-			[make_height_delta() for _ in range(w)] for _ in range(h)
-		]
-		self._calc_height_deltas()
-		self._calc_max_min_tile_heights()
+			self._height_deltas = height_deltas
 		self._calc_lat_longs()
 
 
-	def _calc_height_deltas(self):
-		for y in range(self.height):
-			for x in range(self.width):
-				p = (x,y)
-				adjs = adj_cells(self.dimensions, p)
-				for i in range(len(adjs)):
-					x2,y2 = adjs[i]
-					h1 = self.height_at(p)
-					h2 = self.height_at((x2, y2))
-					delta = h1 - h2
-					self._height_deltas[y][x][i] = delta
+	def _total_heights(self, rows, cols):
+		"""
+		Returns the land + water + ice heights at the cross product of the
+		given row and column index arrays.
+		"""
+		ix = np.ix_(rows, cols)
+		return self.map[ix].astype(np.int32) + self.water[ix] + self.ice[ix]
+
 
+	def _calc_height_deltas(self, rows=None, cols=None):
+		"""
+		Computes the height deltas to the four cardinal neighbors for every
+		cell in rows x cols (default: the whole map) in one pass.
 
-	def _calc_max_min_tile_heights(self):
-		self.max_tile_height = max(
-			max(row) for row in self.map
-		)
-		self.min_tile_height = min(
-			min(row) for row in self.map
-		)
+		Like `keyed_adj_cells`, the x-axis wraps around. The y-axis does not,
+		so we clamp the neighbor row to the map, which gives a delta of zero
+		looking north from the top row or south from the bottom row.
+		"""
+		if rows is None:
+			rows = np.arange(self.height)
+		if cols is None:
+			cols = np.arange(self.width)
+		here = self._total_heights(rows, cols)
+		north = self._total_heights(np.maximum(rows - 1, 0), cols)
+		south = self._total_heights(np.minimum(rows + 1, self.height - 1), cols)
+		east = self._total_heights(rows, (cols + 1) % self.width)
+		west = self._total_heights(rows, (cols - 1) % self.width)
+		deltas = np.empty(here.shape + (4,), dtype=np.int32)
+		deltas[..., Direction.NORTH.value] = here - north
+		deltas[..., Direction.EAST.value] = here - east
+		deltas[..., Direction.SOUTH.value] = here - south
+		deltas[..., Direction.WEST.value] = here - west
+		np.clip(deltas, _HEIGHT_DELTA_MIN, _HEIGHT_DELTA_MAX, out=deltas)
+		self._height_deltas[np.ix_(rows, cols)] = deltas
+
+
+	def recompute_deltas(self, region):
+		"""
+		Recomputes the height deltas after the heights in region = (origin,
+		size) changed. The cells bordering the region are recomputed too, as
+		their deltas point into it.
+		"""
+		origin, size = region
+		ox, oy = origin
+		sx, sy = size
+		y_min = max(oy - 1, 0)
+		y_max = min(oy + sy + 1, self.height)
+		if y_min >= y_max:
+			return
+		rows = np.arange(y_min, y_max)
+		if sx + 2 >= self.width:
+			cols = np.arange(self.width)
+		else:
+			cols = np.arange(ox - 1, ox + sx + 1) % self.width
+		self._calc_height_deltas(rows=rows, cols=cols)
 
 
 	def _calc_lat_longs(self):
@@ -138,19 +254,31 @@ class Terrain:
 	@property
 	def land_area(self):
 		"""The area of the terrain that is land."""
-		return self.area - self._water_area - self._ice_area
+		return self.area - self.stats.water_area - self.stats.ice_area
 
 
 	@property
 	def water_area(self):
 		"""The area of the terrain that is water."""
-		return self._water_area
+		return self.stats.water_area
 
 
 	@property
 	def ice_area(self):
 		"""The area of the terrain that is ice."""
-		return self._ice_area
+		return self.stats.ice_area
+
+
+	@property
+	def max_tile_height(self):
+		"""The height of the highest land."""
+		return self.stats.max_tile_height
+
+
+	@property
+	def min_tile_height(self):
+		"""The height of the lowest land."""
+		return self.stats.min_tile_height
 
 
 	@property
@@ -233,13 +361,13 @@ class Terrain:
 	def is_cell_water(self, p):
 		"""Is the given cell position water?"""
 		x, y = p
-		return self.water[y][x % self.width] > 0
+		return self.water.item(y, x % self.width) > 0
 
 
 	def is_cell_ice(self, p):
 		"""Is the given cell position ice?"""
 		x, y = p
-		return self.ice[y][x % self.width] > 0
+		return self.ice.item(y, x % self.width) > 0
 
 
 	def is_cell_ice_edge(self, p):
@@ -257,26 +385,44 @@ class Terrain:
 	def biome_at(self, p):
 		"""Returns the biome at the given cell position."""
 		x, y = p
-		return self.biomes[y][x % self.width]
+		return BIOMES_BY_CODE[self.biomes.item(y, x % self.width)]
 
 
 	def land_height_at(self, p):
 		"""Returns the height at the given cell position, ignoring water."""
 		x, y = p
-		return self.map[y][x % self.width]
+		return self.map.item(y, x % self.width)
 
 
 	def height_at(self, p):
 		"""Returns the height at the given cell position, including water."""
 		x, y = p
 		x_mod = x % self.width
-		return self.map[y][x_mod] + self.water[y][x_mod] + self.ice[y][x_mod]
+		return (
+			self.map.item(y, x_mod)
+			+ self.water.item(y, x_mod)
+			+ self.ice.item(y, x_mod)
+		)
 
 
 	def height_delta(self, p, direction: Direction):
+		"""
+		Returns the height at p minus the height of its neighbor in the given
+		cardinal direction, or zero if that neighbor is off the map.
+		"""
 		x, y = p
 		dv = direction.value
-		return self._height_deltas[y][x][dv]
+		return self._height_deltas.item(y, x % self.width, dv)
+
+
+	@property
+	def height_deltas(self) -> np.ndarray:
+		"""
+		Every cell's `height_delta` in every cardinal direction, as a
+		(height, width, 4) array indexed by direction value. Don't write to
+		it.
+		"""
+		return self._height_deltas
 
 
 	def sea_level(self):
@@ -284,20 +430,7 @@ class Terrain:
 		Returns the sea level of the terrain. This is used for calculating the
 		surface air pressure.
 		"""
-		height_stogram = [0] * 256 # height histogram
-		for y in range(self.height):
-			for x in range(self.width):
-				land = self.map[y][x]
-				water = self.water[y][x]
-				height_stogram[land + water] += 1
-		height = -1
-		max_count = -1
-		for i in range(256):
-			count = height_stogram[i]
-			if count > max_count:
-				max_count = count
-				height = i
-		return height
+		return self.stats.sea_level()
 
 
 	def _choose_cell_to_put_melted_ice(self, p):
@@ -330,18 +463,19 @@ class Terrain:
 		if not self.is_cell_ice_edge(p):
 			return None
 		x, y = p
-		if self.ice[y][x] == 1:
-			self.ice[y][x] = 0
-			self._ice_area -= 1
-			self.water[y][x] = 1
-			self._water_area += 1
+		if self.ice[y, x] == 1:
+			self.ice[y, x] = 0
+			self.water[y, x] = 1
+			self.journal.record([p], TerrainLayer.WATER | TerrainLayer.ICE)
 			return p
 		else:
 			x2, y2 = self._choose_cell_to_put_melted_ice(p)
-			self.ice[y][x] -= 1
-			if self.water[y2][x2] == 0:
-				self._water_area += 1
-			self.water[y2][x2] += 1
+			self.ice[y, x] -= 1
+			self.water[y2, x2] += 1
+			self.recompute_deltas(((x, y), (1, 1)))
+			self.recompute_deltas(((x2, y2), (1, 1)))
+			self.journal.record([p], TerrainLayer.ICE)
+			self.journal.record([(x2, y2)], TerrainLayer.WATER)
 			return x2, y2
 
 
@@ -352,7 +486,7 @@ class Terrain:
 		x, y = p
 
 		# Trivial case: no water to balance.
-		if self.water[y][x] == 0:
+		if self.water[y, x] == 0:
 			return True
 
 		curr_height = self.height_at(p)
@@ -416,87 +550,100 @@ class Terrain:
 		return False
 
 
-	def _postbalance_water(self):
-		"""
-		Puddle hill/valleys are artifacts of the water balancing algorithm.
-		It's possible for a water cell surrounded by water to be a "puddle
-		hill" or "puddle valley", where the difference in height between it and
-		its surroundings is one.
-
-		We want to cancel out as many of them as possible to get a flat
-		ocean.
-		"""
-		puddle_hills = set()
-		puddle_valleys = set()
-		for y in range(self.height):
-			for x in range(self.width):
-				p = (x, y)
-				if self.is_cell_water(p):
-					if self.is_puddle_valley_at_cell(p):
-						puddle_valleys.add(p)
-					elif self.is_puddle_hill_at_cell(p):
-						puddle_hills.add(p)
-		for valley_p, hill_p in zip(puddle_valleys, puddle_hills):
-			vx, vy = valley_p
-			hx, hy = hill_p
-			self.water[vy][vx] += 1
-			self.water[hy][hx] -= 1
-
-
-	def balance_water(self):
-		"""
-		Distributes water from higher cells to lower adjacent cells to balance
-		the water levels.
-		"""
-		for y in range(self.height):
-			for x in range(self.width):
-				if not self.is_cell_water((x, y)):
-					continue
-				# print("Water at ({}, {})".format(x, y))
-				current_height = self.height_at((x, y))
-				adj = adj_cells(self.dimensions, (x, y))
-				lower_adj = []
-				for x2, y2 in adj:
-					adj_height = self.height_at((x2, y2))
-					diff = current_height - adj_height
-					if diff >= 2:
-						lower_adj.append(((x2, y2), adj_height))
-				if lower_adj and self.water[y][x] > 0:
-					# Distribute water to lower neighbors
-					lower_adj.sort(key=lambda p: p[1])
-					for p2, _ in lower_adj:
-						x2, y2 = p2
-						if self.is_water_cell_balanced((x, y)):
-							break
-						self.water[y][x] -= 1
-						self.water[y2][x2] += 1
-		self._postbalance_water()
+	def balance_water(
+			self,
+			max_iterations: int = water_balance.MAX_ITERATIONS,
+			time_budget: float = None
+	) -> WaterBalanceReport:
+		"""
+		Moves water downhill and levels every body of water, until the water
+		settles or the budget runs out. See `src.world.water_balance`.
+		"""
+		report = water_balance.balance_water(
+			self.map.astype(np.int64) + self.ice,
+			self.water,
+			max_iterations=max_iterations,
+			time_budget=time_budget
+		)
+		rows = np.flatnonzero(report.changed.any(axis=1))
+		if len(rows):
+			self.recompute_deltas(
+				((0, int(rows[0])), (self.width, int(rows[-1] - rows[0]) + 1))
+			)
+			self.journal.record_mask(report.changed, TerrainLayer.WATER)
+		return report
 
 
 	def freeze_water_cell(self, cell_pos):
 		"""Turns the water at the given cell position into ice."""
 		x, y = cell_pos
-		if self.water[y][x] == 0:
+		if self.water[y, x] == 0:
 			return
-		water_level = self.water[y][x]
-		self.water[y][x] = 0
-		self.ice[y][x] = water_level
-		self._water_area -= 1
-		self._ice_area += 1
+		water_level = self.water[y, x]
+		self.water[y, x] = 0
+		self.ice[y, x] = water_level
+		self.journal.record([cell_pos], TerrainLayer.WATER | TerrainLayer.ICE)
 
 
 	def freeze_water_row(self, y_coord):
-		"""Turns all water in the given row into ice."""
-		for x in range(self.width):
-			if self.is_cell_water((x, y_coord)):
-				self.freeze_water_cell((x, y_coord))
+		"""
+		Turns all water in the given row into ice. Returns the cells that
+		froze.
+		"""
+		water_row = self.water[y_coord]
+		frozen = water_row > 0
+		if not frozen.any():
+			return []
+		self.ice[y_coord, frozen] = water_row[frozen]
+		water_row[frozen] = 0
+		cells = [(x, y_coord) for x in np.flatnonzero(frozen).tolist()]
+		self.journal.record(cells, TerrainLayer.WATER | TerrainLayer.ICE)
+		return cells
+
+
+	@property
+	def water_distances(self) -> WaterDistanceField:
+		"""
+		The distance from every cell to the nearest water. Changes to the
+		land and water since the last read are applied first, in one batch,
+		and the cells whose distance changed are queued for reclassifying
+		their biome.
+		"""
+		cells = self._water_distance_changes.pull_cells()
+		if cells:
+			changed = self._water_distances.update(cells, self.map, self.water)
+			self._biome_dirty_cells.update(changed)
+		return self._water_distances
 
 
 	def update_biomes(self, tprs=None):
-		"""Updates the biomes of the terrain."""
+		"""
+		Updates the biomes of the terrain given the biome temperature of each
+		row, in Kelvin. If no row changed temperature bucket, only the cells
+		whose water distance changed are reclassified.
+		"""
 		if tprs is None:
 			raise ValueError("Temperatures must be provided.")
-		self.biomes = calculate_biomes(
-			water_distances=self._water_distances,
-			tpr_kelvins=tprs,
-		)
+		tpr_deg_fs = kelvin_to_fahrenheit(np.asarray(tprs, dtype=np.float64))
+		field = self.water_distances
+		biomes = self._biome_classifier.classify(field.xy, field.z, tpr_deg_fs)
+		if biomes is not None:
+			self.journal.record_mask(biomes != self.biomes, TerrainLayer.BIOME)
+			self.biomes = biomes
+		else:
+			cells = list(self._biome_dirty_cells)
+			old_biomes = [self.biomes.item(y, x) for x, y in cells]
+			self._biome_classifier.classify_cells(
+				field.xy,
+				field.z,
+				cells,
+				self.biomes
+			)
+			self.journal.record(
+				(
+					cell for cell, old in zip(cells, old_biomes)
+					if self.biomes.item(cell[1], cell[0]) != old
+				),
+				TerrainLayer.BIOME
+			)
+		self._biome_dirty_cells.clear()
@@ -0,0 +1,275 @@
+"""
+This module keeps a journal of which parts of the terrain changed, so that
+anything derived from the terrain (water distances, render chunks, ridge
+caches, the minimap) can bring itself up to date by redoing just those parts.
+
+Changes are recorded per cell and handed out as rectangles in the same
+(origin, size) form that `Terrain.recompute_deltas` takes, with runs of cells
+along a row and identical runs in consecutive rows merged together.
+"""
+
+import threading
+
+from enum import Flag, auto
+
+import numpy as np
+
+Rect = tuple[tuple[int, int], tuple[int, int]]
+
+
+
+class TerrainLayer(Flag):
+	"""
+	The parts of a cell that can change.
+	"""
+
+	LAND = auto()
+	WATER = auto()
+	ICE = auto()
+	BIOME = auto()
+
+	# Anything that changes how tall the cell is.
+	HEIGHT = LAND | WATER | ICE
+
+	ALL = LAND | WATER | ICE | BIOME
+
+
+def rect_cells(rect: Rect):
+	"""
+	Yields every (x, y) cell in the rectangle.
+	"""
+	(ox, oy), (sx, sy) = rect
+	for y in range(oy, oy + sy):
+		for x in range(ox, ox + sx):
+			yield (x, y)
+
+
+def grow_rect(rect: Rect, n: int = 1) -> Rect:
+	"""
+	Returns the rectangle grown by n cells on every side. Anything that
+	depends on a cell's neighbors needs to redo the grown rectangle.
+	"""
+	(ox, oy), (sx, sy) = rect
+	return ((ox - n, oy - n), (sx + 2 * n, sy + 2 * n))
+
+
+def mask_to_rects(mask: np.ndarray, y_offset: int = 0) -> list[Rect]:
+	"""
+	Covers the True cells of a boolean mask with rectangles, exactly. Rows of
+	the mask are offset by y_offset in the returned rectangles.
+	"""
+	h, w = mask.shape
+	padded = np.zeros((h, w + 2), dtype=np.int8)
+	padded[:, 1:-1] = mask
+	edges = np.diff(padded, axis=1)
+	run_ys, run_starts = np.nonzero(edges == 1)
+	_, run_ends = np.nonzero(edges == -1)
+
+	rects = []
+	# (x0, x1) -> [first row, last row] of the rectangle being grown.
+	growing = {}
+	runs = zip(run_ys.tolist(), run_starts.tolist(), run_ends.tolist())
+	for y, x0, x1 in runs:
+		span = growing.get((x0, x1))
+		if span is not None and span[1] == y - 1:
+			span[1] = y
+			continue
+		if span is not None:
+			rects.append(_span_rect(x0, x1, span, y_offset))
+		growing[(x0, x1)] = [y, y]
+	for (x0, x1), span in growing.items():
+		rects.append(_span_rect(x0, x1, span, y_offset))
+	return rects
+
+
+def _span_rect(x0, x1, span, y_offset) -> Rect:
+	y0, y1 = span
+	return ((x0, y0 + y_offset), (x1 - x0, y1 - y0 + 1))
+
+
+
+class JournalReader:
+	"""
+	One subscriber's view of the journal: every change to the layers it asked
+	for since it last pulled. Safe to pull from another thread than the one
+	changing the terrain (like the path workers).
+	"""
+
+	layers: TerrainLayer
+
+	_dirty: np.ndarray
+
+	# Rows [_row_min, _row_max) hold every dirty cell.
+	_row_min: int
+	_row_max: int
+
+	def __init__(self, dimensions, layers: TerrainLayer = TerrainLayer.ALL):
+		width, height = dimensions
+		self.layers = layers
+		self._dirty = np.zeros((height, width), dtype=bool)
+		self._row_min = height
+		self._row_max = 0
+		self._lock = threading.Lock()
+
+
+	@property
+	def has_changes(self) -> bool:
+		"""True if anything changed since the last pull."""
+		return self._row_min < self._row_max
+
+
+	def _mark_rows(self, row_min, row_max):
+		self._row_min = min(self._row_min, row_min)
+		self._row_max = max(self._row_max, row_max)
+
+
+	def mark_cells(self, xs: np.ndarray, ys: np.ndarray):
+		"""
+		Marks the cells at the given (wrapped) x and y coordinates dirty.
+		"""
+		if not len(ys):
+			return
+		with self._lock:
+			self._dirty[ys, xs % self._dirty.shape[1]] = True
+			self._mark_rows(int(ys.min()), int(ys.max()) + 1)
+
+
+	def mark_mask(self, mask: np.ndarray):
+		"""
+		Marks the True cells of a map-sized boolean mask dirty.
+		"""
+		rows = np.flatnonzero(mask.any(axis=1))
+		if not len(rows):
+			return
+		with self._lock:
+			self._dirty |= mask
+			self._mark_rows(int(rows[0]), int(rows[-1]) + 1)
+
+
+	def pull(self) -> list[Rect]:
+		"""
+		Returns rectangles covering every cell that changed since the last
+		pull, and forgets them.
+		"""
+		if not self.has_changes:
+			return []
+		with self._lock:
+			rows = self._dirty[self._row_min:self._row_max]
+			rects = mask_to_rects(rows, y_offset=self._row_min)
+			rows[:] = False
+			self._row_min = self._dirty.shape[0]
+			self._row_max = 0
+		return rects
+
+
+	def clear(self):
+		"""
+		Forgets every change since the last pull.
+		"""
+		with self._lock:
+			self._dirty[self._row_min:self._row_max] = False
+			self._row_min = self._dirty.shape[0]
+			self._row_max = 0
+
+
+	def pull_arrays(self) -> tuple[np.ndarray, np.ndarray]:
+		"""
+		Like pull, but returns the x and y coordinates of the changed cells
+		as two arrays, in row-major order.
+		"""
+		if not self.has_changes:
+			empty = np.zeros(0, dtype=np.intp)
+			return empty, empty
+		with self._lock:
+			rows = self._dirty[self._row_min:self._row_max]
+			ys, xs = np.nonzero(rows)
+			ys += self._row_min
+			rows[:] = False
+			self._row_min = self._dirty.shape[0]
+			self._row_max = 0
+		return xs, ys
+
+
+	def pull_cells(self) -> list[tuple[int, int]]:
+		"""
+		Like pull, but returns the (x, y) cells themselves.
+		"""
+		xs, ys = self.pull_arrays()
+		return list(zip(xs.tolist(), ys.tolist()))
+
+
+
+class TerrainJournal:
+	"""
+	Collects the cells a terrain's mutations touch and fans them out to
+	subscribers, who pull them whenever suits them (e.g. once per frame or
+	once per tick). Changes made while nobody is subscribed are not kept.
+	"""
+
+	dimensions: tuple[int, int]
+
+	_readers: list[JournalReader]
+
+	def __init__(self, dimensions):
+		self.dimensions = dimensions
+		self._readers = []
+
+
+	def subscribe(
+			self,
+			layers: TerrainLayer = TerrainLayer.ALL
+	) -> JournalReader:
+		"""
+		Returns a reader that sees changes to the given layers from now on.
+		"""
+		reader = JournalReader(self.dimensions, layers)
+		self._readers.append(reader)
+		return reader
+
+
+	def unsubscribe(self, reader: JournalReader):
+		"""
+		Stops recording changes for the reader.
+		"""
+		self._readers.remove(reader)
+
+
+	def _interested(self, layers: TerrainLayer):
+		return [reader for reader in self._readers if reader.layers & layers]
+
+
+	def record(self, cells, layers: TerrainLayer):
+		"""
+		Records that the given layers changed at the given (x, y) cells.
+		"""
+		readers = self._interested(layers)
+		if not readers:
+			return
+		cells = np.asarray(list(cells), dtype=np.int64).reshape(-1, 2)
+		xs = cells[:, 0]
+		ys = cells[:, 1]
+		for reader in readers:
+			reader.mark_cells(xs, ys)
+
+
+	def record_rect(self, rect: Rect, layers: TerrainLayer):
+		"""
+		Records that the given layers changed everywhere in the rectangle.
+		"""
+		readers = self._interested(layers)
+		if not readers:
+			return
+		(ox, oy), (sx, sy) = rect
+		height = self.dimensions[1]
+		ys, xs = np.mgrid[max(oy, 0):min(oy + sy, height), ox:ox + sx]
+		for reader in readers:
+			reader.mark_cells(xs.ravel(), ys.ravel())
+
+
+	def record_mask(self, mask: np.ndarray, layers: TerrainLayer):
+		"""
+		Records that the given layers changed at the True cells of a
+		map-sized boolean mask.
+		"""
+		for reader in self._interested(layers):
+			reader.mark_mask(mask)
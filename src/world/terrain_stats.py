@@ -0,0 +1,234 @@
+"""
+This module keeps summary statistics of a terrain (the height histogram that
+sea level comes from, the land, water, and ice areas, and the lowest and
+highest land) up to date from the terrain's change journal, so that reading
+them doesn't mean scanning the map.
+"""
+
+import numpy as np
+
+from src.world.terrain_journal import TerrainLayer
+
+
+
+class _Histogram:
+	"""
+	Counts of integer values, with a cached mode, minimum, and maximum that
+	are only looked for again when the bucket holding them empties out.
+	"""
+
+	# counts[i] is the number of values equal to offset + i.
+	offset: int
+	counts: np.ndarray
+
+	_mode: int = None
+	_min: int = None
+	_max: int = None
+
+	def __init__(self, values: np.ndarray):
+		values = values.ravel()
+		self.offset = int(values.min())
+		self.counts = np.bincount(values - self.offset).astype(np.int64)
+
+
+	def _fit(self, lo: int, hi: int):
+		"""
+		Grows the buckets to hold values in [lo, hi].
+		"""
+		top = self.offset + len(self.counts) - 1
+		if lo >= self.offset and hi <= top:
+			return
+		new_offset = min(lo, self.offset)
+		new_top = max(hi, top)
+		counts = np.zeros(new_top - new_offset + 1, dtype=np.int64)
+		start = self.offset - new_offset
+		counts[start:start + len(self.counts)] = self.counts
+		self.counts = counts
+		self.offset = new_offset
+
+
+	def replace(self, old: np.ndarray, new: np.ndarray):
+		"""
+		Removes the old values and adds the new ones.
+		"""
+		if not len(old):
+			return
+		self._fit(int(new.min()), int(new.max()))
+		removed = np.bincount(old - self.offset, minlength=len(self.counts))
+		added = np.bincount(new - self.offset, minlength=len(self.counts))
+		self.counts += added - removed
+
+		if self._mode is not None:
+			mode_i = self._mode - self.offset
+			if removed[mode_i] > added[mode_i]:
+				self._mode = None
+			else:
+				grew = np.flatnonzero(added > removed)
+				if len(grew):
+					best = grew[np.argmax(self.counts[grew])]
+					# Ties go to the lower value, like np.argmax.
+					key = (self.counts[best], -best)
+					if key > (self.counts[mode_i], -mode_i):
+						self._mode = int(best) + self.offset
+		if self._min is not None:
+			if self.counts[self._min - self.offset] == 0:
+				self._min = None
+			else:
+				self._min = min(self._min, int(new.min()))
+		if self._max is not None:
+			if self.counts[self._max - self.offset] == 0:
+				self._max = None
+			else:
+				self._max = max(self._max, int(new.max()))
+
+
+	@property
+	def mode(self) -> int:
+		"""The most common value, or the lowest of them if there's a tie."""
+		if self._mode is None:
+			self._mode = int(np.argmax(self.counts)) + self.offset
+		return self._mode
+
+
+	@property
+	def min(self) -> int:
+		"""The smallest value."""
+		if self._min is None:
+			self._min = int(np.flatnonzero(self.counts)[0]) + self.offset
+		return self._min
+
+
+	@property
+	def max(self) -> int:
+		"""The largest value."""
+		if self._max is None:
+			self._max = int(np.flatnonzero(self.counts)[-1]) + self.offset
+		return self._max
+
+
+
+class TerrainStats:
+	"""
+	Statistics of a terrain that follow its changes.
+
+	We keep our own copy of the land and surface (land + water) heights and
+	of which cells are wet or icy. When the journal says cells changed, we
+	compare just those cells with our copy to update the counts, so every
+	statistic costs time proportional to what changed since it was last read.
+
+	Nothing is counted until the first statistic is read, so making a terrain
+	(e.g. loading a planet file) doesn't pay for statistics nobody asks for.
+
+	Changes made to the terrain's planes without going through the journal
+	are not seen.
+	"""
+
+	_terrain = None
+	_changes = None
+
+	_land: np.ndarray
+	_surface: np.ndarray
+	_is_water: np.ndarray
+	_is_ice: np.ndarray
+
+	_land_heights: _Histogram
+	_surface_heights: _Histogram
+
+	_water_area: int
+	_ice_area: int
+
+	_counted: bool = False
+
+	def __init__(self, terrain):
+		self._terrain = terrain
+		self._changes = terrain.journal.subscribe(TerrainLayer.HEIGHT)
+
+
+	def _count(self):
+		"""
+		Counts everything from scratch.
+		"""
+		terrain = self._terrain
+		self._changes.clear()
+		self._land = terrain.map.astype(np.int64)
+		self._surface = self._land + terrain.water
+		self._is_water = terrain.water > 0
+		self._is_ice = terrain.ice > 0
+		self._land_heights = _Histogram(self._land)
+		self._surface_heights = _Histogram(self._surface)
+		self._water_area = int(np.count_nonzero(self._is_water))
+		self._ice_area = int(np.count_nonzero(self._is_ice))
+		self._counted = True
+
+
+	def sync(self):
+		"""
+		Brings the statistics up to date with the terrain.
+		"""
+		if not self._counted:
+			self._count()
+			return
+		if not self._changes.has_changes:
+			return
+		xs, ys = self._changes.pull_arrays()
+		terrain = self._terrain
+
+		land = terrain.map[ys, xs].astype(np.int64)
+		surface = land + terrain.water[ys, xs]
+		is_water = terrain.water[ys, xs] > 0
+		is_ice = terrain.ice[ys, xs] > 0
+
+		self._land_heights.replace(self._land[ys, xs], land)
+		self._surface_heights.replace(self._surface[ys, xs], surface)
+		self._water_area += int(is_water.sum() - self._is_water[ys, xs].sum())
+		self._ice_area += int(is_ice.sum() - self._is_ice[ys, xs].sum())
+
+		self._land[ys, xs] = land
+		self._surface[ys, xs] = surface
+		self._is_water[ys, xs] = is_water
+		self._is_ice[ys, xs] = is_ice
+
+
+	def sea_level(self) -> int:
+		"""
+		The most common surface height (land plus water).
+		"""
+		self.sync()
+		return self._surface_heights.mode
+
+
+	@property
+	def water_area(self) -> int:
+		"""The number of cells with water."""
+		self.sync()
+		return self._water_area
+
+
+	@property
+	def ice_area(self) -> int:
+		"""The number of cells with ice."""
+		self.sync()
+		return self._ice_area
+
+
+	@property
+	def max_tile_height(self) -> int:
+		"""The height of the highest land."""
+		self.sync()
+		return self._land_heights.max
+
+
+	@property
+	def min_tile_height(self) -> int:
+		"""The height of the lowest land."""
+		self.sync()
+		return self._land_heights.min
+
+
+	def height_histogram(self) -> tuple[int, np.ndarray]:
+		"""
+		Returns (offset, counts), where counts[i] is the number of cells with
+		a surface height of offset + i.
+		"""
+		self.sync()
+		return self._surface_heights.offset, self._surface_heights.counts.copy()
@@ -0,0 +1,253 @@
+"""
+This module settles water: it moves water downhill until no water cell has a
+neighbor two or more units below it, and levels every connected body of water
+to a flat surface.
+
+Two steps alternate until neither changes anything:
+
+1. Flow. Every water cell pours one unit into each of its neighbors that is
+   two or more below it, lowest neighbor first, as long as it stays at least
+   as high as the neighbor it pours into. A cell accepts at most one unit per
+   step (from its highest neighbor), so water never piles up higher than where
+   it came from.
+2. Level. Each connected body of water (cells with water, joined along the
+   cardinal directions, wrapping around the x-axis) shares its volume out
+   like communicating vessels: every cell whose floor is below the common
+   level is filled to it, and any remainder goes one unit each to the cells
+   that were already highest.
+
+Both steps lower the sum of the squared surface heights (flow strictly), so
+the process always reaches a fixed point. The steps work on whole arrays at a
+time, so the cost of a step doesn't depend on how much water is moving.
+"""
+
+import time
+
+from dataclasses import dataclass
+
+import numpy as np
+from scipy.ndimage import label
+from scipy.sparse import coo_matrix
+from scipy.sparse.csgraph import connected_components
+
+# A safety net; real maps settle in far fewer iterations.
+MAX_ITERATIONS = 1000
+
+# Stands in for the surface height beyond the top and bottom rows.
+_OFF_MAP = np.iinfo(np.int64).max // 2
+
+_CROSS = np.array([
+	[0, 1, 0],
+	[1, 1, 1],
+	[0, 1, 0],
+])
+
+
+
+@dataclass
+class WaterBalanceReport:
+	"""
+	What a call to `balance_water` did.
+	"""
+
+	# How many flow/level iterations ran.
+	iterations: int
+
+	# False if the iteration or time budget ran out before the water settled.
+	converged: bool
+
+	# A (height, width) mask of the cells whose water level changed.
+	changed: np.ndarray
+
+	@property
+	def moved_cells(self) -> list[tuple[int, int]]:
+		"""The (x, y) cells whose water level changed."""
+		ys, xs = np.nonzero(self.changed)
+		return list(zip(xs.tolist(), ys.tolist()))
+
+
+	@property
+	def num_moved(self) -> int:
+		"""How many cells' water level changed."""
+		return int(np.count_nonzero(self.changed))
+
+
+
+def _neighbor_indices(idx, width, height):
+	"""
+	Returns the flat indices of the north, east, south, and west neighbors of
+	the cells at the given flat indices, and a mask of which ones exist.
+	"""
+	y, x = np.divmod(idx, width)
+	row = idx - x
+	neighbors = np.stack([
+		idx - width,
+		row + (x + 1) % width,
+		idx + width,
+		row + (x - 1) % width,
+	], axis=1)
+	exists = np.ones(neighbors.shape, dtype=bool)
+	exists[:, 0] = y > 0
+	exists[:, 2] = y < height - 1
+	return neighbors, exists
+
+
+def _flow(floor, water) -> bool:
+	"""
+	Runs one flow step on the flat floor and water arrays. Returns True if
+	any water moved.
+	"""
+	height, width = floor.shape
+	floor = floor.ravel()
+	flat_water = water.ravel()
+	idx = np.flatnonzero(flat_water > 0)
+	if not len(idx):
+		return False
+	surface = floor + flat_water
+	neighbors, exists = _neighbor_indices(idx, width, height)
+	neighbor_surface = np.where(
+		exists,
+		surface[np.where(exists, neighbors, 0)],
+		_OFF_MAP
+	)
+
+	# Lowest neighbor first; ties keep the north, east, south, west order.
+	order = np.argsort(neighbor_surface, axis=1, kind='stable')
+	neighbor_surface = np.take_along_axis(neighbor_surface, order, axis=1)
+	neighbors = np.take_along_axis(neighbors, order, axis=1)
+
+	here = surface[idx][:, None]
+	nth = np.arange(1, 5)
+	pours = (
+		(here - neighbor_surface >= np.maximum(nth, 2))
+		& (flat_water[idx][:, None] >= nth)
+	)
+	pours = np.logical_and.accumulate(pours, axis=1)
+	if not pours.any():
+		return False
+
+	senders = np.broadcast_to(idx[:, None], pours.shape)[pours]
+	receivers = neighbors[pours]
+	heights = np.broadcast_to(here, pours.shape)[pours]
+
+	# Each receiver takes from its highest sender only.
+	by_receiver = np.lexsort((senders, -heights, receivers))
+	receivers = receivers[by_receiver]
+	_, first = np.unique(receivers, return_index=True)
+	senders = senders[by_receiver][first]
+	receivers = receivers[first]
+
+	size = height * width
+	flat_water -= np.bincount(senders, minlength=size).astype(water.dtype)
+	flat_water += np.bincount(receivers, minlength=size).astype(water.dtype)
+	return True
+
+
+def water_bodies(water: np.ndarray) -> tuple[np.ndarray, int]:
+	"""
+	Labels the connected bodies of water, wrapping around the x-axis. Returns
+	an int array with 0 for dry cells and 1..n for the n bodies, and n.
+	"""
+	labels, n = label(water > 0, structure=_CROSS)
+	if not n:
+		return labels, 0
+	west = labels[:, 0]
+	east = labels[:, -1]
+	seam = (west > 0) & (east > 0)
+	if not seam.any():
+		return labels, n
+	links = coo_matrix(
+		(np.ones(np.count_nonzero(seam)), (west[seam], east[seam])),
+		shape=(n + 1, n + 1)
+	)
+	n_merged, merged = connected_components(links, directed=False)
+	# Label 0 (dry) is a component of its own; renumber so that it stays 0.
+	dry = merged[0]
+	merged = np.where(merged < dry, merged + 1, merged)
+	merged[0] = 0
+	return merged[labels], n_merged - 1
+
+
+def _level(floor, water) -> bool:
+	"""
+	Runs one level step. Returns True if any water moved.
+	"""
+	labels, n = water_bodies(water)
+	if not n:
+		return False
+	flat_labels = labels.ravel()
+	idx = np.flatnonzero(flat_labels)
+	bodies = flat_labels[idx] - 1
+	floors = floor.ravel()[idx]
+	old = water.ravel()[idx].astype(np.int64)
+	volumes = np.bincount(bodies, weights=old, minlength=n).astype(np.int64)
+
+	# Sort each body's cells by floor height. Filling the lowest k cells up to
+	# the floor of the k-th takes k * f_k - (f_1 + ... + f_k) units; the cells
+	# that get water are those for which that is less than the volume.
+	order = np.lexsort((floors, bodies))
+	bodies = bodies[order]
+	floors = floors[order]
+	starts = np.flatnonzero(np.r_[True, bodies[1:] != bodies[:-1]])
+	counts = np.diff(np.r_[starts, len(bodies)])
+	rank = np.arange(len(bodies)) - np.repeat(starts, counts) + 1
+	prefix = np.cumsum(floors)
+	prefix -= np.repeat(prefix[starts] - floors[starts], counts)
+	wet = rank * floors - prefix < volumes[bodies]
+
+	n_wet = np.bincount(bodies, weights=wet, minlength=n).astype(np.int64)
+	wet_floor = np.bincount(
+		bodies,
+		weights=np.where(wet, floors, 0),
+		minlength=n
+	).astype(np.int64)
+	level, remainder = np.divmod(volumes + wet_floor, n_wet)
+
+	new = np.where(wet, level[bodies] - floors, 0)
+
+	# The remainder goes to the wet cells that are highest now, so a body
+	# that is already level to within one unit stays exactly as it is.
+	surfaces = floors + old[order]
+	by_height = np.lexsort((idx[order], -surfaces, ~wet, bodies))
+	ranked = np.empty(len(bodies), dtype=np.int64)
+	ranked[by_height] = (
+		np.arange(len(bodies)) - np.repeat(starts, counts)
+	)
+	new += wet & (ranked < remainder[bodies])
+
+	cells = idx[order]
+	if np.array_equal(new, old[order]):
+		return False
+	water.ravel()[cells] = new
+	return True
+
+
+def balance_water(
+		floor: np.ndarray,
+		water: np.ndarray,
+		max_iterations: int = MAX_ITERATIONS,
+		time_budget: float = None
+) -> WaterBalanceReport:
+	"""
+	Settles the water plane in place over the given floor (land plus ice).
+	Stops after max_iterations, or once time_budget seconds have passed;
+	calling again picks up where it left off.
+	"""
+	start = time.perf_counter()
+	floor = np.ascontiguousarray(floor, dtype=np.int64)
+	settled = np.ascontiguousarray(water, dtype=np.int64)
+	iterations = 0
+	converged = False
+	while iterations < max_iterations:
+		iterations += 1
+		flowed = _flow(floor, settled)
+		leveled = _level(floor, settled)
+		if not flowed and not leveled:
+			converged = True
+			break
+		if time_budget is not None:
+			if time.perf_counter() - start >= time_budget:
+				break
+	changed = settled != water
+	water[changed] = settled[changed]
+	return WaterBalanceReport(iterations, converged, changed)
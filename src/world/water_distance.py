@@ -0,0 +1,277 @@
+"""
+This module maintains the distance from every cell to the nearest body of
+water, and repairs it locally when water appears or disappears.
+
+See `src.world.biome` for what a water distance is. Here we store the two
+components as separate integer planes: `xy` is the number of cardinal steps to
+the nearest water cell, and `z` is the least total climb (sum of absolute
+height changes) along any path to a water cell. Both wrap around the x-axis.
+"""
+
+import heapq
+import math
+
+import numpy as np
+from scipy.ndimage import distance_transform_cdt
+from scipy.sparse import coo_matrix
+from scipy.sparse.csgraph import dijkstra
+
+from src.world.biome import NO_WATER_DISTANCE, WaterDistanceMatrix
+
+# Stored in both planes for cells that cannot reach water (only possible when
+# the planet has no water at all).
+UNREACHABLE = NO_WATER_DISTANCE
+
+# If more than this fraction of the map changes at once, recomputing the whole
+# field is cheaper than repairing it cell by cell.
+FULL_RECOMPUTE_FRACTION = 0.05
+
+# Added to every edge when handing the z plane to scipy so that flat ground
+# (zero climb) isn't dropped from the sparse graph. The total error along any
+# path stays well under one, so flooring the result recovers the exact sum.
+_EDGE_EPSILON = 1e-7
+
+
+def _full_xy(is_water: np.ndarray) -> np.ndarray:
+	"""
+	Steps to the nearest water cell. Tiling the map three times along x gives
+	the middle copy the correct wrapped distance.
+	"""
+	h, w = is_water.shape
+	xy = np.full((h, w), UNREACHABLE, dtype=np.int32)
+	if not is_water.any():
+		return xy
+	tiled = np.tile(~is_water, (1, 3))
+	dist = distance_transform_cdt(tiled, metric='taxicab')
+	xy[:] = dist[:, w:2 * w]
+	return xy
+
+
+def _full_z(heights: np.ndarray, is_water: np.ndarray) -> np.ndarray:
+	"""
+	Least total climb to the nearest water cell, via a multi-source Dijkstra
+	over the whole map.
+	"""
+	h, w = heights.shape
+	z = np.full((h, w), UNREACHABLE, dtype=np.int32)
+	sources = np.flatnonzero(is_water)
+	if not len(sources):
+		return z
+	idx = np.arange(h * w).reshape(h, w)
+	src = np.concatenate([idx.ravel(), idx[:-1].ravel()])
+	dst = np.concatenate([np.roll(idx, -1, axis=1).ravel(), idx[1:].ravel()])
+	flat = heights.ravel()
+	weights = np.abs(flat[src] - flat[dst]) + _EDGE_EPSILON
+	graph = coo_matrix((weights, (src, dst)), shape=(h * w, h * w)).tocsr()
+	dist = dijkstra(graph, directed=False, indices=sources, min_only=True)
+	z[:] = np.floor(dist).reshape(h, w)
+	return z
+
+
+
+class WaterDistanceField:
+	"""
+	The water distances of a terrain, kept up to date incrementally.
+
+	Build it once from the land and water planes, then call `update` with the
+	cells whose land or water changed. Only the cells whose distance depended
+	on those cells are recomputed.
+	"""
+
+	width: int
+	height: int
+
+	xy: np.ndarray
+	z: np.ndarray
+
+	_heights: np.ndarray
+	_is_water: np.ndarray
+
+	def __init__(self, land_height, water_level):
+		land_height = np.asarray(land_height)
+		water_level = np.asarray(water_level)
+		self.height, self.width = land_height.shape
+		self.recompute(land_height, water_level)
+
+
+	@classmethod
+	def from_planes(cls, land_height, water_level, xy, z):
+		"""
+		Makes a field from distances computed earlier (e.g. loaded from a
+		planet file) instead of computing them.
+		"""
+		field = cls.__new__(cls)
+		land_height = np.asarray(land_height)
+		field.height, field.width = land_height.shape
+		field._heights = land_height.astype(np.int32) + water_level
+		field._is_water = np.asarray(water_level) > 0
+		field.xy = xy
+		field.z = z
+		return field
+
+
+	def recompute(self, land_height, water_level):
+		"""
+		Recomputes the whole field from scratch.
+		"""
+		self._heights = np.asarray(land_height, dtype=np.int32) + water_level
+		self._is_water = np.asarray(water_level) > 0
+		self.xy = _full_xy(self._is_water)
+		self.z = _full_z(self._heights, self._is_water)
+
+
+	def at(self, p):
+		"""
+		Returns the water distance (xy, z) at p = (x, y), or (inf, inf) if
+		there is no water to reach.
+		"""
+		x, y = p
+		x = x % self.width
+		xy = self.xy.item(y, x)
+		if xy == UNREACHABLE:
+			return (math.inf, math.inf)
+		return (xy, self.z.item(y, x))
+
+
+	def as_matrix(self) -> WaterDistanceMatrix:
+		"""
+		Returns the field in the list-of-tuples format `calculate_biomes`
+		takes.
+		"""
+		if not self._is_water.any():
+			return [
+				[(math.inf, math.inf)] * self.width
+				for _ in range(self.height)
+			]
+		return [
+			list(zip(xy_row, z_row))
+			for xy_row, z_row in zip(self.xy.tolist(), self.z.tolist())
+		]
+
+
+	def _neighbors(self, i):
+		w = self.width
+		y, x = divmod(i, w)
+		row = i - x
+		yield row + (x + 1) % w
+		yield row + (x - 1) % w
+		if y > 0:
+			yield i - w
+		if y < self.height - 1:
+			yield i + w
+
+
+	def _dependents(self, dist, seeds, climb):
+		"""
+		Returns the seeds plus every cell whose distance may have come
+		through one of them, i.e. the cells reachable over edges where
+		dist[v] == dist[u] + weight(u, v).
+		"""
+		is_water = self._is_water.ravel()
+		heights = self._heights.ravel()
+		found = set(seeds)
+		stack = list(seeds)
+		while stack:
+			u = stack.pop()
+			du = dist[u]
+			if du >= UNREACHABLE:
+				continue
+			for v in self._neighbors(u):
+				if v in found or is_water[v]:
+					continue
+				weight = abs(heights[u] - heights[v]) if climb else 1
+				if dist[v] == du + weight:
+					found.add(v)
+					stack.append(v)
+		return found
+
+
+	def _repair(self, dist, affected, climb):
+		"""
+		Resets the affected cells and runs a Dijkstra relaxation seeded from
+		the water cells among them and the unaffected cells around them.
+		Relaxation stops as soon as no distance improves, so the work stays
+		proportional to the area that actually changed.
+		"""
+		is_water = self._is_water.ravel()
+		heights = self._heights.ravel()
+		queue = []
+		for i in affected:
+			if is_water[i]:
+				dist[i] = 0
+				queue.append((0, i))
+			else:
+				dist[i] = UNREACHABLE
+		for i in affected:
+			for n in self._neighbors(i):
+				if n not in affected and dist[n] < UNREACHABLE:
+					queue.append((dist[n], n))
+		heapq.heapify(queue)
+		relaxed = set()
+		while queue:
+			d, u = heapq.heappop(queue)
+			if d > dist[u]:
+				continue
+			for v in self._neighbors(u):
+				weight = abs(heights[u] - heights[v]) if climb else 1
+				nd = d + weight
+				if nd < dist[v]:
+					dist[v] = nd
+					relaxed.add(v)
+					heapq.heappush(queue, (nd, v))
+		return relaxed
+
+
+	def update(self, cells, land_height, water_level):
+		"""
+		Repairs the field after the land or water at the given (x, y) cells
+		changed. Returns the cells whose water distance changed.
+		"""
+		idxs = {
+			(y * self.width) + (x % self.width)
+			for x, y in cells
+		}
+		if not idxs:
+			return []
+		if len(idxs) > FULL_RECOMPUTE_FRACTION * self.width * self.height:
+			old_xy, old_z = self.xy, self.z
+			self.recompute(land_height, water_level)
+			changed = (old_xy != self.xy) | (old_z != self.z)
+			return [(x, y) for y, x in zip(*np.nonzero(changed))]
+
+		land_height = np.asarray(land_height)
+		water_level = np.asarray(water_level)
+		flat_heights = self._heights.ravel()
+		flat_water = self._is_water.ravel()
+		new_values = {}
+		source_changed = set()
+		for i in idxs:
+			y, x = divmod(i, self.width)
+			water = water_level.item(y, x)
+			height = land_height.item(y, x) + water
+			new_values[i] = (height, water > 0)
+			if (water > 0) != flat_water[i]:
+				source_changed.add(i)
+
+		# Find what depended on the old state before overwriting it.
+		xy = self.xy.ravel()
+		z = self.z.ravel()
+		affected_xy = self._dependents(xy, source_changed, climb=False)
+		affected_z = self._dependents(z, idxs, climb=True)
+		for i, (height, is_water) in new_values.items():
+			flat_heights[i] = height
+			flat_water[i] = is_water
+
+		old = {i: (xy.item(i), z.item(i)) for i in affected_xy | affected_z}
+		touched = set(old)
+		if affected_xy:
+			touched |= self._repair(xy, affected_xy, climb=False)
+		touched |= self._repair(z, affected_z, climb=True)
+
+		changed = []
+		for i in sorted(touched):
+			before = old.get(i)
+			if before is None or before != (xy.item(i), z.item(i)):
+				y, x = divmod(i, self.width)
+				changed.append((x, y))
+		return changed
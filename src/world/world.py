@@ -1,5 +1,6 @@
 from src.world.astronomy import Astronomy
 from src.world.atmosphere import Atmosphere, AtmosphereElement
+from src.world.freeze import FreezeFrontier
 from src.world.history import PlanetHistory
 from src.world.horology import Horology, CENTURIA
 from src.world.terrain import Terrain
@@ -24,6 +25,11 @@ class World(Tickable):
 
 	history: PlanetHistory
 
+	freeze_frontier: FreezeFrontier
+
+	# The cells whose water froze during the last tick_second.
+	frozen_cells: list[tuple[int, int]] = None
+
 	def __init__(
 			self,
 			terrain: Terrain,
@@ -50,6 +56,8 @@ class World(Tickable):
 		)
 
 		self.history = PlanetHistory(self)
+		self.freeze_frontier = FreezeFrontier(self.terrain, self.atmosphere)
+		self.frozen_cells = []
 
 
 	@property
@@ -79,13 +87,7 @@ class World(Tickable):
 		"""
 		self.atmosphere.tick_second(dt, utc)
 		self.history.update(self.game_mgr.utc)
-		# TODO(jm) - this is going to be slow. We can keep track of the "edge"
-		# of the arctic area, only update that, and then increment / decrement
-		# it.
-		for y in range(self.terrain.height):
-			latitude = self.terrain.lats[y]
-			if self.atmosphere.is_frozen_at(latitude):
-				self.terrain.freeze_water_row(y)
+		self.frozen_cells = self.freeze_frontier.tick()
 		# Recompute biomes.
 		biome_tprs = self.atmosphere.biome_tprs(self.terrain.lats)
 		self.terrain.update_biomes(biome_tprs)
@@ -7,6 +7,7 @@ from src.math.vector2 import Vector2
 from src.mgmt.game_manager import GameManager
 from src.mgmt.event_manager import EventManager
 from src.mgmt.event import Event
+from src.path.path_service import PathService
 
 from src.gameobject.action import Action
 from src.gameobject.actor import (
@@ -61,6 +62,7 @@ class ActorTest(unittest.TestCase):
 	def test__moves__via_event(self):
 		actor = self.actor
 		actor.update(MoveActorEvent(actor=actor, to_position=Vector2(1,1)))
+		actor.game_mgr.paths.flush()
 		utc = 0
 		while actor.is_moving:
 			actor.tick(1, utc)
@@ -68,6 +70,85 @@ class ActorTest(unittest.TestCase):
 		self.assertEqual(actor.pos, Vector2(1,1))
 
 
+	def test__moves__after_path_is_found(self):
+		actor = self.actor
+		actor.update(MoveActorEvent(actor=actor, to_position=Vector2(1,1)))
+		self.assertTrue(actor.is_finding_path)
+		self.assertFalse(actor.is_moving)
+		actor.game_mgr.paths.flush()
+		self.assertFalse(actor.is_finding_path)
+		self.assertTrue(actor.is_moving)
+
+
+	def test__moves__retarget_cancels_path(self):
+		actor = self.actor
+		actor.update(MoveActorEvent(actor=actor, to_position=Vector2(1,1)))
+		first = actor._path_request
+		actor.update(MoveActorEvent(actor=actor, to_position=Vector2(2,0)))
+		self.assertTrue(first.cancelled)
+		actor.game_mgr.paths.flush()
+		self.assertFalse(first.done())
+		utc = 0
+		while actor.is_moving:
+			actor.tick(1, utc)
+			utc += 1
+		self.assertEqual(actor.pos, Vector2(2,0))
+
+
+	def test__moves__requests_share_occupancy_snapshot(self):
+		actor = self.actor
+		other = Actor(speed=1, game_mgr=actor.game_mgr, pos=(3,3))
+		actor.update(MoveActorEvent(actor=actor, to_position=Vector2(1,1)))
+		other.update(MoveActorEvent(actor=other, to_position=Vector2(1,1)))
+		self.assertIs(
+			actor._path_request._search[3],
+			other._path_request._search[3]
+		)
+
+
+	def test__moves__old_path_does_not_do_new_action(self):
+		actor = self.actor
+		actor.game_mgr.paths = PathService(workers=1)
+		actor._path_runner.path = [Vector2(0,0), Vector2(0,1)]
+		event = MockEvent()
+		action = Action(
+			event=event,
+			display_label="Test Action",
+			offset=Vector2(0,0),
+			expected_value=None,
+			target=MockTarget(Vector2(3,3))
+		)
+		actor.update(ActorDoActionEvent(actor=actor, action=action))
+		# The old path would have ended by now; the new one isn't handed
+		# back until the path service ticks.
+		for utc in range(3):
+			actor.tick(1, utc)
+		actor.evt_mgr.pub.assert_not_called()
+		actor.game_mgr.paths.flush()
+		utc = 0
+		while actor.is_moving:
+			actor.tick(1, utc)
+			utc += 1
+		self.assertEqual(actor.pos, Vector2(3,3))
+		actor.evt_mgr.pub.assert_called_once_with(event)
+		actor.game_mgr.paths.shutdown()
+
+
+	def test__moves__action_when_already_there(self):
+		actor = self.actor
+		event = MockEvent()
+		action = Action(
+			event=event,
+			display_label="Test Action",
+			offset=Vector2(0,0),
+			expected_value=None,
+			target=MockTarget(Vector2(0,0))
+		)
+		actor.update(ActorDoActionEvent(actor=actor, action=action))
+		actor.game_mgr.paths.flush()
+		actor.evt_mgr.pub.assert_called_once_with(event)
+
+
 	def test__hides__when_enter_rabbit_hole(self):
 		actor = self.actor
 		actor.update(EnterRabbitHoleEvent(actor=actor))
@@ -92,6 +173,7 @@ class ActorTest(unittest.TestCase):
 		)
 		actor = self.actor
 		actor.update(ActorDoActionEvent(actor=actor, action=action))
+		actor.game_mgr.paths.flush()
 		utc = 0
 		while actor.is_moving:
 			actor.tick(1, utc)
@@ -116,6 +198,7 @@ class ActorTest(unittest.TestCase):
 		)
 		actor = self.actor
 		actor.update(ActorDoActionEvent(actor=actor, action=action))
+		actor.game_mgr.paths.flush()
 		utc = 0
 		while actor.is_moving:
 			actor.tick(1, utc)
@@ -4,7 +4,12 @@ from unittest.mock import MagicMock, Mock
 
 from src.mgmt.event_manager import EventManager
 from src.gameobject.flora import Flora, FloraPrototype, FloraDiedEvent
-from src.world.atmosphere import AtmosphereChangeTransformEvent, AtmosphereElement
+from src.world.astronomy import Astronomy
+from src.world.atmosphere import (
+	Atmosphere,
+	AtmosphereElement,
+	EARTH_ATMOSPEHRE_AVG_COMPOSITION,
+)
 
 def make_prototype():
 	return FloraPrototype(
@@ -83,22 +88,47 @@ class TestFlora(unittest.TestCase):
 		self.assertEqual(self.flora.health, 100)
 
 
-	def test__on_init__publishes_atmosphere_change_delta_event(self):
+	def test__on_init__contributes_to_atmosphere(self):
 		self.flora.on_init()
-		self.flora.evt_mgr.pub.assert_called_once_with(
-			AtmosphereChangeTransformEvent({
+		atmosphere = self.game_mgr.world.atmosphere
+		atmosphere.contribute.assert_called_once_with(
+			transform={
 				(AtmosphereElement.CARBON, AtmosphereElement.OXYGEN): (1, 1)
-			})
+			}
 		)
+		self.flora.evt_mgr.pub.assert_not_called()
 
 
-	def test__on_remove__publishes_atmosphere_change_delta_event(self):
+	def test__on_remove__releases_contribution(self):
+		self.flora.on_init()
+		contribution = self.game_mgr.world.atmosphere.contribute.return_value
 		self.flora.on_remove()
-		self.flora.evt_mgr.pub.assert_called_once_with(
-			AtmosphereChangeTransformEvent({
-				(AtmosphereElement.CARBON, AtmosphereElement.OXYGEN): (-1, -1)
-			})
+		contribution.release.assert_called_once_with()
+		self.flora.evt_mgr.pub.assert_not_called()
+
+
+	def test__on_remove__without_init(self):
+		self.flora.on_remove()
+		self.game_mgr.world.atmosphere.contribute.assert_not_called()
+
+
+	def test__on_init_and_remove__real_atmosphere(self):
+		atmosphere = Atmosphere(
+			average=EARTH_ATMOSPEHRE_AVG_COMPOSITION,
+			astronomy=Astronomy()
 		)
+		self.game_mgr.world.atmosphere = atmosphere
+		trees = [
+			Flora(prototype=make_prototype(), game_mgr=self.game_mgr)
+			for _ in range(1000)
+		]
+		for tree in trees:
+			tree.on_init()
+		pair = (AtmosphereElement.CARBON, AtmosphereElement.OXYGEN)
+		self.assertEqual(atmosphere.transform[pair], (1000, 1000))
+		for tree in trees[:400]:
+			tree.on_remove()
+		self.assertEqual(atmosphere.transform[pair], (600, 600))
 
 
 	def test__tick__good_tprs(self):
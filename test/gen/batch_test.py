@@ -0,0 +1,90 @@
+import json
+import os
+import tempfile
+import unittest
+
+from contextlib import redirect_stdout
+from io import StringIO
+
+from src.gen.atmosphere_generator import AtmosphereType
+from src.gen.batch import INDEX_NAME, main, run_batch
+from src.gen.planet_file import load_world
+from src.gen.world_generator import MakeTerrainOptions
+
+OPTIONS = MakeTerrainOptions(width=32, height=16, ocean=True)
+
+
+class BatchTest(unittest.TestCase):
+	def setUp(self):
+		tmp = tempfile.TemporaryDirectory()
+		self.addCleanup(tmp.cleanup)
+		self.dir = tmp.name
+
+
+	def test__run_batch__writes_planets_and_index(self):
+		index = run_batch(
+			self.dir,
+			2,
+			first_seed=5,
+			terrain_options=OPTIONS,
+			workers=1
+		)
+		with open(os.path.join(self.dir, INDEX_NAME), encoding='utf-8') as f:
+			self.assertEqual(json.load(f), index)
+		self.assertEqual(index['atmosphere_type'], 'MARS_LIKE')
+		self.assertNotIn('seed', index['terrain_options'])
+		self.assertEqual([p['seed'] for p in index['planets']], [5, 6])
+		for planet in index['planets']:
+			world = load_world(os.path.join(self.dir, planet['file']))
+			self.assertEqual(planet['land_area'], world.terrain.land_area)
+			self.assertEqual(planet['water_area'], world.terrain.water_area)
+			self.assertEqual(planet['sea_level'], world.terrain.sea_level())
+			self.assertEqual(sum(planet['biomes'].values()), 32 * 16)
+			self.assertIn('TOTAL', planet['habitability'])
+
+
+	def test__run_batch__same_seed_same_planet(self):
+		first = run_batch(
+			os.path.join(self.dir, 'a'),
+			1,
+			first_seed=3,
+			terrain_options=OPTIONS,
+			atmosphere_type=AtmosphereType.EARTH_LIKE,
+			workers=1
+		)
+		second = run_batch(
+			os.path.join(self.dir, 'b'),
+			1,
+			first_seed=3,
+			terrain_options=OPTIONS,
+			atmosphere_type=AtmosphereType.EARTH_LIKE,
+			workers=1
+		)
+		for planet in (first['planets'][0], second['planets'][0]):
+			del planet['seconds']
+		self.assertEqual(first, second)
+		with open(os.path.join(self.dir, 'a', 'planet-3.planet'), 'rb') as f:
+			a = f.read()
+		with open(os.path.join(self.dir, 'b', 'planet-3.planet'), 'rb') as f:
+			b = f.read()
+		self.assertEqual(a, b)
+
+
+	def test__main__process_pool(self):
+		out = StringIO()
+		with redirect_stdout(out):
+			main([
+				'--out', self.dir,
+				'--count', '2',
+				'--seed', '1',
+				'--width', '32',
+				'--height', '16',
+				'--workers', '2',
+			])
+		self.assertIn('planet-1.planet', out.getvalue())
+		self.assertTrue(os.path.exists(os.path.join(self.dir, 'planet-2.planet')))
+
+
+
+if __name__ == '__main__':
+	unittest.main()
@@ -0,0 +1,72 @@
+import os
+import tempfile
+import unittest
+
+from dataclasses import replace
+
+from src.gen.world_generator import MakeTerrainOptions, make_terrain
+from src.gen.planet_cache import PlanetCache, options_key
+
+OPTIONS = MakeTerrainOptions(width=32, height=16, seed=7)
+
+
+class PlanetCacheTest(unittest.TestCase):
+	def setUp(self):
+		tmp = tempfile.TemporaryDirectory()
+		self.addCleanup(tmp.cleanup)
+		self.cache = PlanetCache(os.path.join(tmp.name, 'planets'))
+
+
+	def test__options_key__depends_on_every_option(self):
+		self.assertEqual(options_key(OPTIONS), options_key(replace(OPTIONS)))
+		self.assertNotEqual(
+			options_key(OPTIONS),
+			options_key(replace(OPTIONS, seed=8))
+		)
+		self.assertNotEqual(
+			options_key(OPTIONS),
+			options_key(replace(OPTIONS, ocean=True))
+		)
+
+
+	def test__get__missing(self):
+		self.assertIsNone(self.cache.get(OPTIONS))
+
+
+	def test__put__then_get(self):
+		terrain = make_terrain(OPTIONS)
+		self.cache.put(OPTIONS, terrain)
+		cached = self.cache.get(OPTIONS)
+		self.assertEqual(cached.map.tolist(), terrain.map.tolist())
+		self.assertEqual(cached.water.tolist(), terrain.water.tolist())
+		self.assertIsNone(self.cache.get(replace(OPTIONS, seed=8)))
+
+
+	def test__put__unseeded_is_not_cached(self):
+		options = replace(OPTIONS, seed=None)
+		self.cache.put(options, make_terrain(options))
+		self.assertIsNone(self.cache.get(options))
+		self.assertFalse(os.path.exists(self.cache.directory))
+
+
+	def test__get__unreadable_file(self):
+		os.makedirs(self.cache.directory)
+		with open(self.cache.path(OPTIONS), 'wb') as f:
+			f.write(b'not a planet')
+		self.assertIsNone(self.cache.get(OPTIONS))
+
+
+	def test__make_terrain__fills_and_uses_cache(self):
+		made = make_terrain(OPTIONS, cache=self.cache)
+		self.assertTrue(os.path.exists(self.cache.path(OPTIONS)))
+		opened = make_terrain(OPTIONS, cache=self.cache)
+		self.assertEqual(opened.map.tolist(), made.map.tolist())
+		self.assertEqual(
+			opened.map.tolist(),
+			make_terrain(OPTIONS).map.tolist()
+		)
+
+
+
+if __name__ == '__main__':
+	unittest.main()
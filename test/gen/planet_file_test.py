@@ -0,0 +1,124 @@
+import os
+import tempfile
+import unittest
+
+import numpy as np
+
+from src.world.atmosphere import AtmosphereElement
+from src.world.astronomy import Astronomy
+from src.world.terrain import Terrain
+from src.world.world import World
+
+from src.gen.planet_file import (
+	PlanetFileError,
+	load_terrain,
+	load_world,
+	save_terrain,
+	save_world,
+)
+
+LAND = [
+	[5, 5, 5, 5, 5, 5],
+	[5, 1, 1, 1, 2, 5],
+	[5, 1, 0, 1, 2, 5],
+	[5, 5, 5, 5, 5, 5],
+]
+WATER = [
+	[0, 0, 0, 0, 0, 0],
+	[0, 1, 1, 1, 0, 0],
+	[0, 1, 2, 1, 0, 0],
+	[0, 0, 0, 0, 0, 0],
+]
+ICE = [
+	[1, 1, 1, 1, 1, 1],
+	[0, 0, 0, 0, 0, 0],
+	[0, 0, 0, 0, 0, 0],
+	[0, 0, 0, 0, 0, 0],
+]
+
+
+class PlanetFileTest(unittest.TestCase):
+	def setUp(self):
+		fd, self.path = tempfile.mkstemp(suffix='.planet')
+		os.close(fd)
+		self.addCleanup(os.remove, self.path)
+		terrain = Terrain(LAND, WATER, ICE)
+		composition = {key: 0 for key in AtmosphereElement}
+		composition[AtmosphereElement.CARBON] = 7
+		self.world = World(
+			terrain,
+			astronomy=Astronomy(star_luminosity=2, orbital_radius=3),
+			atmosphere_composition=composition
+		)
+		self.world.terrain.update_biomes([250, 290, 290, 250])
+
+
+	def test__round_trip__terrain(self):
+		save_world(self.world, self.path)
+		terrain = load_terrain(self.path)
+		original = self.world.terrain
+		self.assertEqual(terrain.dimensions, (6, 4))
+		self.assertEqual(terrain.map.tolist(), LAND)
+		self.assertEqual(terrain.water.tolist(), WATER)
+		self.assertEqual(terrain.ice.tolist(), ICE)
+		self.assertEqual(terrain.biomes.tolist(), original.biomes.tolist())
+		self.assertTrue(
+			np.array_equal(terrain._height_deltas, original._height_deltas)
+		)
+		self.assertEqual(
+			terrain.water_distances.at((4, 1)),
+			original.water_distances.at((4, 1))
+		)
+		self.assertEqual(terrain.sea_level(), original.sea_level())
+
+
+	def test__round_trip__world(self):
+		save_world(self.world, self.path)
+		world = load_world(self.path)
+		self.assertEqual(world.astronomy.star_luminosity, 2)
+		self.assertEqual(world.astronomy.orbital_radius, 3)
+		self.assertEqual(world.atmosphere.average[AtmosphereElement.CARBON], 7)
+
+
+	def test__save_terrain__round_trip(self):
+		save_terrain(self.world.terrain, self.path)
+		terrain = load_terrain(self.path)
+		self.assertEqual(terrain.map.tolist(), LAND)
+		self.assertEqual(terrain.ice.tolist(), ICE)
+		with self.assertRaises(PlanetFileError):
+			load_world(self.path)
+
+
+	def test__load__memory_mapped(self):
+		save_world(self.world, self.path)
+		terrain = load_terrain(self.path)
+		self.assertIsInstance(terrain.map, np.memmap)
+
+
+	def test__load__changes_stay_in_memory(self):
+		save_world(self.world, self.path)
+		terrain = load_terrain(self.path)
+		terrain.freeze_water_cell((2, 2))
+		self.assertEqual(terrain.ice[2, 2], 2)
+		self.assertEqual(terrain.water_area, 5)
+		self.assertEqual(load_terrain(self.path).water[2, 2], 2)
+
+
+	def test__load__not_a_planet(self):
+		with open(self.path, 'wb') as f:
+			f.write(b'this is not a planet file at all')
+		with self.assertRaises(PlanetFileError):
+			load_terrain(self.path)
+
+
+	def test__load__truncated(self):
+		save_world(self.world, self.path)
+		with open(self.path, 'r+b') as f:
+			f.truncate(os.path.getsize(self.path) // 2)
+		with self.assertRaises(PlanetFileError):
+			load_terrain(self.path)
+
+
+
+if __name__ == '__main__':
+	unittest.main()
@@ -45,5 +45,45 @@ class TerrainGeneratorTest(unittest.TestCase):
 		self.assertEqual(terrain.land_area + terrain.water_area, 64 * 32)
 
 
+	def test__make__ocean_fills_sea_cells(self):
+		tgen = TerrainGenerator(64, 32, avg_cell_area=4)
+		tgen.set_landmasses()
+		tgen.set_ocean(sea_level=6)
+		terrain = tgen.make()
+		is_sea = tgen.is_sea[tgen.voronoi]
+		surface = terrain.map + terrain.water
+		self.assertTrue((surface[is_sea] == 6).all())
+		self.assertTrue((terrain.water[~is_sea] == 0).all())
+
+
+	def test__make__land_follows_labels(self):
+		tgen = TerrainGenerator(64, 32, avg_cell_area=4)
+		tgen.set_ice_caps()
+		tgen.set_landmasses()
+		terrain = tgen.make()
+		self.assertEqual(
+			terrain.ice.tolist(),
+			tgen.ice_heights[tgen.voronoi].tolist()
+		)
+		self.assertTrue((terrain.map >= 2).all())
+		self.assertTrue((terrain.map <= 10).all())
+
+
+	def test__make__same_seed_same_terrain(self):
+		def make(seed):
+			tgen = TerrainGenerator(64, 32, avg_cell_area=4, seed=seed)
+			tgen.set_ice_caps()
+			tgen.set_landmasses()
+			tgen.set_ocean()
+			return tgen.make()
+		a = make(5)
+		b = make(5)
+		c = make(6)
+		self.assertEqual(a.map.tolist(), b.map.tolist())
+		self.assertEqual(a.water.tolist(), b.water.tolist())
+		self.assertEqual(a.ice.tolist(), b.ice.tolist())
+		self.assertNotEqual(a.map.tolist(), c.map.tolist())
+
+
 if __name__ == "__main__":
 	unittest.main()
@@ -0,0 +1,100 @@
+import unittest
+
+import numpy as np
+
+from src.gen.terrain_generator import TerrainGenerator
+from src.gen.tiled_generation import (
+	bands,
+	tiled_height_maps,
+	tiled_voronoi,
+)
+from src.math.random import random_2d_integers_numpy
+from src.math.voronoi import voronoi_from_points
+from src.o10n import native
+
+
+def _generate(workers, band_rows=128, ocean=True):
+	tgen = TerrainGenerator(
+		60,
+		43,
+		avg_cell_area=8,
+		seed=9,
+		workers=workers,
+		band_rows=band_rows
+	)
+	tgen.set_ice_caps()
+	tgen.set_landmasses(cell_radius=2)
+	if ocean:
+		tgen.set_ocean()
+	return tgen, tgen.make()
+
+
+class TiledGenerationTest(unittest.TestCase):
+	def test__bands(self):
+		self.assertEqual(list(bands(10, 4)), [(0, 4), (4, 8), (8, 10)])
+		self.assertEqual(list(bands(4, 4)), [(0, 4)])
+
+
+	def test__tiled_voronoi__matches_serial(self):
+		dimensions = (50, 31)
+		points = random_2d_integers_numpy(200, 50, 31, seed=1)
+		expected = voronoi_from_points(dimensions, points)
+		with native.disabled():
+			np.testing.assert_array_equal(
+				voronoi_from_points(dimensions, points),
+				expected
+			)
+		actual = tiled_voronoi(dimensions, points, workers=2, band_rows=7)
+		np.testing.assert_array_equal(actual, expected)
+
+
+	def test__tiled_height_maps__one_row_bands(self):
+		labels = np.array([
+			[0, 1, 1, 2],
+			[0, 0, 2, 2],
+			[1, 1, 2, 0],
+		])
+		land_heights = np.array([2, 10, 4])
+		ice_heights = np.array([0, 0, 3])
+		is_sea = np.array([True, False, False])
+		land, ice, water = tiled_height_maps(
+			labels,
+			land_heights,
+			ice_heights,
+			is_sea=is_sea,
+			sea_level=6,
+			workers=2,
+			band_rows=1
+		)
+		tgen = TerrainGenerator(4, 3, avg_cell_area=4)
+		tgen.voronoi = labels
+		tgen.land_heights = land_heights
+		tgen.ice_heights = ice_heights
+		tgen.is_sea = is_sea
+		tgen.set_ocean(sea_level=6)
+		tgen._apply_height_maps()
+		tgen._make_ocean()
+		self.assertEqual(land.tolist(), tgen.land_map.tolist())
+		self.assertEqual(ice.tolist(), tgen.ice_map.tolist())
+		self.assertEqual(water.tolist(), tgen.water_map.tolist())
+
+
+	def test__make__matches_serial(self):
+		serial_gen, serial = _generate(None)
+		tiled_gen, tiled = _generate(3, band_rows=5)
+		np.testing.assert_array_equal(tiled_gen.voronoi, serial_gen.voronoi)
+		self.assertEqual(tiled.map.tolist(), serial.map.tolist())
+		self.assertEqual(tiled.water.tolist(), serial.water.tolist())
+		self.assertEqual(tiled.ice.tolist(), serial.ice.tolist())
+
+
+	def test__make__matches_serial_without_ocean(self):
+		_, serial = _generate(None, ocean=False)
+		_, tiled = _generate(2, band_rows=16, ocean=False)
+		self.assertEqual(tiled.map.tolist(), serial.map.tolist())
+		self.assertEqual(tiled.water_area, 0)
+
+
+
+if __name__ == '__main__':
+	unittest.main()
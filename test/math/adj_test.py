@@ -6,6 +6,7 @@ from src.math.adj import (
 	adj_cells,
 	keyed_adj_cells,
 	bool_adj_from_labels,
+	sparse_adj_from_labels,
 	select_adj_degree,
 	are_cells_adj_cardinally,
 	are_cells_adj,
@@ -102,6 +103,42 @@ class AdjTest(unittest.TestCase):
 				else:
 					self.assertFalse(ans[y][x])
 	
+	def test__sparse_adj_from_labels__matches_pairs(self):
+		ans = sparse_adj_from_labels(EXAMPLE_ADJ, 6, loop_x=False)
+		rows, cols = ans.nonzero()
+		self.assertEqual(
+			set(zip(rows.tolist(), cols.tolist())),
+			set(EXAMPLE_ADJ_PAIRS) | {(b, a) for a, b in EXAMPLE_ADJ_PAIRS}
+		)
+
+	def test__sparse_adj_from_labels__diag(self):
+		labels = [
+			[0, 1],
+			[2, 0],
+		]
+		ans = sparse_adj_from_labels(labels, 3, loop_x=False)
+		self.assertFalse(ans[1, 2])
+		ans = sparse_adj_from_labels(labels, 3, loop_x=False, diag=True)
+		self.assertTrue(ans[1, 2])
+		self.assertTrue(ans[2, 1])
+		self.assertFalse(ans[0, 0])
+
+	def test__sparse_adj_from_labels__loop_y(self):
+		labels = [
+			[0],
+			[1],
+			[2],
+		]
+		ans = sparse_adj_from_labels(labels, 3, loop_y=False)
+		self.assertFalse(ans[0, 2])
+		ans = sparse_adj_from_labels(labels, 3, loop_y=True)
+		self.assertTrue(ans[0, 2])
+
+	def test__select_adj_degree__sparse(self):
+		b_adj = sparse_adj_from_labels([[0, 1, 2, 3]], 4, loop_x=False)
+		self.assertEqual(select_adj_degree(b_adj, 0, 2), set([0, 1, 2]))
+		self.assertEqual(select_adj_degree(b_adj, 3, 9), set([0, 1, 2, 3]))
+
 	def test__select_adj_degree__base(self):
 		self.assertEqual(
 			select_adj_degree(SIMPLE_B_ADJ, 0, 0),
@@ -4,6 +4,7 @@ from src.math.adj import adj_cells
 from src.math.matrix import (
 	matrix_sized_as,
 	smooth_matrix,
+	smooth_array,
 	round_matrix_to_int,
 	matrix_double_width,
 	matrix_fold_width,
@@ -71,6 +72,20 @@ class SmoothMatrixTest(unittest.TestCase):
 		self.assertGreaterEqual(result[1][2], 0)
 
 
+	def test__smooth_array__edge_loop(self):
+		result = smooth_array(TEST_LOOP_MAT, weight=1)
+		# (2, 1) sees the 1 at (0, 1) across the seam, among 8 neighbors.
+		self.assertAlmostEqual(result[1][2], 1 / 9)
+		# (1, 0) is on the top edge, so it has only 5 neighbors.
+		self.assertAlmostEqual(result[0][1], 1 / 6)
+
+
+	def test__smooth_array__edge_no_loop(self):
+		result = smooth_array(TEST_LOOP_MAT, weight=1, loop_x=False)
+		self.assertEqual(result[1][2], 0)
+		self.assertAlmostEqual(result[0][0], 1 / 4)
+
+
 	def test__round_matrix_to_int__noop(self):
 		result = round_matrix_to_int(TEST_MAT)
 		for y in range(3):
@@ -37,5 +37,32 @@ class TestRandomFunctions(unittest.TestCase):
 			self.assertEqual(len(points), 3)
 			self.assertEqual(len(points_set), 3)
 
+	def test__random_2d_integers_numpy__fills_every_cell(self):
+		points = random_2d_integers_numpy(12, 4, 3)
+		self.assertEqual(points.shape, (12, 2))
+		self.assertEqual(
+			set(map(tuple, points.tolist())),
+			{(x, y) for x in range(4) for y in range(3)}
+		)
+
+	def test__random_2d_integers_numpy__sparse_points_in_bounds(self):
+		width = 300
+		height = 200
+		points = random_2d_integers_numpy(1000, width, height)
+		self.assertEqual(points.shape, (1000, 2))
+		self.assertEqual(len(set(map(tuple, points.tolist()))), 1000)
+		self.assertTrue((points[:, 0] >= 0).all())
+		self.assertTrue((points[:, 0] < width).all())
+		self.assertTrue((points[:, 1] >= 0).all())
+		self.assertTrue((points[:, 1] < height).all())
+
+	def test__random_2d_integers_numpy__same_seed_same_points(self):
+		for n in (10, 500):
+			a = random_2d_integers_numpy(n, 40, 20, seed=3)
+			b = random_2d_integers_numpy(n, 40, 20, seed=3)
+			c = random_2d_integers_numpy(n, 40, 20, seed=4)
+			self.assertEqual(a.tolist(), b.tolist())
+			self.assertNotEqual(a.tolist(), c.tolist())
+
 if __name__ == '__main__':
 	unittest.main()
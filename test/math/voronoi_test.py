@@ -1,6 +1,24 @@
 import unittest
 
-from src.math.voronoi import make_voronoi
+from unittest.mock import patch
+
+import numpy as np
+
+from src.math import voronoi
+from src.math.voronoi import make_voronoi, voronoi_from_points
+from src.o10n import native
+
+def _looped_distance2s(dimensions, points):
+	"""
+	The squared distance from every cell to every point, looping the x-axis,
+	indexed [y, x, point].
+	"""
+	width, height = dimensions
+	ys, xs = np.indices((height, width))
+	dxs = np.abs(xs[..., None] - points[:, 0])
+	dxs = np.minimum(dxs, width - dxs)
+	dys = ys[..., None] - points[:, 1]
+	return dxs ** 2 + dys ** 2
 
 class VoronoiTest(unittest.TestCase):
 	def test__make_voronoi(self):
@@ -13,5 +31,46 @@ class VoronoiTest(unittest.TestCase):
 				labels.add(matrix[y][x])
 		self.assertEqual(len(labels), 4)
 
+	def test__make_voronoi__returns_array(self):
+		matrix = make_voronoi((16, 8), 4)
+		self.assertIsInstance(matrix, np.ndarray)
+		self.assertEqual(matrix.shape, (8, 16))
+
+	def test__make_voronoi__seeded(self):
+		a = make_voronoi((32, 16), 8, seed=11)
+		b = make_voronoi((32, 16), 8, seed=11)
+		np.testing.assert_array_equal(a, b)
+
+	def test__voronoi_from_points__matches_brute_force(self):
+		points = np.array([[1, 1], [7, 3], [13, 5], [3, 7], [11, 1]])
+		dimensions = (16, 8)
+		with native.disabled():
+			labels = voronoi_from_points(dimensions, points)
+		distance2s = _looped_distance2s(dimensions, points)
+		# Cells equidistant from two points may go to either one.
+		np.testing.assert_array_equal(
+			np.take_along_axis(distance2s, labels[..., None], axis=-1)[..., 0],
+			distance2s.min(axis=-1)
+		)
+
+	def test__voronoi_from_points__ties_go_to_lower_index(self):
+		# (2, 0) is as close to both points; so are (0, 0) and (4, 0) once
+		# the x-axis wraps around.
+		points = np.array([[3, 0], [1, 0]])
+		with native.disabled():
+			labels = voronoi_from_points((4, 1), points)
+		self.assertEqual(labels.tolist(), [[0, 1, 0, 0]])
+
+	def test__voronoi_from_points__blocks_match_one_query(self):
+		rng = np.random.default_rng(5)
+		dimensions = (37, 23)
+		idxs = rng.choice(37 * 23, 30, replace=False)
+		points = np.column_stack([idxs % 37, idxs // 37])
+		with native.disabled():
+			whole = voronoi_from_points(dimensions, points)
+			with patch.object(voronoi, 'QUERY_BLOCK_CELLS', 40):
+				blocked = voronoi_from_points(dimensions, points)
+		np.testing.assert_array_equal(blocked, whole)
+
 if __name__ == "__main__":
 	unittest.main()
@@ -2,6 +2,7 @@ import unittest
 
 from unittest.mock import MagicMock, Mock
 
+from src.gameobject.actor import Actor
 from src.gameobject.lander import Lander
 
 from src.world.terrain import Terrain
@@ -138,6 +139,97 @@ class GameManagerTest(unittest.TestCase):
 		gm.remove_game_object(obj)
 		self.assertNotIn(obj, gm.game_objects)
 
+	def test__occupancy_version__changes(self):
+		"""Test that adding and removing objects changes the occupancy
+		version."""
+		gm = GameManager(self.world, self.viewport, no_gui=True)
+		obj = MagicMock()
+		before = gm.occupancy_version
+		gm.add_game_object(obj)
+		added = gm.occupancy_version
+		gm.remove_game_object(obj)
+		self.assertEqual(len({before, added, gm.occupancy_version}), 3)
+
+	def test__occupancy_version__changes_on_moves(self):
+		"""Test that moving objects and new characters change the occupancy
+		version, and that staying put doesn't."""
+		gm = GameManager(self.world, self.viewport, no_gui=True)
+		before = gm.occupancy_version
+		gm.new_player_character((0, 0))
+		self.assertNotEqual(gm.occupancy_version, before)
+		lander = Lander(pos=(20, 5), game_mgr=gm)
+		gm.add_game_object(lander)
+		gm.is_cell_occupied((0, 0))
+		before = gm.occupancy_version
+		lander.pos = (20, 5)
+		self.assertEqual(gm.occupancy_version, before)
+		lander.pos = (30, 5)
+		self.assertNotEqual(gm.occupancy_version, before)
+
+	def test__occupancy_snapshot__once_per_version(self):
+		"""Test that occupancy_snapshot is only remade when the occupancy
+		version changes."""
+		gm = GameManager(self.world, self.viewport, no_gui=True)
+		lander = Lander(pos=(20, 5), game_mgr=gm)
+		gm.add_game_object(lander)
+		snapshot = gm.occupancy_snapshot()
+		self.assertIs(gm.occupancy_snapshot(), snapshot)
+		self.assertTrue(snapshot[5, 20])
+		self.assertFalse(snapshot.flags.writeable)
+		lander.pos = (40, 5)
+		moved = gm.occupancy_snapshot()
+		self.assertIsNot(moved, snapshot)
+		self.assertTrue(snapshot[5, 20])
+		self.assertFalse(moved[5, 20])
+
+	def test__shutdown__stops_paths(self):
+		"""Test that shutdown drops the paths still being found."""
+		gm = GameManager(self.world, self.viewport, no_gui=True)
+		request = gm.paths.request(self.terrain, (0, 0), (5, 5))
+		gm.shutdown()
+		self.assertTrue(request.cancelled)
+
+	def test__occupied_mask(self):
+		"""Test that occupied_mask marks the cells objects are on, wrapping
+		around in x."""
+		gm = GameManager(self.world, self.viewport, no_gui=True)
+		lander = Lander(pos=(63, 4), game_mgr=gm)
+		gm.add_game_object(lander)
+		mask = gm.occupied_mask((60, 2), (8, 10))
+		self.assertEqual(mask.shape, (10, 8))
+		# The lander is 11 by 11, from x = 63 (wrapping to 9) and y = 4.
+		self.assertEqual(int(mask.sum()), 5 * 8)
+		self.assertTrue(mask[2, 3])
+		self.assertFalse(mask[1, 3])
+		self.assertFalse(gm.occupied_mask((10, 2), (8, 10)).any())
+
+	def test__is_cell_occupied(self):
+		"""Test that is_cell_occupied follows objects being added, moved and
+		removed."""
+		gm = GameManager(self.world, self.viewport, no_gui=True)
+		lander = Lander(pos=(0, 0), game_mgr=gm)
+		gm.add_game_object(lander)
+		self.assertTrue(gm.is_cell_occupied((10, 10)))
+		self.assertFalse(gm.is_cell_occupied((11, 11)))
+		lander.pos = (20, 5)
+		self.assertFalse(gm.is_cell_occupied((10, 10)))
+		self.assertTrue(gm.is_cell_occupied((30, 15)))
+		gm.remove_game_object(lander)
+		self.assertFalse(gm.is_cell_occupied((30, 15)))
+
+	def test__is_cell_occupied__follows_actors(self):
+		"""Test that is_cell_occupied follows actors as they walk."""
+		gm = GameManager(self.world, self.viewport, no_gui=True)
+		actor = Actor(game_mgr=gm, pos=Vector2(0, 0), speed=1)
+		gm.add_game_object(actor)
+		self.assertTrue(gm.is_cell_occupied((0, 0)))
+		actor._path_runner.path = [Vector2(0, 0), Vector2(1, 0), Vector2(2, 0)]
+		for utc in range(3):
+			actor.tick(1, utc)
+		self.assertEqual(actor.pos, Vector2(2, 0))
+		self.assertFalse(gm.is_cell_occupied((0, 0)))
+		self.assertTrue(gm.is_cell_occupied((2, 0)))
+
 	def test__new_colony(self):
 		"""Test that new_colony creates a new colony."""
 		gm = GameManager(self.world, self.viewport, no_gui=True)
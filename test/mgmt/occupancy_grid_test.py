@@ -0,0 +1,82 @@
+import unittest
+
+from src.mgmt.occupancy_grid import OccupancyGrid
+
+class _Thing:
+	def __init__(self, pos, size):
+		self.pos = pos
+		self.size = size
+
+class OccupancyGridTest(unittest.TestCase):
+	def test__add(self):
+		grid = OccupancyGrid((16, 8))
+		thing = _Thing((2, 3), (2, 2, 1))
+		grid.add(thing)
+		self.assertIn(thing, grid)
+		self.assertTrue(grid.is_occupied((2, 3)))
+		self.assertTrue(grid.is_occupied((3, 4)))
+		self.assertFalse(grid.is_occupied((4, 4)))
+		self.assertFalse(grid.is_occupied((2, 5)))
+
+	def test__add__wraps_x(self):
+		grid = OccupancyGrid((16, 8))
+		grid.add(_Thing((15, 0), (3, 1)))
+		self.assertTrue(grid.is_occupied((15, 0)))
+		self.assertTrue(grid.is_occupied((1, 0)))
+		self.assertTrue(grid.is_occupied((17, 0)))
+		self.assertFalse(grid.is_occupied((2, 0)))
+
+	def test__add__clipped_to_map(self):
+		grid = OccupancyGrid((16, 8))
+		grid.add(_Thing((0, 6), (1, 4)))
+		self.assertTrue(grid.is_occupied((0, 7)))
+		self.assertFalse(grid.is_occupied((0, 8)))
+		self.assertFalse(grid.is_occupied((0, -1)))
+
+	def test__remove__keeps_overlapping(self):
+		grid = OccupancyGrid((16, 8))
+		first = _Thing((2, 2), (2, 2))
+		second = _Thing((3, 3), (2, 2))
+		grid.add(first)
+		grid.add(second)
+		grid.remove(first)
+		self.assertNotIn(first, grid)
+		self.assertFalse(grid.is_occupied((2, 2)))
+		self.assertTrue(grid.is_occupied((3, 3)))
+		grid.remove(first)
+		self.assertTrue(grid.is_occupied((3, 3)))
+
+	def test__move(self):
+		grid = OccupancyGrid((16, 8))
+		thing = _Thing((2, 2), (1, 1))
+		grid.add(thing)
+		thing.pos = (5, 6)
+		self.assertTrue(grid.move(thing))
+		self.assertFalse(grid.move(thing))
+		self.assertFalse(grid.is_occupied((2, 2)))
+		self.assertTrue(grid.is_occupied((5, 6)))
+		thing.size = (2, 1, 5)
+		grid.move(thing)
+		self.assertTrue(grid.is_occupied((6, 6)))
+		self.assertEqual(len(grid), 1)
+
+	def test__move__untracked(self):
+		grid = OccupancyGrid((16, 8))
+		self.assertFalse(grid.move(_Thing((2, 2), (1, 1))))
+		self.assertFalse(grid.is_occupied((2, 2)))
+
+	def test__mask(self):
+		grid = OccupancyGrid((16, 8))
+		grid.add(_Thing((15, 1), (2, 1)))
+		mask = grid.mask((14, -1), (4, 3))
+		self.assertEqual(mask.shape, (3, 4))
+		self.assertEqual(mask.tolist(), [
+			[False, False, False, False],
+			[False, False, False, False],
+			[False, True, True, False],
+		])
+		self.assertTrue(grid.is_area_occupied((0, 0), (2, 2)))
+		self.assertFalse(grid.is_area_occupied((1, 0), (2, 2)))
+
+if __name__ == "__main__":
+	unittest.main()
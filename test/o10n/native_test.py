@@ -0,0 +1,115 @@
+import unittest
+
+import random
+
+import numpy as np
+
+from src.math.voronoi import voronoi_from_points
+from src.o10n import native
+from src.world.biome import calculate_biomes, water_distances
+
+
+def _random_terrain(rng, w, h, p_water):
+	land = [[rng.randint(0, 9) for _ in range(w)] for _ in range(h)]
+	water = [
+		[rng.randint(1, 3) if rng.random() < p_water else 0 for _ in range(w)]
+		for _ in range(h)
+	]
+	return land, water
+
+
+def _looped_distance2s(dimensions, points, labels):
+	width, height = dimensions
+	y_indices, x_indices = np.indices((height, width))
+	closest = np.asarray(points)[labels]
+	dx = np.abs(closest[..., 0] - x_indices)
+	dx = np.minimum(dx, width - dx)
+	dy = closest[..., 1] - y_indices
+	return dx * dx + dy * dy
+
+
+class NativeFallbackTest(unittest.TestCase):
+	def test__disabled(self):
+		with native.disabled():
+			self.assertFalse(native.is_available())
+
+
+	def test__disabled__uses_python(self):
+		land = [[1, 1, 1], [1, 1, 1]]
+		water = [[0, 0, 0], [0, 0, 1]]
+		with native.disabled():
+			wds = water_distances(land, water)
+		self.assertEqual(wds[0][0], (2, 1))
+
+
+
+@unittest.skipUnless(native.is_available(), 'bin/compiled.so is not built')
+class NativeParityTest(unittest.TestCase):
+	def test__water_distances(self):
+		rng = random.Random(5)
+		for w, h in ((5, 5), (13, 7), (6, 11)):
+			for loop_x in (True, False):
+				land, water = _random_terrain(rng, w, h, 0.08)
+				with native.disabled():
+					expected = water_distances(land, water, loop_x=loop_x)
+				actual = water_distances(land, water, loop_x=loop_x)
+				self.assertEqual(actual, expected)
+
+
+	def test__water_distances__no_water(self):
+		land = [[1, 2, 3], [4, 5, 6]]
+		water = [[0, 0, 0], [0, 0, 0]]
+		with native.disabled():
+			expected = water_distances(land, water)
+		self.assertEqual(water_distances(land, water), expected)
+
+
+	def test__calculate_biomes(self):
+		rng = random.Random(9)
+		land, water = _random_terrain(rng, 24, 10, 0.03)
+		with native.disabled():
+			wds = water_distances(land, water)
+		tprs = [-10, 0, 20, 44.9, 45, 60, 75, 109.99, 110, 200]
+		for wet_cutoff in (4, 64):
+			with native.disabled():
+				expected = calculate_biomes(
+					wds, tpr_deg_fs=tprs, wet_cutoff=wet_cutoff
+				)
+			actual = calculate_biomes(wds, tpr_deg_fs=tprs, wet_cutoff=wet_cutoff)
+			self.assertEqual(actual, expected)
+
+
+	def test__calculate_biomes__no_water(self):
+		wds = [[(float('inf'), float('inf'))] * 3 for _ in range(2)]
+		with native.disabled():
+			expected = calculate_biomes(wds, tpr_deg_fs=[50, 50])
+		self.assertEqual(calculate_biomes(wds, tpr_deg_fs=[50, 50]), expected)
+
+
+	def test__voronoi_from_points(self):
+		rng = np.random.default_rng(3)
+		for dimensions, n in (((8, 4), 5), ((31, 17), 40), ((64, 32), 32)):
+			w, h = dimensions
+			idxs = rng.choice(w * h, n, replace=False)
+			points = np.column_stack([idxs % w, idxs // w])
+			with native.disabled():
+				expected = voronoi_from_points(dimensions, points)
+			actual = voronoi_from_points(dimensions, points)
+			self.assertEqual(actual.shape, (h, w))
+			# Cells equidistant from two points may go to either one, so
+			# compare how far each cell is from the point it was given.
+			np.testing.assert_array_equal(
+				_looped_distance2s(dimensions, points, actual),
+				_looped_distance2s(dimensions, points, expected)
+			)
+
+
+	def test__voronoi_from_points__ties_go_to_lower_index(self):
+		points = np.array([[1, 0], [3, 0]])
+		labels = native.voronoi_from_points((4, 1), points)
+		self.assertEqual(labels.tolist(), [[0, 0, 0, 1]])
+
+
+
+if __name__ == '__main__':
+	unittest.main()
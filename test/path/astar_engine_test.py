@@ -0,0 +1,115 @@
+import random
+import unittest
+
+from src.world.terrain import Terrain
+from src.world.terrain_journal import TerrainLayer
+
+from src.path.astar import astar, reference_astar
+from src.path.astar_engine import AstarEngine, engine_for
+
+def _cells(path):
+	return [tuple(cell) for cell in path]
+
+class AstarEngineTest(unittest.TestCase):
+	def test__index__column_major(self):
+		engine = AstarEngine(Terrain([[1] * 6] * 3))
+		self.assertEqual(engine.index((0, 0)), 0)
+		self.assertEqual(engine.index((0, 2)), 2)
+		self.assertEqual(engine.index((1, 0)), 3)
+		self.assertEqual(engine.index((-1, 0)), 15)
+		self.assertEqual(engine.cell(13), (4, 1))
+
+	def test__tables__compact(self):
+		engine = AstarEngine(Terrain([[1] * 6] * 3))
+		tables = [
+			engine.heights, engine._neighbors, engine._costs,
+			engine._stamp, engine._g, engine._parent
+		]
+		self.assertEqual([table.itemsize for table in tables], [4] * 6)
+		self.assertEqual(len(engine._expanded), 18)
+		self.assertIsInstance(engine._expanded, bytearray)
+
+	def test__search__indices(self):
+		engine = AstarEngine(Terrain([[1] * 6] * 3))
+		path = engine.search(engine.index((0, 0)), engine.index((2, 0)))
+		self.assertEqual(
+			[engine.cell(index) for index in path],
+			[(0, 0), (1, 0), (2, 0)]
+		)
+
+	def test__search__wraps_x(self):
+		engine = AstarEngine(Terrain([[1] * 6] * 3))
+		path = engine.search(engine.index((0, 1)), engine.index((5, 1)))
+		self.assertEqual(
+			[engine.cell(index) for index in path],
+			[(0, 1), (5, 1)]
+		)
+
+	def test__search__start_is_goal(self):
+		engine = AstarEngine(Terrain([[1] * 6] * 3))
+		self.assertEqual(engine.search(4, 4), [4])
+
+	def test__search__blocked(self):
+		engine = AstarEngine(Terrain([[1] * 6] * 3))
+		row = {engine.index((x, 1)) for x in range(6)}
+		path = engine.search(
+			engine.index((0, 0)),
+			engine.index((0, 2)),
+			lambda index: index in row
+		)
+		self.assertEqual(path, [])
+
+	def test__search__repeated_searches_independent(self):
+		terrain = Terrain([[1, 2, 3, 9, 9, 9]] * 4)
+		engine = AstarEngine(terrain)
+		first = engine.search(engine.index((0, 0)), engine.index((2, 3)))
+		engine.search(engine.index((5, 3)), engine.index((1, 1)))
+		again = engine.search(engine.index((0, 0)), engine.index((2, 3)))
+		self.assertEqual(first, again)
+
+	def test__search__follows_terrain_changes(self):
+		terrain = Terrain([[1] * 6] * 3)
+		engine = engine_for(terrain)
+		self.assertEqual(
+			_cells(astar((0, 1), (2, 1), terrain)),
+			[(0, 1), (1, 1), (2, 1)]
+		)
+		# Raise a wall in the middle of the row.
+		terrain.map[1, 1] = 50
+		terrain.recompute_deltas(((1, 1), (1, 1)))
+		terrain.journal.record([(1, 1)], TerrainLayer.LAND)
+		path = astar((0, 1), (2, 1), terrain)
+		self.assertNotIn((1, 1), _cells(path))
+		self.assertEqual(
+			_cells(path),
+			_cells(reference_astar((0, 1), (2, 1), terrain))
+		)
+		self.assertIs(engine_for(terrain), engine)
+
+	def test__astar__matches_reference(self):
+		rng = random.Random(0)
+		for _ in range(100):
+			w = rng.randint(3, 16)
+			h = rng.randint(2, 12)
+			top = rng.choice([2, 10, 300])
+			terrain = Terrain([
+				[rng.randint(0, top) for _ in range(w)] for _ in range(h)
+			])
+			occupied = {
+				(rng.randrange(w), rng.randrange(h))
+				for _ in range(rng.randint(0, w * h // 3))
+			}
+			def is_cell_occupied(cell):
+				return tuple(cell) in occupied
+			for _ in range(4):
+				start = (rng.randrange(w), rng.randrange(h))
+				goal = (rng.randrange(w), rng.randrange(h))
+				self.assertEqual(
+					_cells(astar(start, goal, terrain, is_cell_occupied)),
+					_cells(reference_astar(
+						start, goal, terrain, is_cell_occupied
+					))
+				)
+
+if __name__ == "__main__":
+	unittest.main()
@@ -71,7 +71,7 @@ class AstarTest(unittest.TestCase):
 
 		start = (0, 0)
 		goal = (2, 2)
-		exp_path = [(0, 0), (1, 0), (1, 1), (1, 2), (2, 2)]
+		exp_path = [(0, 0), (0, 1), (0, 2), (1, 2), (2, 2)]
 
 		path = astar(start, goal, terrain)
 		self.assertEqual(path, exp_path)
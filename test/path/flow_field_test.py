@@ -0,0 +1,205 @@
+import random
+import unittest
+
+import numpy as np
+
+from src.math.direction import Direction
+from src.world.terrain import Terrain
+from src.world.terrain_journal import TerrainLayer
+
+from src.path.astar import astar
+from src.path.flow_field import (
+	FlowField, FlowFieldService, flow_astar, flow_fields_for
+)
+
+def _path_cost(terrain, path):
+	"""
+	The cost of a path, checking that every step is to a neighbor.
+	"""
+	w = terrain.width
+	total = 0
+	for (x, y), (x2, y2) in zip(path, path[1:]):
+		delta = ((x2 - x) % w, y2 - y)
+		direction = {
+			(0, -1): Direction.NORTH,
+			(1, 0): Direction.EAST,
+			(0, 1): Direction.SOUTH,
+			(w - 1, 0): Direction.WEST,
+		}[delta]
+		total += abs(terrain.height_delta((x, y), direction)) + 1
+	return total
+
+def _mask_of(occupied):
+	def occupied_mask(origin, size):
+		ox, oy = origin
+		columns, rows = size
+		mask = np.zeros((rows, columns), dtype=bool)
+		for x, y in occupied:
+			column, row = x - ox, y - oy
+			if 0 <= column < columns and 0 <= row < rows:
+				mask[row, column] = True
+		return mask
+	return occupied_mask
+
+class FlowFieldTest(unittest.TestCase):
+	def test__window__clipped_to_radius(self):
+		terrain = Terrain([[1] * 64] * 32)
+		field = FlowField(terrain, (2, 5), 4)
+		self.assertEqual((field.x0, field.columns), (62, 9))
+		self.assertEqual((field.y0, field.y1), (1, 10))
+		self.assertEqual(field.local((61, 5)), -1)
+		self.assertEqual(field.cell(field.local((63, 9))), (63, 9))
+
+	def test__window__whole_width(self):
+		terrain = Terrain([[1] * 8] * 8)
+		field = FlowField(terrain, (2, 5), 4)
+		self.assertEqual((field.x0, field.columns), (0, 8))
+		self.assertEqual(field.cost((0, 5)), 2)
+		self.assertEqual(field.cost((7, 5)), 3)
+
+	def test__path__optimal(self):
+		rng = random.Random(0)
+		for _ in range(20):
+			w = rng.randint(4, 24)
+			h = rng.randint(2, 16)
+			# Under 128, so deltas aren't clipped and astar is optimal too.
+			top = rng.choice([2, 10, 100])
+			terrain = Terrain([
+				[rng.randint(0, top) for _ in range(w)] for _ in range(h)
+			])
+			goal = (rng.randrange(w), rng.randrange(h))
+			field = FlowField(terrain, goal, max(w, h))
+			for _ in range(5):
+				start = (rng.randrange(w), rng.randrange(h))
+				path = field.path(start)
+				self.assertEqual(path[0], start)
+				self.assertEqual(path[-1], goal)
+				self.assertEqual(
+					_path_cost(terrain, path),
+					_path_cost(terrain, astar(start, goal, terrain))
+				)
+				self.assertEqual(field.cost(start), _path_cost(terrain, path))
+
+	def test__path__outside_window(self):
+		terrain = Terrain([[1] * 64] * 32)
+		field = FlowField(terrain, (10, 10), 4)
+		self.assertIsNone(field.path((20, 10)))
+
+	def test__path__goes_around_occupied_cells(self):
+		terrain = Terrain([[1] * 32] * 16)
+		occupied = {(x, 8) for x in range(2, 30)} | {(5, 2)}
+		field = FlowField(terrain, (5, 12), 16, _mask_of(occupied))
+		path = field.path((5, 2))
+		self.assertEqual(path[0], (5, 2))
+		self.assertFalse(occupied & set(path[1:]))
+		_path_cost(terrain, path)
+
+class FlowFieldServiceTest(unittest.TestCase):
+	def test__field__shared_by_goal(self):
+		terrain = Terrain([[1] * 64] * 32)
+		service = FlowFieldService(terrain, radius=16)
+		field = service.field((10, 10))
+		self.assertIs(service.field((74, 10)), field)
+		for start in [(4, 4), (20, 12), (12, 24)]:
+			self.assertEqual(service.path(start, (10, 10))[-1], (10, 10))
+		self.assertEqual(len(service), 1)
+
+	def test__field__least_recently_used_evicted(self):
+		terrain = Terrain([[1] * 64] * 32)
+		service = FlowFieldService(terrain, radius=4, capacity=2)
+		service.field((1, 1))
+		service.field((2, 2))
+		service.field((1, 1))
+		service.field((3, 3))
+		self.assertIn((1, 1), service)
+		self.assertNotIn((2, 2), service)
+		self.assertIn((3, 3), service)
+
+	def test__field__dropped_when_terrain_changes(self):
+		terrain = Terrain([[1] * 64] * 32)
+		service = FlowFieldService(terrain, radius=4)
+		near = service.field((10, 10))
+		far = service.field((40, 10))
+		terrain.map[10, 12] = 50
+		terrain.recompute_deltas(((12, 10), (1, 1)))
+		terrain.journal.record([(12, 10)], TerrainLayer.LAND)
+		self.assertIsNot(service.field((10, 10)), near)
+		self.assertIs(service.field((40, 10)), far)
+		self.assertNotIn((12, 10), service.path((14, 10), (10, 10)))
+
+	def test__field__remade_when_occupancy_changes(self):
+		terrain = Terrain([[1] * 64] * 32)
+		service = FlowFieldService(terrain, radius=8)
+		field = service.field((10, 10), _mask_of(set()), 1)
+		self.assertIs(service.field((10, 10), _mask_of(set()), 1), field)
+		occupied = {(11, 10)}
+		remade = service.field((10, 10), _mask_of(occupied), 2)
+		self.assertIsNot(remade, field)
+		self.assertNotIn((11, 10), remade.path((14, 10)))
+
+	def test__wants_field__second_time(self):
+		terrain = Terrain([[1] * 64] * 32)
+		service = FlowFieldService(terrain, radius=4)
+		self.assertFalse(service.wants_field((10, 10)))
+		self.assertTrue(service.wants_field((74, 10)))
+		self.assertFalse(service.wants_field((20, 10)))
+		service.field((30, 10))
+		self.assertTrue(service.wants_field((30, 10)))
+
+	def test__wants_field__forgets_old_goals(self):
+		terrain = Terrain([[1] * 64] * 32)
+		service = FlowFieldService(terrain, radius=4, capacity=1)
+		for x in range(5):
+			service.wants_field((x, 0))
+		self.assertFalse(service.wants_field((0, 0)))
+		self.assertTrue(service.wants_field((4, 0)))
+
+class FlowAstarTest(unittest.TestCase):
+	def test__flow_astar__like_astar(self):
+		rng = random.Random(2)
+		terrain = Terrain([[rng.randint(0, 9) for _ in range(40)] for _ in range(20)])
+		flow_astar((30, 5), (15, 12), terrain)
+		path = flow_astar((3, 3), (15, 12), terrain)
+		self.assertIn((15, 12), flow_fields_for(terrain))
+		self.assertEqual(tuple(path[0]), (3, 3))
+		self.assertEqual(tuple(path[-1]), (15, 12))
+		self.assertEqual(
+			_path_cost(terrain, path),
+			_path_cost(terrain, astar((3, 3), (15, 12), terrain))
+		)
+
+	def test__flow_astar__one_off_goal_skips_field(self):
+		terrain = Terrain([[1] * 64] * 32)
+		path = flow_astar((3, 3), (15, 12), terrain)
+		self.assertEqual(tuple(path[-1]), (15, 12))
+		self.assertEqual(len(flow_fields_for(terrain)), 0)
+		flow_astar((5, 3), (15, 12), terrain)
+		self.assertIn((15, 12), flow_fields_for(terrain))
+
+	def test__flow_astar__far_start_falls_back(self):
+		terrain = Terrain([[1] * 512] * 16)
+		path = flow_astar((0, 0), (200, 10), terrain)
+		self.assertEqual(tuple(path[0]), (0, 0))
+		self.assertEqual(tuple(path[-1]), (200, 10))
+		self.assertEqual(_path_cost(terrain, path), 200 + 10)
+
+	def test__flow_astar__occupied_goal(self):
+		terrain = Terrain([[1] * 64] * 32)
+		path = flow_astar((0, 0), (40, 20), terrain, lambda cell: True)
+		self.assertEqual(path, [])
+
+	def test__flow_astar__checks_stale_occupancy(self):
+		terrain = Terrain([[1] * 64] * 32)
+		for _ in range(2):
+			flow_astar((10, 2), (10, 20), terrain, lambda cell: False)
+		self.assertIn((10, 20), flow_fields_for(terrain))
+		# Something moved into the way without the field knowing.
+		occupied = {(10, y) for y in range(5, 15)}
+		def is_cell_occupied(cell):
+			return tuple(cell) in occupied
+		path = flow_astar((10, 2), (10, 20), terrain, is_cell_occupied)
+		self.assertEqual(tuple(path[-1]), (10, 20))
+		self.assertFalse(occupied & {tuple(cell) for cell in path})
+
+if __name__ == "__main__":
+	unittest.main()
@@ -0,0 +1,115 @@
+import random
+import unittest
+
+from src.math.direction import Direction
+from src.world.terrain import Terrain
+from src.world.terrain_journal import TerrainLayer
+
+from src.path.astar import astar
+from src.path.hpa import HierarchicalPathfinder, hpa_astar, pathfinder_for
+
+def _path_cost(terrain, path):
+	"""
+	The cost of a path, checking that every step is to a neighbor.
+	"""
+	w = terrain.width
+	total = 0
+	for (x, y), (x2, y2) in zip(path, path[1:]):
+		delta = ((x2 - x) % w, y2 - y)
+		direction = {
+			(0, -1): Direction.NORTH,
+			(1, 0): Direction.EAST,
+			(0, 1): Direction.SOUTH,
+			(w - 1, 0): Direction.WEST,
+		}[delta]
+		total += abs(terrain.height_delta((x, y), direction)) + 1
+	return total
+
+def _random_terrain(rng, w, h, top):
+	return Terrain([[rng.randint(0, top) for _ in range(w)] for _ in range(h)])
+
+class HierarchicalPathfinderTest(unittest.TestCase):
+	def _check(self, pathfinder, terrain, start, goal):
+		engine = pathfinder.engine
+		path = pathfinder.search(engine.index(start), engine.index(goal))
+		cells = [engine.cell(index) for index in path]
+		self.assertEqual(cells[0], start)
+		self.assertEqual(cells[-1], goal)
+		return _path_cost(terrain, cells)
+
+	def test__clusters(self):
+		terrain = Terrain([[1] * 40] * 20)
+		pathfinder = HierarchicalPathfinder(terrain, cluster_size=8)
+		self.assertEqual(pathfinder.clusters_x, 5)
+		self.assertEqual(pathfinder.clusters_y, 3)
+		engine = pathfinder.engine
+		self.assertEqual(pathfinder.cluster_of(engine.index((39, 19))), (4, 2))
+
+	def test__search__flat_terrain_is_optimal(self):
+		terrain = Terrain([[1] * 64] * 32)
+		pathfinder = HierarchicalPathfinder(terrain, cluster_size=8)
+		cost = self._check(pathfinder, terrain, (2, 3), (30, 28))
+		self.assertEqual(cost, 28 + 25)
+
+	def test__search__wraps_x(self):
+		terrain = Terrain([[1] * 64] * 32)
+		pathfinder = HierarchicalPathfinder(terrain, cluster_size=8)
+		cost = self._check(pathfinder, terrain, (60, 5), (20, 20))
+		self.assertEqual(cost, 24 + 15)
+
+	def test__search__near_optimal(self):
+		rng = random.Random(0)
+		for _ in range(10):
+			terrain = _random_terrain(rng, 64, 40, rng.choice([3, 20]))
+			pathfinder = HierarchicalPathfinder(terrain, cluster_size=8)
+			for _ in range(5):
+				start = (rng.randrange(64), rng.randrange(40))
+				goal = (rng.randrange(64), rng.randrange(40))
+				cost = self._check(pathfinder, terrain, start, goal)
+				best = _path_cost(terrain, astar(start, goal, terrain))
+				self.assertGreaterEqual(cost, best)
+				# Noise is the worst case; real planets come within a few
+				# percent.
+				self.assertLessEqual(cost, best * 2)
+
+	def test__search__close_cells_use_flat_search(self):
+		rng = random.Random(1)
+		terrain = _random_terrain(rng, 64, 40, 20)
+		pathfinder = pathfinder_for(terrain)
+		self.assertEqual(
+			[tuple(cell) for cell in hpa_astar((3, 3), (10, 9), terrain)],
+			[tuple(cell) for cell in astar((3, 3), (10, 9), terrain)]
+		)
+		self.assertIs(pathfinder_for(terrain), pathfinder)
+
+	def test__search__goes_around_occupied_cells(self):
+		terrain = Terrain([[1] * 64] * 32)
+		occupied = {(x, 10) for x in range(5, 60)}
+		def is_cell_occupied(cell):
+			return tuple(cell) in occupied
+		path = hpa_astar((20, 2), (20, 25), terrain, is_cell_occupied)
+		self.assertEqual(tuple(path[0]), (20, 2))
+		self.assertEqual(tuple(path[-1]), (20, 25))
+		self.assertFalse(occupied & {tuple(cell) for cell in path})
+		_path_cost(terrain, path)
+
+	def test__search__occupied_goal(self):
+		terrain = Terrain([[1] * 64] * 32)
+		path = hpa_astar((0, 0), (40, 20), terrain, lambda cell: True)
+		self.assertEqual(path, [])
+
+	def test__search__follows_terrain_changes(self):
+		terrain = Terrain([[1] * 128] * 32)
+		pathfinder = HierarchicalPathfinder(terrain, cluster_size=8)
+		self._check(pathfinder, terrain, (4, 16), (40, 16))
+		# Wall off a band of columns but for a gap at the bottom.
+		terrain.map[:30, 20:24] = 100
+		terrain.recompute_deltas(((20, 0), (4, 30)))
+		terrain.journal.record_rect(((20, 0), (4, 30)), TerrainLayer.LAND)
+		cost = self._check(pathfinder, terrain, (4, 16), (40, 16))
+		best = _path_cost(terrain, astar((4, 16), (40, 16), terrain))
+		self.assertEqual(best, 36 + 2 * 14)
+		self.assertLessEqual(cost, best * 1.5)
+
+if __name__ == "__main__":
+	unittest.main()
@@ -63,6 +63,17 @@ class PathRunnerTest(unittest.TestCase):
 		runner.tick(0.5)
 		self.assertFalse(runner.is_moving)
 
+	def test__stop(self):
+		done = []
+		runner = PathRunner(path=BASIC_PATH, on_done=lambda: done.append(1))
+		runner.tick(0.75)
+		runner.stop()
+		self.assertFalse(runner.is_moving)
+		self.assertEqual(runner.position, Vector2(1, 0))
+		runner.tick(5)
+		self.assertEqual(runner.position, Vector2(1, 0))
+		self.assertEqual(done, [])
+
 	def test__target(self):
 		runner = PathRunner(path = BASIC_PATH)
 		self.assertEqual(runner.target, Vector2(1,1))
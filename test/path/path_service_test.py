@@ -0,0 +1,115 @@
+import threading
+import unittest
+
+import numpy as np
+
+from src.world.terrain import Terrain
+
+from src.path.path_service import PathService
+
+def _cells(path):
+	return [tuple(cell) for cell in path]
+
+class PathServiceTest(unittest.TestCase):
+	def setUp(self):
+		self.terrain = Terrain([[1] * 64] * 32)
+
+	def test__request__handed_back_on_tick(self):
+		service = PathService(workers=0)
+		found = []
+		request = service.request(
+			self.terrain, (0, 0), (3, 0), on_done=found.append
+		)
+		self.assertFalse(request.done())
+		self.assertEqual(found, [])
+		service.tick()
+		self.assertTrue(request.done())
+		self.assertEqual(_cells(request.path), [(0, 0), (1, 0), (2, 0), (3, 0)])
+		self.assertEqual(found, [request.path])
+		self.assertEqual(len(service), 0)
+
+	def test__request__found_on_worker(self):
+		service = PathService()
+		threads = []
+		def on_done(path):
+			threads.append(threading.current_thread())
+		request = service.request(self.terrain, (0, 0), (0, 3), on_done=on_done)
+		request._future.result()
+		self.assertFalse(request.done())
+		service.tick()
+		self.assertEqual(_cells(request.path), [(0, 0), (0, 1), (0, 2), (0, 3)])
+		# Handed back on the thread that ticks.
+		self.assertEqual(threads, [threading.current_thread()])
+		service.shutdown()
+
+	def test__request__around_occupied_cells(self):
+		service = PathService(workers=0)
+		occupied = np.zeros((32, 64), dtype=bool)
+		occupied[5, 2:62] = True
+		request = service.request(self.terrain, (10, 2), (10, 8), occupied, 1)
+		service.flush()
+		cells = _cells(request.path)
+		self.assertEqual(cells[-1], (10, 8))
+		self.assertFalse(any(occupied[y, x] for x, y in cells))
+
+	def test__request__no_path(self):
+		service = PathService(workers=0)
+		occupied = np.zeros((32, 64), dtype=bool)
+		occupied[20, 20] = True
+		request = service.request(self.terrain, (0, 0), (20, 20), occupied, 1)
+		service.flush()
+		self.assertEqual(request.path, [])
+
+	def test__cancel(self):
+		service = PathService(workers=0)
+		found = []
+		first = service.request(self.terrain, (0, 0), (5, 5), on_done=found.append)
+		second = service.request(self.terrain, (0, 0), (6, 6), on_done=found.append)
+		first.cancel()
+		service.flush()
+		self.assertFalse(first.done())
+		self.assertTrue(second.done())
+		self.assertEqual(found, [second.path])
+
+	def test__tick__budget(self):
+		service = PathService(workers=0, budget=0)
+		requests = [
+			service.request(self.terrain, (0, 0), (i, 4)) for i in range(3)
+		]
+		service.tick()
+		self.assertEqual([r.done() for r in requests], [True, False, False])
+		service.tick()
+		service.tick()
+		self.assertTrue(all(r.done() for r in requests))
+
+	def test__tick__in_order(self):
+		service = PathService()
+		found = []
+		for i in range(5):
+			service.request(
+				self.terrain, (0, 0), (i + 1, 7), on_done=found.append
+			)
+		service.flush()
+		self.assertEqual([tuple(path[-1]) for path in found], [
+			(i + 1, 7) for i in range(5)
+		])
+		service.shutdown()
+
+	def test__shutdown(self):
+		service = PathService()
+		found = []
+		request = service.request(
+			self.terrain, (0, 0), (5, 5), on_done=found.append
+		)
+		service.shutdown()
+		self.assertTrue(request.cancelled)
+		self.assertEqual(len(service), 0)
+		service.tick()
+		self.assertEqual(found, [])
+
+	def test__one_worker_at_most(self):
+		with self.assertRaises(ValueError):
+			PathService(workers=2)
+
+if __name__ == "__main__":
+	unittest.main()
@@ -6,6 +6,7 @@ from src.math.direction import Direction
 from src.math.vector2 import Vector2
 from src.rendermath.cell import cell_polygon_on_global_screen
 from src.world.terrain import Terrain
+from src.world.terrain_journal import TerrainLayer
 from src.render.viewport import Viewport
 from src.render.terrain_helper import TerrainSurfacer
 
@@ -477,6 +478,45 @@ class TerrainChunkerTest(unittest.TestCase):
 		self.assertTrue(chunker.is_cell_dirty((1, 0)))
 
 
+	def test__mark_rect_dirty(self):
+		chunker = TerrainChunker(
+			terrain=self.basic_terrain,
+			surfacer=self.surfacer,
+			chunk_size=2
+		)
+		chunker.mark_rect_dirty(((3, 1), (2, 1)))
+		self.assertTrue(chunker.is_cell_dirty((0, 0)))
+		self.assertTrue(chunker.is_cell_dirty((2, 0)))
+		self.assertFalse(chunker.is_cell_dirty((0, 2)))
+		self.assertFalse(chunker.is_cell_dirty((2, 2)))
+
+
+	def test__mark_rect_dirty__clips_y(self):
+		chunker = TerrainChunker(
+			terrain=self.basic_terrain,
+			surfacer=self.surfacer,
+			chunk_size=2
+		)
+		chunker.mark_rect_dirty(((0, -1), (1, 2)))
+		self.assertEqual(chunker._dirty, {(0, 0)})
+
+
+	def test__sync_terrain__rebuilds_changed_chunks(self):
+		chunker = TerrainChunker(
+			terrain=self.basic_terrain,
+			surfacer=self.surfacer,
+			chunk_size=2
+		)
+		chunker.make_all_chunks()
+		old = chunker.get_chunk((2, 2))
+		self.basic_terrain.water[3, 3] = 1
+		self.basic_terrain.journal.record([(3, 3)], TerrainLayer.WATER)
+		chunker.sync_terrain()
+		self.assertEqual(len(chunker._dirty), 0)
+		self.assertIsNot(chunker.get_chunk((2, 2)), old)
+		self.assertEqual(len(chunker.get_chunks()), 4)
+
+
 	def test__chunks_intersecting_rect__single(self):
 		chunker = TerrainChunker(
 			terrain=self.basic_terrain,
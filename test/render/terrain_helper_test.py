@@ -203,6 +203,22 @@ class TerrainHelperTest(unittest.TestCase):
 		self.assertEqual(len(result), 2)
 
 
+	def test__sync_terrain(self):
+		"""
+		After the terrain changes, syncing should leave the same caches as
+		starting over.
+		"""
+		viewport = Viewport((800, 600), self.with_ice)
+		terrain_helper = TerrainHelper(self.with_ice, viewport)
+		self.assertEqual(terrain_helper.sync_terrain(), [])
+		self.assertEqual(self.with_ice.melt_ice_cell((1, 2)), (1, 2))
+		self.assertEqual(terrain_helper.sync_terrain(), [((1, 2), (1, 1))])
+		fresh = TerrainHelper(self.with_ice, viewport)
+		self.assertEqual(terrain_helper._land_visibility, fresh._land_visibility)
+		self.assertEqual(terrain_helper._all_ridge_draws, fresh._all_ridge_draws)
+		self.assertEqual(terrain_helper._wall_thicknesses, fresh._wall_thicknesses)
+
+
 	def test__tile_bottom_polygon__valid_tile(self):
 		"""
 		Test tile_bottom_polygon with a valid tile position.
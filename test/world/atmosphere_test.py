@@ -1,5 +1,8 @@
+import copy
 import unittest
 
+from unittest.mock import patch
+
 from src.mgmt.event_manager import EventManager
 
 from src.utility.habitability import HabitabilityFactor
@@ -316,6 +319,100 @@ class AtmosphereTest(unittest.TestCase):
 		self.assertEqual(self.basic.average[AtmosphereElement.OXYGEN], 3000)
 
 
+	def test__transform__as_dict(self):
+		self.basic.change_transform(
+			(AtmosphereElement.CARBON, 100),
+			(AtmosphereElement.OXYGEN, 50),
+		)
+		self.basic.change_transform(
+			(AtmosphereElement.CARBON, 10),
+			(AtmosphereElement.OXYGEN, 5),
+		)
+		self.assertEqual(self.basic.transform, {
+			(AtmosphereElement.CARBON, AtmosphereElement.OXYGEN): (110, 55),
+		})
+
+
+	def test__composition(self):
+		self.assertEqual(self.basic.composition, {
+			elem: 0.2
+			for elem in AtmosphereElement
+		})
+
+
+	def _assert_advance_matches_ticks(self, atmosphere, seconds):
+		ticked = copy.deepcopy(atmosphere)
+		for t in range(seconds):
+			ticked.tick_second(1, t)
+		atmosphere.advance(seconds)
+		for elem in AtmosphereElement:
+			self.assertAlmostEqual(
+				atmosphere.total[elem],
+				ticked.total[elem],
+				places=6
+			)
+			self.assertAlmostEqual(
+				atmosphere.average[elem],
+				ticked.average[elem],
+				places=6
+			)
+
+
+	def test__advance__delta(self):
+		self.basic.change_delta(AtmosphereElement.CARBON, 3)
+		self.basic.change_delta(AtmosphereElement.OXYGEN, -7)
+		self._assert_advance_matches_ticks(self.basic, 500)
+
+
+	def test__advance__transform_runs_out(self):
+		self.basic.change_transform(
+			(AtmosphereElement.CARBON, 30),
+			(AtmosphereElement.OXYGEN, 60),
+		)
+		self.basic.change_delta(AtmosphereElement.CARBON, 1)
+		self._assert_advance_matches_ticks(self.basic, 200)
+
+
+	def test__advance__transform_limited_by_supply(self):
+		# Methane becomes carbon faster than carbon can be made, so the
+		# second transform only ever gets what the first one makes.
+		self.basic.change_transform(
+			(AtmosphereElement.METHANE, 5),
+			(AtmosphereElement.CARBON, 5),
+		)
+		self.basic.change_transform(
+			(AtmosphereElement.CARBON, 20),
+			(AtmosphereElement.OXYGEN, 20),
+		)
+		self._assert_advance_matches_ticks(self.basic, 400)
+
+
+	def test__advance__fraction_of_a_second(self):
+		self.basic.change_delta(AtmosphereElement.CARBON, 10)
+		self.basic.advance(2.5)
+		self.assertEqual(self.basic.total[AtmosphereElement.CARBON], 1025)
+
+
+	def test__advance__years_without_ticking(self):
+		self.basic.change_delta(AtmosphereElement.WATER, 1)
+		self.basic.change_transform(
+			(AtmosphereElement.CARBON, 1),
+			(AtmosphereElement.OXYGEN, 1),
+		)
+		self.basic.change_transform(
+			(AtmosphereElement.METHANE, 2),
+			(AtmosphereElement.CARBON, 2),
+		)
+		year = 365 * 24 * 60 * 60
+		with patch.object(Atmosphere, '_step', wraps=self.basic._step) as step:
+			self.basic.advance(year)
+		self.assertLess(step.call_count, 10)
+		self.assertEqual(self.basic.total[AtmosphereElement.WATER], 1000 + year)
+		self.assertEqual(self.basic.total[AtmosphereElement.METHANE], 0)
+		self.assertEqual(self.basic.total[AtmosphereElement.CARBON], 0)
+		self.assertEqual(self.basic.total[AtmosphereElement.OXYGEN], 3000)
+
+
 	def test__habitability__earth(self):
 		hab = self.earth.habitability()
 		self.assertAlmostEqual(
@@ -375,11 +472,69 @@ class AtmosphereTest(unittest.TestCase):
 	def test__biome_tprs(self):
 		self.earth.tpr_surface = lambda: 288
 		lats = [-1, -0.5, 0, 0.5, 1]
-		self.assertEqual(self.earth.biome_tprs(lats), [
+		self.assertEqual(self.earth.biome_tprs(lats).tolist(), [
 			288 - 15, 288, 288 + 15, 288, 288 - 15
 		])
 
 
+	def test__biome_tprs__matches_biome_tpr_at(self):
+		lats = [n / 10 for n in range(-10, 11)]
+		self.assertEqual(
+			self.earth.biome_tprs(lats).tolist(),
+			[self.earth.biome_tpr_at(lat) for lat in lats]
+		)
+
+
+	def test__frozen_rows__matches_is_frozen_at(self):
+		lats = [n / 50 for n in range(-50, 51)]
+		for atmosphere in (self.earth, self.mars, self.venus):
+			self.assertEqual(
+				atmosphere.frozen_rows(lats).tolist(),
+				[atmosphere.is_frozen_at(lat) for lat in lats]
+			)
+
+
+	def test__tpr_surface__memoized(self):
+		first = self.earth.tpr_surface()
+		with patch.object(self.earth, '_tpr_surface') as compute:
+			self.assertEqual(self.earth.tpr_surface(), first)
+			self.earth.density()
+			self.earth.habitability()
+			compute.assert_not_called()
+
+
+	def test__tpr_surface__recomputed_when_total_changes(self):
+		before = self.earth.tpr_surface()
+		self.earth.change_total(AtmosphereElement.CARBON, 10**16)
+		self.assertGreater(self.earth.tpr_surface(), before)
+
+
+	def test__tpr_surface__recomputed_when_ticking(self):
+		self.earth.change_delta(AtmosphereElement.CARBON, 10**16)
+		before = self.earth.tpr_surface()
+		self.earth.tick_second(1, 0)
+		self.assertGreater(self.earth.tpr_surface(), before)
+
+
+	def test__tpr_surface__recomputed_when_astronomy_changes(self):
+		before = self.earth.tpr_surface()
+		self.earth.astronomy.star_luminosity *= 2
+		self.assertGreater(self.earth.tpr_surface(), before)
+
+
+	def test__habitability__recomputed_when_overridden(self):
+		self.earth._tpr_surface_override = 1000
+		self.assertEqual(
+			self.earth.habitability()[HabitabilityFactor.TEMPERATURE],
+			0
+		)
+		self.earth._tpr_surface_override = None
+		self.assertGreater(
+			self.earth.habitability()[HabitabilityFactor.TEMPERATURE],
+			0
+		)
+
+
 	def test__is_frozen_at__earth_poles_true(self):
 		self.earth.tpr_surface = lambda: 275
 		self.assertTrue(self.earth.is_frozen_at(1))
@@ -459,6 +614,48 @@ class AtmosphereTest(unittest.TestCase):
 		self.assertEqual(new_oxygen, 1100)
 
 
+	def test__contribute__adds_delta_and_transform(self):
+		pair = (AtmosphereElement.CARBON, AtmosphereElement.OXYGEN)
+		contribution = self.basic.contribute(
+			delta={AtmosphereElement.WATER: 5},
+			transform={pair: (2, 3)}
+		)
+		self.assertFalse(contribution.released)
+		self.assertEqual(self.basic.delta[AtmosphereElement.WATER], 5)
+		self.assertEqual(self.basic.transform[pair], (2, 3))
+
+
+	def test__contribute__contributions_sum(self):
+		pair = (AtmosphereElement.CARBON, AtmosphereElement.OXYGEN)
+		for _ in range(100):
+			self.basic.contribute(transform={pair: (1, 1)})
+		self.basic.tick_second(1, 0)
+		self.assertEqual(self.basic.total[AtmosphereElement.CARBON], 900)
+		self.assertEqual(self.basic.total[AtmosphereElement.OXYGEN], 1100)
+
+
+	def test__contribute__release(self):
+		pair = (AtmosphereElement.CARBON, AtmosphereElement.OXYGEN)
+		kept = self.basic.contribute(transform={pair: (1, 1)})
+		gone = self.basic.contribute(
+			delta={AtmosphereElement.WATER: 5},
+			transform={pair: (2, 2)}
+		)
+		gone.release()
+		self.assertTrue(gone.released)
+		self.assertFalse(kept.released)
+		self.assertEqual(self.basic.delta[AtmosphereElement.WATER], 0)
+		self.assertEqual(self.basic.transform[pair], (1, 1))
+
+
+	def test__contribute__release_twice(self):
+		pair = (AtmosphereElement.CARBON, AtmosphereElement.OXYGEN)
+		contribution = self.basic.contribute(transform={pair: (1, 1)})
+		contribution.release()
+		contribution.release()
+		self.assertEqual(self.basic.transform[pair], (0, 0))
+
+
 	def test__override_and_unoverride__temperature(self):
 		evt_mgr = EventManager()
 		self.earth.evt_mgr = evt_mgr
@@ -2,6 +2,8 @@ import unittest
 
 import math
 
+import numpy as np
+
 from src.world.biome import (
 	# Enums
 	BiomeTemperature,
@@ -14,6 +16,10 @@ from src.world.biome import (
 	get_biome,
 	water_distances,
 	calculate_biomes,
+	get_biome_temperatures,
+	classify_biomes,
+	BiomeClassifier,
+	NO_WATER_DISTANCE,
 )
 
 CRATER_EAST_LAND = [
@@ -203,5 +209,72 @@ class BiomeTest(unittest.TestCase):
 
 
 
+
+class ClassifyBiomesTest(unittest.TestCase):
+	def test__get_biome_temperatures(self):
+		tprs = [-50, -0.5, 0, 44.9, 45, 74.9, 75, 109.9, 110, 200]
+		expected = [get_biome_temperature(tpr).value for tpr in tprs]
+		self.assertEqual(get_biome_temperatures(tprs).tolist(), expected)
+
+
+	def test__classify_biomes__matches_get_biome(self):
+		tprs = [-10, 0, 30, 50, 80, 100, 120]
+		xys = list(range(0, 40, 3)) + [NO_WATER_DISTANCE]
+		zs = [0, 1, 3, 4, 9, 30]
+		for wet_cutoff in (8, 64):
+			for tpr in tprs:
+				bucket = get_biome_temperatures([tpr])
+				for xy in xys:
+					for z in zs:
+						wd = (xy, z) if xy != NO_WATER_DISTANCE else (
+							math.inf, math.inf
+						)
+						expected = get_biome(tpr, wd, wet_cutoff=wet_cutoff)
+						actual = classify_biomes(
+							np.array([xy], dtype=np.int32),
+							np.array([z], dtype=np.int32),
+							bucket,
+							wet_cutoff
+						)
+						self.assertEqual(actual[0], expected.value, (tpr, wd))
+
+
+	def test__classify_biomes__matches_calculate_biomes(self):
+		wds = water_distances(CRATER_EAST_LAND, CRATER_EAST_WATER)
+		tprs = [0, 50, 95, 50, 0]
+		expected = calculate_biomes(wds, tpr_deg_fs=tprs, wet_cutoff=8)
+		xys = np.array([[xy for xy, _ in row] for row in wds])
+		zs = np.array([[z for _, z in row] for row in wds])
+		buckets = get_biome_temperatures(tprs)[:, np.newaxis]
+		actual = classify_biomes(xys, zs, buckets, wet_cutoff=8)
+		self.assertEqual(
+			actual.tolist(),
+			[[biome.value for biome in row] for row in expected]
+		)
+
+
+	def test__biome_classifier__skips_same_buckets(self):
+		classifier = BiomeClassifier()
+		xys = np.zeros((2, 3), dtype=np.int32)
+		zs = np.zeros((2, 3), dtype=np.int32)
+		biomes = classifier.classify(xys, zs, [50, 50])
+		self.assertEqual(biomes.shape, (2, 3))
+		self.assertIsNone(classifier.classify(xys, zs, [51, 60]))
+		self.assertIsNotNone(classifier.classify(xys, zs, [51, 100]))
+
+
+	def test__biome_classifier__classify_cells(self):
+		classifier = BiomeClassifier(wet_cutoff=8)
+		xys = np.full((2, 3), 20, dtype=np.int32)
+		zs = np.zeros((2, 3), dtype=np.int32)
+		biomes = classifier.classify(xys, zs, [50, 100])
+		self.assertEqual(biomes[1][2], Biome.DESERT.value)
+		xys[1][2] = 0
+		classifier.classify_cells(xys, zs, [(2, 1)], biomes)
+		self.assertEqual(biomes[1][2], Biome.BEACH.value)
+		self.assertEqual(biomes[1][1], Biome.DESERT.value)
+
+
+
 if __name__ == '__main__':
 	unittest.main()
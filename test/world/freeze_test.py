@@ -0,0 +1,95 @@
+import unittest
+
+from src.utility.temperature import WATER_FREEZE_POINT
+from src.world.astronomy import Astronomy
+from src.world.atmosphere import Atmosphere
+from src.world.freeze import FreezeFrontier
+from src.world.terrain import Terrain
+
+# Ten rows of water. Latitudes run 0.5, 0.4, ... 0.0, ... -0.4, so at noon the
+# rows are this much warmer than the surface temperature:
+#   0, 3, 6, 9, 12, 15, 12, 9, 6, 3
+HMAP = [[1] * 4 for _ in range(10)]
+WMAP = [[1] * 4 for _ in range(10)]
+
+
+def _make(tpr_surface):
+	terrain = Terrain(HMAP, watermap=WMAP)
+	atmosphere = Atmosphere(average={}, astronomy=Astronomy())
+	atmosphere._tpr_surface_override = tpr_surface
+	return terrain, atmosphere, FreezeFrontier(terrain, atmosphere)
+
+
+def _count_calls(atmosphere):
+	calls = []
+	is_frozen_at = atmosphere.is_frozen_at
+	def counted(lat):
+		calls.append(lat)
+		return is_frozen_at(lat)
+	atmosphere.is_frozen_at = counted
+	return calls
+
+
+class FreezeFrontierTest(unittest.TestCase):
+	def test__tick__freezes_coldest_rows(self):
+		terrain, _, frontier = _make(WATER_FREEZE_POINT - 5)
+		frozen = frontier.tick()
+		self.assertEqual(sorted(frontier.frozen_rows), [0, 1, 9])
+		self.assertEqual(len(frozen), 12)
+		self.assertEqual({y for _, y in frozen}, {0, 1, 9})
+		self.assertEqual(terrain.water_area, 28)
+		self.assertEqual(terrain.ice_area, 12)
+
+
+	def test__tick__steady_state_does_nothing(self):
+		_, atmosphere, frontier = _make(WATER_FREEZE_POINT - 5)
+		frontier.tick()
+		calls = _count_calls(atmosphere)
+		self.assertEqual(frontier.tick(), [])
+		self.assertEqual(calls, [])
+
+
+	def test__tick__colder_only_touches_new_rows(self):
+		_, atmosphere, frontier = _make(WATER_FREEZE_POINT - 5)
+		frontier.tick()
+		atmosphere._tpr_surface_override = WATER_FREEZE_POINT - 10
+		calls = _count_calls(atmosphere)
+		frozen = frontier.tick()
+		self.assertEqual({y for _, y in frozen}, {2, 3, 7, 8})
+		self.assertEqual(sorted(frontier.frozen_rows), [0, 1, 2, 3, 7, 8, 9])
+		# Four rows crossed, plus one to find where the frontier stops.
+		self.assertEqual(len(calls), 5)
+
+
+	def test__tick__warmer_moves_frontier_back(self):
+		terrain, atmosphere, frontier = _make(WATER_FREEZE_POINT - 10)
+		frontier.tick()
+		atmosphere._tpr_surface_override = WATER_FREEZE_POINT - 5
+		self.assertEqual(frontier.tick(), [])
+		self.assertEqual(sorted(frontier.frozen_rows), [0, 1, 9])
+		self.assertFalse(frontier.is_row_frozen(2))
+		# Thawing doesn't melt ice.
+		self.assertEqual(terrain.ice_area, 28)
+
+
+	def test__tick__refreezes_new_water(self):
+		terrain, _, frontier = _make(WATER_FREEZE_POINT - 5)
+		frontier.tick()
+		terrain.melt_ice_cell((0, 1))
+		self.assertEqual(terrain.water[1][0], 1)
+		self.assertEqual(frontier.tick(), [(0, 1)])
+		self.assertEqual(terrain.water[1][0], 0)
+
+
+	def test__tick__ignores_water_in_thawed_rows(self):
+		terrain, _, frontier = _make(WATER_FREEZE_POINT - 5)
+		frontier.tick()
+		terrain.freeze_water_cell((0, 4))
+		terrain.melt_ice_cell((0, 4))
+		self.assertEqual(frontier.tick(), [])
+		self.assertEqual(terrain.water[4][0], 1)
+
+
+
+if __name__ == '__main__':
+	unittest.main()
@@ -1,52 +1,149 @@
 import unittest
 from unittest.mock import MagicMock
-from src.world.history import PlanetHistory
+
+import numpy as np
+
+from src.world.history import HistoryTier, PlanetHistory
 from src.utility.habitability import HabitabilityFactor
 
+def habitability_of(value):
+	return {factor: value for factor in HabitabilityFactor}
+
+class TestHistoryTier(unittest.TestCase):
+
+	def test__add__same_bucket_merges(self):
+		tier = HistoryTier(10, 4, 1)
+		for utc, value in [(0, 1.0), (3, 3.0), (9, 2.0)]:
+			tier.add(utc, np.array([value]))
+		self.assertEqual(len(tier), 1)
+		series = tier.series(0, 10, 0, 9)
+		self.assertEqual(series.low.tolist(), [1.0])
+		self.assertEqual(series.high.tolist(), [3.0])
+		self.assertEqual(series.mean.tolist(), [2.0])
+
+	def test__add__full_forgets_oldest(self):
+		tier = HistoryTier(1, 4, 1)
+		for utc in range(10):
+			tier.add(utc, np.array([float(utc)]))
+		self.assertEqual(len(tier), 4)
+		self.assertEqual(tier.oldest, 6)
+		series = tier.series(0, 10, 0, 9)
+		self.assertEqual(series.utc.tolist(), [6, 7, 8, 9])
+		self.assertEqual(series.mean.tolist(), [6, 7, 8, 9])
+
+	def test__series__across_the_wrap(self):
+		tier = HistoryTier(1, 5, 1)
+		for utc in range(8):
+			tier.add(utc, np.array([float(utc)]))
+		self.assertEqual(tier.series(0, 10, 4, 6).utc.tolist(), [4, 5, 6])
+		self.assertEqual(tier.count_between(5, 7), 3)
+
+	def test__series__decimates_to_width(self):
+		tier = HistoryTier(1, 100, 1)
+		for utc in range(100):
+			tier.add(utc, np.array([float(utc)]))
+		series = tier.series(0, 10, 0, 99)
+		self.assertEqual(len(series), 10)
+		self.assertEqual(series.utc.tolist(), list(range(0, 100, 10)))
+		self.assertEqual(series.low.tolist(), list(range(0, 100, 10)))
+		self.assertEqual(series.high.tolist(), list(range(9, 100, 10)))
+		self.assertEqual(series.mean.tolist(), [n + 4.5 for n in range(0, 100, 10)])
+
+	def test__series__width_must_be_positive(self):
+		tier = HistoryTier(1, 10, 1)
+		for utc in range(5):
+			tier.add(utc, np.array([float(utc)]))
+		for width in (0, -3):
+			with self.assertRaises(ValueError):
+				tier.series(0, width, 0, 4)
+
 class TestPlanetHistory(unittest.TestCase):
 
 	def setUp(self):
 		self.mock_world = MagicMock()
-		self.mock_world.habitability.return_value = {
-			HabitabilityFactor.TOTAL: 0.5,
-			HabitabilityFactor.TEMPERATURE: 0.5,
-			HabitabilityFactor.PRESSURE: 0.5,
-		}
+		self.mock_world.habitability.return_value = habitability_of(0.5)
 		self.planet_history = PlanetHistory(self.mock_world)
 
 	def test__init(self):
 		self.assertEqual(self.planet_history.world, self.mock_world)
-		self.assertEqual(
-			len(self.planet_history.habitability),
-			len(HabitabilityFactor)
-		)
 		for factor in HabitabilityFactor:
-			self.assertEqual(self.planet_history.habitability[factor], [])
+			series = self.planet_history.habitability(factor, 100)
+			self.assertEqual(len(series), 0)
 
 	def test__update__habitability_updates_once(self):
 		utc = 1234567890.0
 		self.planet_history.update(utc)
-		for key, value in self.mock_world.habitability().items():
+		for factor in HabitabilityFactor:
 			self.assertEqual(
-				self.planet_history.habitability[key],
-				[(utc, value)]
+				self.planet_history.habitability(factor, 100).points(),
+				[(utc, 0.5)]
 			)
 
 	def test__update__habitability_updates_twice(self):
-		utc = 1
-		self.planet_history.update(utc)
-		utc = 2
-		self.mock_world.habitability.return_value = {
-			HabitabilityFactor.TOTAL: 0.6,
-			HabitabilityFactor.TEMPERATURE: 0.6,
-			HabitabilityFactor.PRESSURE: 0.6,
-		}
-		self.planet_history.update(utc)
-		for key, _ in self.mock_world.habitability().items():
+		self.planet_history.update(1)
+		self.mock_world.habitability.return_value = habitability_of(0.6)
+		self.planet_history.update(2)
+		for factor in HabitabilityFactor:
 			self.assertEqual(
-				self.planet_history.habitability[key],
+				self.planet_history.habitability(factor, 100).points(),
 				[(1, 0.5), (2, 0.6)]
 			)
 
+	def test__update__factors_kept_apart(self):
+		self.mock_world.habitability.return_value = {
+			HabitabilityFactor.TOTAL: 0.1,
+			HabitabilityFactor.TEMPERATURE: 0.2,
+			HabitabilityFactor.PRESSURE: 0.3,
+		}
+		self.planet_history.update(0)
+		history = self.planet_history
+		self.assertEqual(
+			history.habitability(HabitabilityFactor.PRESSURE, 1).mean.tolist(),
+			[0.3]
+		)
+
+	def test__update__memory_is_bounded(self):
+		history = PlanetHistory(self.mock_world, tiers=((1, 8), (30, 8)))
+		for utc in range(1000):
+			history.update(utc)
+		self.assertEqual([len(tier) for tier in history.tiers], [8, 8])
+
+	def test__habitability__width_must_be_positive(self):
+		self.planet_history.update(0)
+		with self.assertRaises(ValueError):
+			self.planet_history.habitability(HabitabilityFactor.TOTAL, 0)
+
+	def test__habitability__at_most_width_points(self):
+		for utc in range(5000):
+			self.planet_history.update(utc)
+		series = self.planet_history.habitability(HabitabilityFactor.TOTAL, 300)
+		self.assertLessEqual(len(series), 300)
+		self.assertEqual(series.utc[0], 0)
+
+	def test__habitability__picks_coarsest_tier_with_enough_points(self):
+		history = PlanetHistory(self.mock_world, tiers=((1, 1000), (10, 1000)))
+		for utc in range(1000):
+			history.update(utc)
+		# The coarse tier has a point for every one of 50 columns...
+		series = history.habitability(HabitabilityFactor.TOTAL, 50)
+		self.assertEqual(series.utc.tolist(), list(range(0, 1000, 20)))
+		# ...but not for 500, so those come from the fine tier.
+		series = history.habitability(HabitabilityFactor.TOTAL, 500)
+		self.assertEqual(series.utc.tolist(), list(range(0, 1000, 2)))
+
+	def test__habitability__recent_window_from_fine_tier(self):
+		history = PlanetHistory(self.mock_world, tiers=((1, 100), (10, 100)))
+		for utc in range(500):
+			self.mock_world.habitability.return_value = habitability_of(utc)
+			history.update(utc)
+		series = history.habitability(HabitabilityFactor.TOTAL, 100, start=450)
+		self.assertEqual(series.mean.tolist(), list(range(450, 500)))
+		# The fine tier has forgotten this far back; the coarse one hasn't.
+		series = history.habitability(
+			HabitabilityFactor.TOTAL, 100, start=0, end=99
+		)
+		self.assertEqual(series.utc.tolist(), list(range(0, 100, 10)))
+		self.assertEqual(series.low.tolist(), list(range(0, 100, 10)))
+
 if __name__ == '__main__':
 	unittest.main()
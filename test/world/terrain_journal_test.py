@@ -0,0 +1,115 @@
+import unittest
+
+import numpy as np
+
+from src.world.terrain_journal import (
+	TerrainJournal,
+	TerrainLayer,
+	grow_rect,
+	mask_to_rects,
+	rect_cells,
+)
+
+
+
+def _covered(rects):
+	return {cell for rect in rects for cell in rect_cells(rect)}
+
+
+class MaskToRectsTest(unittest.TestCase):
+	def test__empty(self):
+		self.assertEqual(mask_to_rects(np.zeros((3, 4), dtype=bool)), [])
+
+
+	def test__merges_rows(self):
+		mask = np.zeros((4, 5), dtype=bool)
+		mask[1:3, 1:4] = True
+		self.assertEqual(mask_to_rects(mask), [((1, 1), (3, 2))])
+
+
+	def test__y_offset(self):
+		mask = np.zeros((2, 3), dtype=bool)
+		mask[1, 2] = True
+		self.assertEqual(mask_to_rects(mask, y_offset=5), [((2, 6), (1, 1))])
+
+
+	def test__covers_exactly(self):
+		rng = np.random.default_rng(3)
+		mask = rng.random((9, 13)) < 0.3
+		rects = mask_to_rects(mask)
+		expected = {(x, y) for y, x in zip(*np.nonzero(mask))}
+		self.assertEqual(_covered(rects), expected)
+		self.assertEqual(
+			sum(sx * sy for _, (sx, sy) in rects),
+			len(expected)
+		)
+
+
+	def test__grow_rect(self):
+		self.assertEqual(grow_rect(((2, 3), (1, 2))), ((1, 2), (3, 4)))
+
+
+
+class TerrainJournalTest(unittest.TestCase):
+	def test__record__wraps_x(self):
+		journal = TerrainJournal((4, 3))
+		reader = journal.subscribe()
+		journal.record([(5, 1), (-1, 2)], TerrainLayer.WATER)
+		self.assertEqual(_covered(reader.pull()), {(1, 1), (3, 2)})
+
+
+	def test__pull__forgets(self):
+		journal = TerrainJournal((4, 3))
+		reader = journal.subscribe()
+		journal.record([(0, 0)], TerrainLayer.LAND)
+		self.assertTrue(reader.has_changes)
+		self.assertEqual(reader.pull(), [((0, 0), (1, 1))])
+		self.assertFalse(reader.has_changes)
+		self.assertEqual(reader.pull(), [])
+
+
+	def test__layers(self):
+		journal = TerrainJournal((4, 3))
+		water = journal.subscribe(TerrainLayer.WATER)
+		biome = journal.subscribe(TerrainLayer.BIOME)
+		journal.record([(1, 1)], TerrainLayer.WATER | TerrainLayer.ICE)
+		self.assertTrue(water.has_changes)
+		self.assertFalse(biome.has_changes)
+
+
+	def test__unsubscribe(self):
+		journal = TerrainJournal((4, 3))
+		reader = journal.subscribe()
+		journal.unsubscribe(reader)
+		journal.record([(1, 1)], TerrainLayer.LAND)
+		self.assertFalse(reader.has_changes)
+
+
+	def test__record_rect__clips_y(self):
+		journal = TerrainJournal((4, 3))
+		reader = journal.subscribe()
+		journal.record_rect(((3, -1), (2, 2)), TerrainLayer.LAND)
+		self.assertEqual(reader.pull_cells(), [(0, 0), (3, 0)])
+
+
+	def test__record_mask(self):
+		journal = TerrainJournal((4, 3))
+		reader = journal.subscribe()
+		mask = np.zeros((3, 4), dtype=bool)
+		mask[2, 1] = True
+		journal.record_mask(mask, TerrainLayer.WATER)
+		self.assertEqual(reader.pull_cells(), [(1, 2)])
+
+
+	def test__clear(self):
+		journal = TerrainJournal((4, 3))
+		reader = journal.subscribe()
+		journal.record([(2, 2)], TerrainLayer.ICE)
+		reader.clear()
+		self.assertFalse(reader.has_changes)
+		self.assertEqual(reader.pull_cells(), [])
+
+
+
+if __name__ == '__main__':
+	unittest.main()
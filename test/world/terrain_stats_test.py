@@ -0,0 +1,113 @@
+import unittest
+
+import numpy as np
+
+from src.world.terrain import Terrain
+from src.world.terrain_journal import TerrainLayer
+
+
+
+def _full_scan(terrain):
+	surface = terrain.map.astype(np.int64) + terrain.water
+	values, counts = np.unique(surface, return_counts=True)
+	return {
+		'sea_level': int(values[np.argmax(counts)]),
+		'water_area': int(np.count_nonzero(terrain.water)),
+		'ice_area': int(np.count_nonzero(terrain.ice)),
+		'max_tile_height': int(terrain.map.max()),
+		'min_tile_height': int(terrain.map.min()),
+	}
+
+
+def _stats(terrain):
+	return {
+		'sea_level': terrain.sea_level(),
+		'water_area': terrain.water_area,
+		'ice_area': terrain.ice_area,
+		'max_tile_height': terrain.max_tile_height,
+		'min_tile_height': terrain.min_tile_height,
+	}
+
+
+class TerrainStatsTest(unittest.TestCase):
+	def test__init(self):
+		land = [
+			[3, 3, 3],
+			[3, 0, 3],
+			[3, 3, 5],
+		]
+		water = [
+			[0, 0, 0],
+			[0, 1, 0],
+			[0, 0, 0],
+		]
+		terrain = Terrain(land, water)
+		self.assertEqual(terrain.sea_level(), 3)
+		self.assertEqual(terrain.water_area, 1)
+		self.assertEqual(terrain.max_tile_height, 5)
+		self.assertEqual(terrain.min_tile_height, 0)
+
+
+	def test__follows_freezing(self):
+		land = [[0] * 4 for _ in range(3)]
+		water = [[2] * 4 for _ in range(3)]
+		terrain = Terrain(land, water)
+		terrain.freeze_water_row(0)
+		self.assertEqual(terrain.water_area, 8)
+		self.assertEqual(terrain.ice_area, 4)
+		self.assertEqual(terrain.land_area, 0)
+		self.assertEqual(terrain.sea_level(), 2)
+		terrain.freeze_water_row(1)
+		self.assertEqual(terrain.sea_level(), 0)
+
+
+	def test__follows_land_changes(self):
+		terrain = Terrain([[1, 2], [3, 4]])
+		terrain.map[1, 1] = 9
+		terrain.map[0, 0] = -2
+		terrain.journal.record([(1, 1), (0, 0)], TerrainLayer.LAND)
+		self.assertEqual(terrain.max_tile_height, 9)
+		self.assertEqual(terrain.min_tile_height, -2)
+		offset, counts = terrain.stats.height_histogram()
+		self.assertEqual(offset, -2)
+		self.assertEqual(counts.sum(), 4)
+		self.assertEqual(counts[9 - offset], 1)
+
+
+	def test__sea_level_ties_go_low(self):
+		terrain = Terrain([[1, 1, 2, 2]])
+		self.assertEqual(terrain.sea_level(), 1)
+		terrain.water[0, 0] = 2
+		terrain.journal.record([(0, 0)], TerrainLayer.WATER)
+		self.assertEqual(terrain.sea_level(), 2)
+
+
+	def test__matches_full_scan(self):
+		rng = np.random.default_rng(4)
+		land = rng.integers(0, 6, size=(8, 12))
+		water = np.where(
+			rng.random((8, 12)) < 0.4,
+			rng.integers(1, 4, size=(8, 12)),
+			0
+		)
+		terrain = Terrain(land, water)
+		for _ in range(30):
+			x, y = int(rng.integers(12)), int(rng.integers(8))
+			change = rng.integers(3)
+			if change == 0:
+				terrain.freeze_water_cell((x, y))
+			elif change == 1:
+				terrain.map[y, x] = rng.integers(-3, 10)
+				terrain.journal.record([(x, y)], TerrainLayer.LAND)
+			else:
+				terrain.water[y, x] = rng.integers(0, 5)
+				terrain.journal.record([(x, y)], TerrainLayer.WATER)
+			if rng.random() < 0.5:
+				self.assertEqual(_stats(terrain), _full_scan(terrain))
+		terrain.balance_water()
+		self.assertEqual(_stats(terrain), _full_scan(terrain))
+
+
+
+if __name__ == '__main__':
+	unittest.main()
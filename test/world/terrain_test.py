@@ -1,6 +1,13 @@
 import unittest
 
+import math
+
+import numpy as np
+
+from src.math.direction import Direction
+
 from src.world.terrain import Terrain
+from src.world.terrain_journal import TerrainLayer
 from src.world.biome import Biome
 
 desert_heightmap = [
@@ -60,14 +67,36 @@ mars_icemap_deep = [
 class TerrainTest(unittest.TestCase):
 	def test__init__no_water(self):
 		terrain = Terrain(desert_heightmap)
-		self.assertEqual(terrain.map, desert_heightmap)
-		self.assertEqual(terrain.water, desert_watermap)
+		self.assertEqual(terrain.map.tolist(), desert_heightmap)
+		self.assertEqual(terrain.water.tolist(), desert_watermap)
 
 
 	def test__init__with_water(self):
 		terrain = Terrain(waterworld_heightmap, waterworld_watermap)
-		self.assertEqual(terrain.map, waterworld_heightmap)
-		self.assertEqual(terrain.water, waterworld_watermap)
+		self.assertEqual(terrain.map.tolist(), waterworld_heightmap)
+		self.assertEqual(terrain.water.tolist(), waterworld_watermap)
+
+
+	def test__init__numpy_planes(self):
+		terrain = Terrain(waterworld_heightmap, waterworld_watermap)
+		self.assertEqual(terrain.map.shape, (5, 5))
+		self.assertEqual(terrain.map.dtype, np.int16)
+		self.assertEqual(terrain.water.dtype, np.int16)
+		self.assertEqual(terrain.ice.dtype, np.int16)
+		self.assertEqual(terrain.biomes.dtype, np.uint8)
+		self.assertTrue(terrain.map.flags['C_CONTIGUOUS'])
+
+
+	def test__init__copies_input(self):
+		watermap = [row[:] for row in waterworld_watermap]
+		terrain = Terrain(waterworld_heightmap, watermap)
+		watermap[0][0] = 9
+		self.assertEqual(terrain.water[0][0], 2)
+
+
+	def test__height_at__returns_int(self):
+		terrain = Terrain(waterworld_heightmap, waterworld_watermap)
+		self.assertIs(type(terrain.height_at((0, 0))), int)
 
 
 	def test__lat_long__simple(self):
@@ -82,13 +111,13 @@ class TerrainTest(unittest.TestCase):
 
 	def test__biome_at__simple(self):
 		terrain = Terrain(desert_heightmap)
-		terrain.biomes[0][0] = Biome.TROPICAL
+		terrain.biomes[0][0] = Biome.TROPICAL.value
 		self.assertEqual(terrain.biome_at((0, 0)), Biome.TROPICAL)
 
 
 	def test__biome_at__looped(self):
 		terrain = Terrain(desert_heightmap)
-		terrain.biomes[0][0] = Biome.TROPICAL
+		terrain.biomes[0][0] = Biome.TROPICAL.value
 		self.assertEqual(terrain.biome_at((5, 0)), Biome.TROPICAL)
 
 
@@ -232,6 +261,54 @@ class TerrainTest(unittest.TestCase):
 		self.assertTrue(terrain.is_cell_ice_edge((0, 1)))
 
 
+	def test__height_delta__interior(self):
+		terrain = Terrain(waterworld_heightmap)
+		self.assertEqual(terrain.height_delta((2, 2), Direction.NORTH), 1)
+		self.assertEqual(terrain.height_delta((2, 2), Direction.EAST), 1)
+		self.assertEqual(terrain.height_delta((1, 2), Direction.EAST), -1)
+		self.assertEqual(terrain.height_delta((2, 3), Direction.NORTH), -1)
+
+
+	def test__height_delta__includes_water(self):
+		terrain = Terrain(waterworld_heightmap, waterworld_watermap)
+		self.assertEqual(terrain.height_delta((1, 1), Direction.WEST), 0)
+		self.assertEqual(terrain.height_delta((2, 2), Direction.EAST), 0)
+
+
+	def test__height_delta__wraps_x(self):
+		terrain = Terrain(surrounded_heightmap)
+		self.assertEqual(terrain.height_delta((1, 1), Direction.WEST), 2)
+		self.assertEqual(terrain.height_delta((0, 1), Direction.WEST), 0)
+		self.assertEqual(terrain.height_delta((6, 1), Direction.EAST), -2)
+
+
+	def test__height_delta__off_map_is_zero(self):
+		terrain = Terrain(waterworld_heightmap)
+		self.assertEqual(terrain.height_delta((2, 0), Direction.NORTH), 0)
+		self.assertEqual(terrain.height_delta((2, 0), Direction.SOUTH), -1)
+		self.assertEqual(terrain.height_delta((2, 4), Direction.SOUTH), 0)
+		self.assertEqual(terrain.height_delta((2, 4), Direction.NORTH), -1)
+
+
+	def test__recompute_deltas__region(self):
+		terrain = Terrain(desert_heightmap)
+		terrain.water[2][2] = 3
+		terrain.recompute_deltas(((2, 2), (1, 1)))
+		self.assertEqual(terrain.height_delta((2, 2), Direction.NORTH), 3)
+		self.assertEqual(terrain.height_delta((2, 1), Direction.SOUTH), -3)
+		self.assertEqual(terrain.height_delta((1, 2), Direction.EAST), -3)
+		self.assertEqual(terrain.height_delta((3, 2), Direction.WEST), -3)
+		self.assertEqual(terrain.height_delta((0, 0), Direction.EAST), 0)
+
+
+	def test__recompute_deltas__wraps_x(self):
+		terrain = Terrain(desert_heightmap)
+		terrain.water[0][0] = 2
+		terrain.recompute_deltas(((0, 0), (1, 1)))
+		self.assertEqual(terrain.height_delta((4, 0), Direction.EAST), -2)
+		self.assertEqual(terrain.height_delta((0, 0), Direction.SOUTH), 2)
+
+
 	def test__melt_ice_cell__land(self):
 		terrain = Terrain(mars_heightmap, icemap=mars_icemap_shallow)
 		melted = terrain.melt_ice_cell((2, 2))
@@ -339,13 +416,13 @@ class BalanceWaterTest(unittest.TestCase):
 	def test__balance_water__balanced_null(self):
 		terrain = Terrain(desert_heightmap, desert_watermap)
 		terrain.balance_water()
-		self.assertEqual(terrain.water, desert_watermap)
+		self.assertEqual(terrain.water.tolist(), desert_watermap)
 
 
 	def test__balance_water__balanced(self):
 		terrain = Terrain(waterworld_heightmap, waterworld_watermap)
 		terrain.balance_water()
-		self.assertEqual(terrain.water, waterworld_watermap)
+		self.assertEqual(terrain.water.tolist(), waterworld_watermap)
 
 
 	def test__balance_water__unbalanced_simple(self):
@@ -384,13 +461,15 @@ class BalanceWaterTest(unittest.TestCase):
 			[0, 0, 00, 0, 0],
 		]
 		terrain = Terrain(cup_map_land, watermap=cup_map_water)
-		terrain.balance_water()
-		self.assertEqual(terrain.water[2][2], 23)
-		for _ in range(10):
-			terrain.balance_water()
+		report = terrain.balance_water()
+		self.assertTrue(report.converged)
+		self.assertEqual(report.num_moved, 9)
 		for y in range(1, 4):
 			for x in range(1, 4):
 				self.assertEqual(terrain.water[y][x], 3)
+		self.assertEqual(terrain.water_area, 9)
+		self.assertEqual(terrain.height_delta((2, 2), Direction.NORTH), 0)
+		self.assertEqual(terrain.balance_water().moved_cells, [])
 
 
 	def test__freeze_water_cell__land(self):
@@ -418,6 +497,31 @@ class BalanceWaterTest(unittest.TestCase):
 		self.assertEqual(terrain.ice[1][1], 1)
 
 
+	def test__freeze_water_cell__water_distances(self):
+		terrain = Terrain(surrounded_heightmap, surrounded_watermap)
+		self.assertEqual(terrain.water_distances.at((0, 1)), (0, 0))
+		terrain.freeze_water_cell((0, 1))
+		self.assertEqual(terrain.water_distances.at((0, 1)), (1, 1))
+
+
+	def test__melt_ice_cell__water_distances(self):
+		terrain = Terrain(mars_heightmap, icemap=mars_icemap_shallow)
+		self.assertEqual(terrain.water_distances.at((0, 1)), (math.inf, math.inf))
+		terrain.melt_ice_cell((0, 1))
+		self.assertEqual(terrain.water_distances.at((0, 1)), (0, 0))
+		self.assertEqual(terrain.water_distances.at((0, 3)), (2, 1))
+
+
+	def test__update_biomes__reclassifies_changed_cells(self):
+		terrain = Terrain(surrounded_heightmap, surrounded_watermap)
+		terrain.update_biomes([300] * 3)
+		self.assertEqual(terrain.biome_at((2, 1)), Biome.BEACH)
+		for y in range(3):
+			terrain.freeze_water_row(y)
+		terrain.update_biomes([300] * 3)
+		self.assertEqual(terrain.biome_at((2, 1)), Biome.BARREN)
+
+
 	def test__freeze_water_row__water(self):
 		terrain = Terrain(waterworld_heightmap, waterworld_watermap)
 		terrain.freeze_water_row(0)
@@ -426,6 +530,60 @@ class BalanceWaterTest(unittest.TestCase):
 			self.assertEqual(terrain.ice[0][x], 2)
 
 
+	def test__freeze_water_row__areas(self):
+		terrain = Terrain(waterworld_heightmap, waterworld_watermap)
+		terrain.freeze_water_row(2)
+		self.assertEqual(terrain.water_area, 20)
+		self.assertEqual(terrain.ice_area, 4)
+
+
+	def test__freeze_water_row__returns_cells(self):
+		terrain = Terrain(waterworld_heightmap, waterworld_watermap)
+		self.assertEqual(
+			terrain.freeze_water_row(2),
+			[(0, 2), (1, 2), (3, 2), (4, 2)]
+		)
+		self.assertEqual(terrain.freeze_water_row(2), [])
+
+
+	def test__journal__records_freezes(self):
+		terrain = Terrain(waterworld_heightmap, waterworld_watermap)
+		reader = terrain.journal.subscribe()
+		terrain.freeze_water_cell((1, 1))
+		terrain.freeze_water_row(3)
+		self.assertEqual(
+			sorted(reader.pull()),
+			[((0, 3), (5, 1)), ((1, 1), (1, 1))]
+		)
+		self.assertEqual(reader.pull(), [])
+
+
+	def test__journal__records_balance_water(self):
+		terrain = Terrain(desert_heightmap, desert_watermap)
+		terrain.water[2][2] = 5
+		reader = terrain.journal.subscribe(TerrainLayer.WATER)
+		terrain.balance_water()
+		self.assertEqual(
+			set(reader.pull_cells()),
+			{(2, 1), (1, 2), (2, 2), (3, 2), (2, 3)}
+		)
+
+
+	def test__journal__layers(self):
+		terrain = Terrain(waterworld_heightmap, waterworld_watermap)
+		reader = terrain.journal.subscribe(TerrainLayer.BIOME)
+		terrain.freeze_water_cell((1, 1))
+		self.assertEqual(reader.pull(), [])
+
+
+	def test__update_biomes__journal(self):
+		terrain = Terrain(waterworld_heightmap, waterworld_watermap)
+		reader = terrain.journal.subscribe(TerrainLayer.BIOME)
+		terrain.update_biomes([295] * 5)
+		self.assertEqual(reader.pull(), [((0, 0), (5, 5))])
+		terrain.update_biomes([295] * 5)
+		self.assertEqual(reader.pull(), [])
+
 
 if __name__ == '__main__':
 	unittest.main()
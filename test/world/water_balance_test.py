@@ -0,0 +1,121 @@
+import unittest
+
+import numpy as np
+
+from src.world.water_balance import balance_water, water_bodies
+
+
+
+def _assert_settled(test, floor, water):
+	surface = floor + water
+	h, w = surface.shape
+	for y, x in zip(*np.nonzero(water)):
+		for dx, dy in ((0, -1), (1, 0), (0, 1), (-1, 0)):
+			x2, y2 = (x + dx) % w, y + dy
+			if 0 <= y2 < h:
+				test.assertLess(surface[y, x] - surface[y2, x2], 2)
+	labels, n = water_bodies(water)
+	for body in range(1, n + 1):
+		levels = surface[labels == body]
+		test.assertLessEqual(levels.max() - levels.min(), 1)
+
+
+class WaterBodiesTest(unittest.TestCase):
+	def test__separate(self):
+		water = np.array([
+			[1, 0, 0, 0],
+			[0, 0, 1, 0],
+		])
+		labels, n = water_bodies(water)
+		self.assertEqual(n, 2)
+		self.assertNotEqual(labels[0, 0], labels[1, 2])
+		self.assertEqual(labels[0, 1], 0)
+
+
+	def test__wraps_x(self):
+		water = np.array([
+			[1, 0, 0, 1],
+			[0, 1, 0, 0],
+		])
+		labels, n = water_bodies(water)
+		self.assertEqual(n, 2)
+		self.assertEqual(labels[0, 0], labels[0, 3])
+		self.assertEqual(sorted(set(labels.ravel().tolist())), [0, 1, 2])
+
+
+	def test__dry(self):
+		_, n = water_bodies(np.zeros((3, 3), dtype=int))
+		self.assertEqual(n, 0)
+
+
+
+class BalanceWaterTest(unittest.TestCase):
+	def test__staircase_ocean_levels(self):
+		floor = np.zeros((3, 6), dtype=np.int16)
+		water = np.array([[6, 5, 4, 3, 2, 1]] * 3, dtype=np.int16)
+		report = balance_water(floor, water)
+		self.assertTrue(report.converged)
+		self.assertEqual(water.tolist(), [[4, 4, 4, 3, 3, 3]] * 3)
+		self.assertEqual(len(report.moved_cells), 18 - 6)
+
+
+	def test__settled_is_untouched(self):
+		floor = np.array([[0, 0, 3, 0]] * 2, dtype=np.int16)
+		water = np.array([[2, 1, 0, 2]] * 2, dtype=np.int16)
+		report = balance_water(floor, water)
+		self.assertTrue(report.converged)
+		self.assertEqual(report.iterations, 1)
+		self.assertEqual(report.moved_cells, [])
+		self.assertEqual(water.tolist(), [[2, 1, 0, 2]] * 2)
+
+
+	def test__spills_over_ridge(self):
+		floor = np.array([[0, 0, 2, 0, 0]], dtype=np.int16)
+		water = np.array([[8, 8, 0, 0, 0]], dtype=np.int16)
+		balance_water(floor, water)
+		self.assertEqual(int(water.sum()), 16)
+		_assert_settled(self, floor, water)
+
+
+	def test__max_iterations(self):
+		floor = np.zeros((1, 9), dtype=np.int16)
+		water = np.zeros((1, 9), dtype=np.int16)
+		water[0, 0] = 40
+		report = balance_water(floor, water, max_iterations=1)
+		self.assertFalse(report.converged)
+		self.assertEqual(report.iterations, 1)
+		self.assertEqual(int(water.sum()), 40)
+		report = balance_water(floor, water)
+		self.assertTrue(report.converged)
+		_assert_settled(self, floor, water)
+
+
+	def test__time_budget(self):
+		floor = np.zeros((1, 9), dtype=np.int16)
+		water = np.zeros((1, 9), dtype=np.int16)
+		water[0, 4] = 40
+		report = balance_water(floor, water, time_budget=0)
+		self.assertFalse(report.converged)
+		self.assertEqual(report.iterations, 1)
+
+
+	def test__random_maps_settle(self):
+		rng = np.random.default_rng(5)
+		for _ in range(10):
+			floor = rng.integers(0, 8, size=(12, 16)).astype(np.int16)
+			water = np.where(
+				rng.random((12, 16)) < 0.3,
+				rng.integers(1, 10, size=(12, 16)),
+				0
+			).astype(np.int16)
+			volume = int(water.sum())
+			report = balance_water(floor, water)
+			self.assertTrue(report.converged)
+			self.assertEqual(int(water.sum()), volume)
+			self.assertTrue((water >= 0).all())
+			_assert_settled(self, floor, water)
+
+
+
+if __name__ == '__main__':
+	unittest.main()
@@ -0,0 +1,155 @@
+import unittest
+
+import heapq
+import math
+import random
+
+import numpy as np
+
+from src.world.water_distance import WaterDistanceField, UNREACHABLE
+
+CRATER_EAST_LAND = [
+	[8, 8, 8, 8, 8],
+	[2, 8, 8, 2, 2],
+	[2, 8, 8, 2, 1],
+	[2, 8, 8, 2, 2],
+	[8, 8, 8, 8, 8]
+]
+
+CRATER_EAST_WATER = [
+	[0, 0, 0, 0, 0],
+	[0, 0, 0, 0, 0],
+	[0, 0, 0, 0, 1],
+	[0, 0, 0, 0, 0],
+	[0, 0, 0, 0, 0]
+]
+
+
+def _reference(land, water, climb):
+	"""Slow, obviously-correct multi-source Dijkstra."""
+	h = len(land)
+	w = len(land[0])
+	heights = [[land[y][x] + water[y][x] for x in range(w)] for y in range(h)]
+	dist = {}
+	queue = [
+		(0, x, y) for y in range(h) for x in range(w) if water[y][x] > 0
+	]
+	heapq.heapify(queue)
+	while queue:
+		d, x, y = heapq.heappop(queue)
+		if (x, y) in dist:
+			continue
+		dist[(x, y)] = d
+		for dx, dy in ((1, 0), (-1, 0), (0, 1), (0, -1)):
+			x2, y2 = (x + dx) % w, y + dy
+			if not 0 <= y2 < h or (x2, y2) in dist:
+				continue
+			step = abs(heights[y][x] - heights[y2][x2]) if climb else 1
+			heapq.heappush(queue, (d + step, x2, y2))
+	return [
+		[dist.get((x, y), UNREACHABLE) for x in range(w)]
+		for y in range(h)
+	]
+
+
+def _random_terrain(rng, w, h, p_water):
+	land = [[rng.randint(0, 6) for _ in range(w)] for _ in range(h)]
+	water = [
+		[rng.randint(1, 2) if rng.random() < p_water else 0 for _ in range(w)]
+		for _ in range(h)
+	]
+	return land, water
+
+
+class WaterDistanceFieldTest(unittest.TestCase):
+	def test__init__matches_reference(self):
+		rng = random.Random(7)
+		for _ in range(5):
+			land, water = _random_terrain(rng, 13, 9, 0.05)
+			field = WaterDistanceField(land, water)
+			self.assertEqual(field.xy.tolist(), _reference(land, water, False))
+			self.assertEqual(field.z.tolist(), _reference(land, water, True))
+
+
+	def test__init__wraps_x(self):
+		field = WaterDistanceField(CRATER_EAST_LAND, CRATER_EAST_WATER)
+		self.assertEqual(field.at((0, 2)), (1, 0))
+		self.assertEqual(field.at((9, 2)), (0, 0))
+
+
+	def test__at__no_water(self):
+		land = [[1] * 4 for _ in range(3)]
+		water = [[0] * 4 for _ in range(3)]
+		field = WaterDistanceField(land, water)
+		self.assertEqual(field.at((1, 1)), (math.inf, math.inf))
+
+
+	def test__as_matrix(self):
+		field = WaterDistanceField(CRATER_EAST_LAND, CRATER_EAST_WATER)
+		matrix = field.as_matrix()
+		self.assertEqual(matrix[2][4], (0, 0))
+		self.assertEqual(matrix[2][3], (1, 0))
+
+
+	def test__update__add_water(self):
+		land = [[1] * 8 for _ in range(4)]
+		water = [[0] * 8 for _ in range(4)]
+		water[0][0] = 1
+		field = WaterDistanceField(land, water)
+		water[3][4] = 1
+		changed = field.update([(4, 3)], np.array(land), np.array(water))
+		self.assertIn((4, 3), changed)
+		self.assertNotIn((0, 0), changed)
+		self.assertEqual(field.at((4, 3)), (0, 0))
+		self.assertEqual(field.at((4, 2)), (1, 1))
+
+
+	def test__update__remove_water(self):
+		land = [[1] * 8 for _ in range(4)]
+		water = [[0] * 8 for _ in range(4)]
+		water[0][0] = 1
+		water[3][4] = 1
+		field = WaterDistanceField(land, water)
+		water[3][4] = 0
+		field.update([(4, 3)], np.array(land), np.array(water))
+		self.assertEqual(field.at((4, 3)), (7, 1))
+
+
+	def test__update__remove_last_water(self):
+		land = [[1] * 4 for _ in range(3)]
+		water = [[0] * 4 for _ in range(3)]
+		water[1][1] = 1
+		field = WaterDistanceField(land, water)
+		water[1][1] = 0
+		field.update([(1, 1)], np.array(land), np.array(water))
+		self.assertEqual(field.at((1, 1)), (math.inf, math.inf))
+		self.assertEqual(field.at((3, 2)), (math.inf, math.inf))
+
+
+	def test__update__matches_recompute(self):
+		rng = random.Random(11)
+		land, water = _random_terrain(rng, 24, 12, 0.04)
+		field = WaterDistanceField(land, water)
+		for _ in range(40):
+			cells = []
+			for _ in range(rng.randint(1, 3)):
+				x, y = rng.randrange(24), rng.randrange(12)
+				if rng.random() < 0.5:
+					water[y][x] = 0 if water[y][x] else 1
+				else:
+					land[y][x] = rng.randint(0, 6)
+				cells.append((x, y))
+			old_xy = field.xy.copy()
+			old_z = field.z.copy()
+			changed = field.update(cells, np.array(land), np.array(water))
+			fresh = WaterDistanceField(land, water)
+			self.assertEqual(field.xy.tolist(), fresh.xy.tolist())
+			self.assertEqual(field.z.tolist(), fresh.z.tolist())
+			diff = (old_xy != fresh.xy) | (old_z != fresh.z)
+			expected = {(x, y) for y, x in zip(*np.nonzero(diff))}
+			self.assertEqual(set(changed), expected)
+
+
+
+if __name__ == '__main__':
+	unittest.main()
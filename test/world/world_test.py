@@ -78,13 +78,13 @@ class TestWorld(unittest.TestCase):
 		world.atmosphere.change_delta(AtmosphereElement.OXYGEN, 1)
 		world.tick_second(1, 0)
 		self.assertEqual(
-			len(world.history.habitability[HabitabilityFactor.TOTAL]),
+			len(world.history.habitability(HabitabilityFactor.TOTAL, 100)),
 			1
 		)
 		world.game_mgr.utc = 2
 		world.tick_second(1, 0)
 		self.assertEqual(
-			len(world.history.habitability[HabitabilityFactor.TOTAL]),
+			len(world.history.habitability(HabitabilityFactor.TOTAL, 100)),
 			2
 		)
 
@@ -94,12 +94,16 @@ class TestWorld(unittest.TestCase):
 		world = World(terrain)
 		world.game_mgr = MagicMock()
 		world.game_mgr.utc = 0
-		world.atmosphere.is_frozen_at = lambda lat: abs(lat - 0.5) < 0.5
+		world.atmosphere.is_frozen_at = lambda lat: abs(lat) > 0.2
 
 		self.assertEqual(world.terrain.water_area, 9)
 
 		world.tick_second(1, 0)
-		self.assertEqual(world.terrain.water_area, 6)
+		self.assertEqual(world.terrain.water_area, 3)
+		self.assertEqual(
+			sorted(world.frozen_cells),
+			[(0, 0), (0, 2), (1, 0), (1, 2), (2, 0), (2, 2)]
+		)
 
 
 	def test__habitability__total1(self):